@@ -0,0 +1,69 @@
+"""
+Micro-benchmark: contrast fix engine vs the original lightness-stepping loop.
+
+Run from backend/:  python -m benchmarks.contrast_fix
+"""
+import colorsys
+import random
+import time
+
+from services import contrast
+
+def legacy_suggest_contrast_fix(fg_hex, bg_hex):
+    """The original implementation: walk HLS lightness in 0.01 steps"""
+    fg_rgb = contrast.hex_to_rgb(fg_hex)
+    bg_rgb = contrast.hex_to_rgb(bg_hex)
+    fg_h, fg_l, fg_s = colorsys.rgb_to_hls(fg_rgb[0]/255, fg_rgb[1]/255, fg_rgb[2]/255)
+    bg_l = colorsys.rgb_to_hls(bg_rgb[0]/255, bg_rgb[1]/255, bg_rgb[2]/255)[1]
+    step = 0.01 if bg_l < 0.5 else -0.01
+    new_fg_l = fg_l
+    for _ in range(100):
+        new_fg_l = max(0, min(1, new_fg_l + step))
+        new_fg_rgb_norm = colorsys.hls_to_rgb(fg_h, new_fg_l, fg_s)
+        new_fg_rgb = (new_fg_rgb_norm[0] * 255, new_fg_rgb_norm[1] * 255, new_fg_rgb_norm[2] * 255)
+        if contrast.contrast_ratio(new_fg_rgb, bg_rgb) >= 4.5:
+            return '#{:02x}{:02x}{:02x}'.format(*(int(c * 255) for c in new_fg_rgb_norm))
+    return None
+
+def random_hex(rng):
+    return "#{:06x}".format(rng.randrange(0x1000000))
+
+def failing_pairs(rng, count):
+    """Colour pairs below 4.5:1, like the ones axe reports"""
+    pairs = []
+    while len(pairs) < count:
+        fg, bg = random_hex(rng), random_hex(rng)
+        if contrast.contrast_ratio(contrast.hex_to_rgb(fg), contrast.hex_to_rgb(bg)) < 4.5:
+            pairs.append((fg, bg))
+    return pairs
+
+def timed(fn, pairs):
+    start = time.perf_counter()
+    results = [fn(fg, bg) for fg, bg in pairs]
+    return time.perf_counter() - start, results
+
+def main():
+    rng = random.Random(42)
+    distinct = failing_pairs(rng, 500)
+    # A page repeats a handful of colour pairs across many nodes
+    page = [rng.choice(distinct[:20]) for _ in range(500)]
+
+    legacy_time, legacy = timed(legacy_suggest_contrast_fix, distinct)
+    contrast.suggest_foreground.cache_clear()
+    engine_time, engine = timed(contrast.suggest_foreground, distinct)
+    contrast.suggest_foreground.cache_clear()
+    legacy_page_time, _ = timed(legacy_suggest_contrast_fix, page)
+    engine_page_time, _ = timed(contrast.suggest_foreground, page)
+
+    def meets(fix, bg):
+        return bool(fix) and contrast.contrast_ratio(contrast.hex_to_rgb(fix), contrast.hex_to_rgb(bg)) >= 4.5
+
+    print(f"{'':28}{'legacy':>12}{'engine':>12}")
+    print(f"{'500 distinct pairs (ms)':28}{legacy_time * 1000:12.1f}{engine_time * 1000:12.1f}")
+    print(f"{'500 nodes, 20 pairs (ms)':28}{legacy_page_time * 1000:12.1f}{engine_page_time * 1000:12.1f}")
+    print(f"{'fixes found':28}{sum(map(bool, legacy)):12}{sum(map(bool, engine)):12}")
+    print(f"{'fixes meeting 4.5:1':28}{sum(meets(f, bg) for f, (_, bg) in zip(legacy, distinct)):12}"
+          f"{sum(meets(f, bg) for f, (_, bg) in zip(engine, distinct)):12}")
+
+if __name__ == "__main__":
+    main()
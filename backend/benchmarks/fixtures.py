@@ -0,0 +1,126 @@
+"""
+Synthetic fixture sites for the scan benchmarks, served from a local HTTP server.
+
+Every page is generated deterministically, so runs are comparable across
+machines and commits without touching the network.
+"""
+import threading
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import BytesIO
+from typing import Dict, Tuple
+
+from PIL import Image
+
+PAGE = """<!DOCTYPE html>
+<html lang="en"><head><meta charset="utf-8"><title>{title}</title></head>
+<body><main><h1>{title}</h1>
+{body}
+</main></body></html>"""
+
+def small() -> str:
+    return PAGE.format(title="Small page", body="""
+<p>A short page with a handful of typical problems.</p>
+<img src="/img/0.png">
+<a href="/somewhere"></a>
+<button></button>
+<p style="color:#999;background:#fff">Low contrast text</p>""")
+
+def huge_dom(sections: int = 2000) -> str:
+    body = "\n".join(
+        f'<section><h2>Section {i}</h2><ul>' + "".join(f"<li><a href=\"/s/{i}/{j}\">Item {j}</a></li>" for j in range(8))
+        + f'</ul><p>Paragraph {i} with some ordinary text content in it.</p></section>'
+        for i in range(sections)
+    )
+    return PAGE.format(title="Huge DOM", body=body)
+
+def contrast(nodes: int = 3000) -> str:
+    # A few repeated colour pairs, like a real site's palette
+    pairs = [("#777777", "#ffffff"), ("#aaaaaa", "#eeeeee"), ("#3366cc", "#224499"), ("#ff9999", "#ffffff")]
+    body = "\n".join(
+        f'<p style="color:{fg};background:{bg}">Low contrast text number {i}</p>'
+        for i, (fg, bg) in ((i, pairs[i % len(pairs)]) for i in range(nodes))
+    )
+    return PAGE.format(title="Contrast violations", body=body)
+
+def images(count: int = 60) -> str:
+    body = "\n".join(f'<img src="/img/{i}.png" width="64" height="64">' for i in range(count))
+    return PAGE.format(title="Many images", body=body)
+
+def iframes(count: int = 15) -> str:
+    body = "\n".join(f'<iframe src="/frame/{i}" width="300" height="200"></iframe>' for i in range(count))
+    return PAGE.format(title="Iframes", body=body)
+
+def frame(index: int) -> str:
+    return PAGE.format(title=f"Frame {index}", body=f"""
+<p style="color:#888;background:#fff">Framed text {index}</p>
+<img src="/img/{index}.png">
+<a href="/f/{index}"></a>""")
+
+@lru_cache(maxsize=None)
+def image(index: int) -> bytes:
+    """A small distinct PNG per index"""
+    color = ((index * 53) % 256, (index * 97) % 256, (index * 193) % 256)
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), color).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+FIXTURES = {
+    "small": small,
+    "huge_dom": huge_dom,
+    "contrast": contrast,
+    "images": images,
+    "iframes": iframes,
+}
+
+@lru_cache(maxsize=None)
+def page(name: str) -> bytes:
+    return FIXTURES[name]().encode("utf-8")
+
+def resolve(path: str) -> Tuple[int, str, bytes]:
+    """(status, content type, body) for a request path"""
+    parts = path.split("?")[0].strip("/").split("/")
+    try:
+        if parts[0] == "img":
+            return 200, "image/png", image(int(parts[1].split(".")[0]))
+        if parts[0] == "frame":
+            return 200, "text/html; charset=utf-8", frame(int(parts[1])).encode("utf-8")
+        if parts[0] in FIXTURES:
+            return 200, "text/html; charset=utf-8", page(parts[0])
+    except (IndexError, ValueError):
+        pass
+    return 404, "text/plain", b"not found"
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        status, content_type, body = resolve(self.path)
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class FixtureServer:
+    """Serves the fixtures on 127.0.0.1 from a background thread"""
+
+    def __init__(self, port: int = 0):
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), FixtureHandler)
+        self.server.daemon_threads = True
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def urls(self) -> Dict[str, str]:
+        return {name: f"{self.base_url}/{name}" for name in FIXTURES}
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
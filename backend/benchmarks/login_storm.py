@@ -0,0 +1,78 @@
+"""
+Login storm benchmark: does a burst of logins stall other requests?
+
+Polls GET /health on a running API while firing concurrent logins, and
+reports /health latency percentiles while idle and during the storm, plus
+login throughput. With bcrypt on the event loop the storm percentiles climb
+by ~100ms+ per queued login; with it offloaded they should stay flat.
+
+Run from backend/ against a running server (one uvicorn worker):
+    python -m benchmarks.login_storm --base-url http://127.0.0.1:8000 --logins 50
+"""
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def poll_health(client, stop: asyncio.Event, latencies):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await client.get("/health")
+        latencies.append((time.perf_counter() - start) * 1000)
+        await asyncio.sleep(0.01)
+
+async def measure_idle(client, seconds):
+    latencies, stop = [], asyncio.Event()
+    poller = asyncio.create_task(poll_health(client, stop, latencies))
+    await asyncio.sleep(seconds)
+    stop.set()
+    await poller
+    return latencies
+
+async def login(client, email, password):
+    response = await client.post("/login", data={"username": email, "password": password})
+    response.raise_for_status()
+
+async def main(base_url, logins, concurrency):
+    email = f"bench-{uuid.uuid4().hex[:8]}@example.com"
+    password = "benchmark-password"
+    limits = httpx.Limits(max_connections=concurrency + 2)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+        response = await client.post("/register", json={"email": email, "password": password})
+        response.raise_for_status()
+
+        idle = await measure_idle(client, 3)
+
+        storm, stop = [], asyncio.Event()
+        poller = asyncio.create_task(poll_health(client, stop, storm))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def limited_login():
+            async with semaphore:
+                await login(client, email, password)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited_login() for _ in range(logins)))
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await poller
+
+    print(f"{'/health latency (ms)':24}{'p50':>10}{'p95':>10}{'max':>10}")
+    for label, samples in (("idle", idle), ("during login storm", storm)):
+        print(f"{label:24}{statistics.median(samples):10.1f}{percentile(samples, 95):10.1f}{max(samples):10.1f}")
+    print(f"{logins} logins ({concurrency} concurrent) in {elapsed:.2f}s: {logins / elapsed:.1f} logins/s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    parser.add_argument("--logins", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(main(args.base_url, args.logins, args.concurrency))
@@ -0,0 +1,226 @@
+"""
+Scan performance suite: end-to-end and per-stage timings on local fixture sites.
+
+Serves the synthetic pages in benchmarks/fixtures.py from 127.0.0.1 and scans
+them through the real scanner pool (worker process, warm browser,
+length-prefixed JSON frames from services/framing.py), so everything
+`scanner_process.scan_page` does is measured:
+
+  * latency: each fixture scanned --iterations times on one worker; p50/p95
+    of the end-to-end time and of every stage in the result's stageTimings
+  * throughput: a mixed batch of scans at each --concurrency level, with a
+    pool of that many workers; scans per second
+  * peak RSS: summed resident memory of this process and all its
+    descendants (workers, Playwright drivers, Chromium), sampled from /proc
+
+Results are printed and written as JSON. With --save-baseline they become
+the baseline; otherwise they're compared against it and the run exits 1 if
+any p95 grows, or throughput drops, by more than --tolerance. Captioning is
+off by default (--captions to include BLIP) so runs don't depend on a model
+download.
+
+Run from backend/ (Linux for RSS sampling):
+    python -m benchmarks.scan_suite --iterations 10 --concurrency 1 4
+    python -m benchmarks.scan_suite --save-baseline
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from benchmarks.fixtures import FIXTURES, FixtureServer
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "scan_suite.json")
+SCAN_TIMEOUT = 180
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    return {"p50": round(statistics.median(samples), 1), "p95": round(percentile(samples, 95), 1)}
+
+def _process_tree_rss_kb(root: int) -> int:
+    """Resident memory of `root` and its descendants, from /proc"""
+    children: Dict[int, List[int]] = {}
+    rss: Dict[int, int] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # The command name may contain spaces; fields resume after its ")"
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+            with open(f"/proc/{entry}/status") as f:
+                kb = next((int(line.split()[1]) for line in f if line.startswith("VmRSS:")), 0)
+        except (OSError, IndexError, ValueError):
+            continue  # Exited while we were looking
+        children.setdefault(ppid, []).append(int(entry))
+        rss[int(entry)] = kb
+
+    total, stack = 0, [root]
+    while stack:
+        pid = stack.pop()
+        total += rss.get(pid, 0)
+        stack.extend(children.get(pid, ()))
+    return total
+
+class RssSampler:
+    """Tracks the peak summed RSS of the process tree while active"""
+
+    def __init__(self, interval: float = 0.2):
+        self.interval = interval
+        self.peak_kb = 0
+        self.supported = os.path.isdir("/proc")
+        self._stop = threading.Event()
+
+    def __enter__(self):
+        if self.supported:
+            threading.Thread(target=self._run, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, _process_tree_rss_kb(os.getpid()))
+            self._stop.wait(self.interval)
+
+    @property
+    def peak_mb(self) -> Optional[float]:
+        return round(self.peak_kb / 1024, 1) if self.supported else None
+
+def scan(pool, url: str) -> Dict:
+    start = time.perf_counter()
+    result = pool.run({"cmd": "scan", "url": url, "project_id": "benchmark"}, SCAN_TIMEOUT)
+    timings = dict(result.get("stageTimings") or {})
+    timings["end_to_end"] = (time.perf_counter() - start) * 1000
+    return timings
+
+def measure_latency(ScannerPool, urls: Dict[str, str], iterations: int) -> Dict:
+    pool = ScannerPool(size=1, max_scans=10**6, health_check_interval=3600)
+    try:
+        with RssSampler() as sampler:
+            scan(pool, next(iter(urls.values())))  # Worker startup and first-navigation costs aren't per-scan
+            fixtures = {}
+            for name, url in urls.items():
+                runs = [scan(pool, url) for _ in range(iterations)]
+                stages = sorted({stage for run in runs for stage in run} - {"end_to_end", "pool_wait"})
+                fixtures[name] = {
+                    **summarize([run["end_to_end"] for run in runs]),
+                    "stages": {stage: summarize([run.get(stage, 0) for run in runs]) for stage in stages},
+                }
+                print(f"  {name:12}p50 {fixtures[name]['p50']:8.0f} ms   p95 {fixtures[name]['p95']:8.0f} ms")
+    finally:
+        pool.shutdown()
+    return {"fixtures": fixtures, "peak_rss_mb": sampler.peak_mb}
+
+def measure_throughput(ScannerPool, urls: Dict[str, str], concurrency: int, iterations: int) -> Dict:
+    pool = ScannerPool(size=concurrency, max_scans=10**6, health_check_interval=3600)
+    try:
+        with RssSampler() as sampler:
+            with ThreadPoolExecutor(concurrency) as executor:
+                # Bring every worker up before the clock starts
+                list(executor.map(lambda _: scan(pool, next(iter(urls.values()))), range(concurrency)))
+                batch = [url for _ in range(iterations) for url in urls.values()]
+                start = time.perf_counter()
+                latencies = [run["end_to_end"] for run in executor.map(lambda url: scan(pool, url), batch)]
+                elapsed = time.perf_counter() - start
+    finally:
+        pool.shutdown()
+    throughput = round(len(batch) / elapsed, 3)
+    print(f"  {concurrency:>3} concurrent: {throughput:.2f} scans/s, peak RSS {sampler.peak_mb} MB")
+    return {"scans_per_second": throughput, **summarize(latencies), "peak_rss_mb": sampler.peak_mb}
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Human-readable regressions of `results` against `baseline`"""
+    regressions = []
+
+    def check_p95(label, current, previous):
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"{label} p95 {previous:.0f} -> {current:.0f} ms")
+
+    for name, fixture in results["latency"]["fixtures"].items():
+        base = baseline.get("latency", {}).get("fixtures", {}).get(name)
+        if not base:
+            continue
+        check_p95(name, fixture["p95"], base["p95"])
+        for stage, timing in fixture["stages"].items():
+            base_stage = base["stages"].get(stage)
+            # Stages measured in a few ms are all noise
+            if base_stage and max(timing["p95"], base_stage["p95"]) >= 50:
+                check_p95(f"{name}/{stage}", timing["p95"], base_stage["p95"])
+
+    for level, run in results["throughput"].items():
+        base = baseline.get("throughput", {}).get(level)
+        if base and run["scans_per_second"] < base["scans_per_second"] * (1 - tolerance):
+            regressions.append(f"throughput x{level} {base['scans_per_second']:.2f} -> {run['scans_per_second']:.2f} scans/s")
+    return regressions
+
+def main(args) -> int:
+    # The pool reads config.Settings; the benchmark needs neither a database nor auth
+    os.environ.setdefault("MONGO_DB_URI", "mongodb://127.0.0.1:27017")
+    os.environ.setdefault("JWT_SECRET_KEY", "benchmark")
+    if not args.captions:
+        os.environ["ALT_TEXT_MAX_IMAGES"] = "0"
+    from services.scanner_pool import ScannerPool
+
+    with FixtureServer() as server:
+        urls = {name: url for name, url in server.urls().items() if name in args.fixtures}
+        print(f"Latency, {args.iterations} scans per fixture:")
+        latency = measure_latency(ScannerPool, urls, args.iterations)
+        print("Throughput, mixed fixtures:")
+        throughput = {str(n): measure_throughput(ScannerPool, urls, n, args.iterations) for n in args.concurrency}
+
+    results = {
+        "environment": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "captions": args.captions,
+            "iterations": args.iterations,
+        },
+        "latency": latency,
+        "throughput": throughput,
+    }
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print("No baseline yet; run with --save-baseline to record one")
+        return 0
+    with open(args.baseline) as f:
+        regressions = compare(results, json.load(f), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION {regression}")
+    if not regressions:
+        print(f"No regressions beyond {args.tolerance:.0%} of the baseline")
+    return 1 if regressions else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--iterations", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4])
+    parser.add_argument("--fixtures", nargs="+", choices=sorted(FIXTURES), default=list(FIXTURES))
+    parser.add_argument("--captions", action="store_true", help="Caption images with BLIP (downloads the model)")
+    parser.add_argument("--output", default="scan_suite_results.json")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed fractional slowdown before failing")
+    sys.exit(main(parser.parse_args()))
@@ -9,6 +9,8 @@ class Settings(BaseSettings):
     jwt_secret_key: str
     jwt_algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
+    bcrypt_rounds: int = 12  # Cost factor for new password hashes; existing hashes keep theirs
+    password_hash_workers: int = 2  # Threads hashing/verifying passwords, off the event loop
     
     # CORS - Allowed origins for API access
     cors_origins: List[str] = [
@@ -18,11 +20,73 @@ class Settings(BaseSettings):
     
     # Application
     environment: str = "development"  # development, staging, production
+    metrics_enabled: bool = True  # Serve Prometheus metrics at /metrics
+    compression_min_bytes: int = 1024  # Smaller responses are sent uncompressed (gzip, or brotli if installed)
     
     # Rate Limiting
     rate_limit_per_minute: int = 10  # Max requests per minute per user
     scan_rate_limit_per_hour: int = 20  # Max scans per hour per user
     
+    # Per-process cache of verified tokens, users and project ownership
+    auth_cache_ttl_seconds: int = 30  # Changes made by other app processes show up after this
+    auth_cache_max_entries: int = 10000
+    
+    # Scanner worker pool
+    scanner_pool_size: int = 2  # Warm browser processes kept running
+    scanner_worker_max_scans: int = 50  # Recycle a worker after this many scans
+    scanner_health_check_interval: int = 30  # Seconds between idle worker pings
+    scan_timeout_seconds: int = 60
+    scan_job_lease_seconds: int = 60  # A running job whose process stops renewing this is failed
+    
+    # Site crawl mode
+    crawl_max_pages: int = 20  # Upper bound on pages per crawl
+    crawl_max_depth: int = 3  # Link hops from the start URL
+    crawl_max_concurrency: int = 4  # Pages scanned at once within one browser
+    crawl_timeout_seconds: int = 600
+    
+    # Batch scans across several projects (one worker, one browser)
+    batch_max_projects: int = 100
+    batch_scan_concurrency: int = 4  # Origins scanned at once; pages of one origin share a context
+    batch_timeout_seconds: int = 1800
+    batch_insert_size: int = 10  # Results buffered before an insert_many
+    
+    # BLIP alt-text captioning (one resident model per scanner worker)
+    caption_cache_dir: str = "caption_cache"  # Captions keyed by image content hash
+    captioner_threads: int = 0  # torch intra-op threads, 0 = torch default
+    captioner_quantize: bool = False  # Dynamic int8 quantization for CPU inference
+    captioner_batch_size: int = 8
+    captioner_batch_wait_ms: int = 25  # How long to wait for more images to batch
+    alt_text_max_images: int = 5  # Images captioned per page
+    image_max_bytes: int = 5_000_000  # Larger images are skipped
+    image_fetch_timeout: int = 10
+    image_fetch_concurrency: int = 8  # Pooled connections per worker
+    
+    # Screenshots (content-addressed, one per scan result)
+    screenshot_format: str = "webp"  # webp or jpeg
+    screenshot_quality: int = 80
+    thumbnail_width: int = 320
+    
+    # Scheduled scans
+    schedule_poll_seconds: int = 30  # How often each app process looks for due schedules
+    schedule_lease_seconds: int = 120  # A claimed schedule is locked this long while its scan is submitted
+    schedule_jitter_seconds: int = 300  # Random start delay (capped at a tenth of the schedule's interval)
+    schedule_min_interval_minutes: int = 15
+    schedule_backoff_minutes: int = 15  # First delay after a failed run, doubled per further failure
+    schedule_max_backoff_minutes: int = 24 * 60
+    
+    # Page loading during scans
+    scan_block_categories: List[str] = ["analytics", "ads", "media"]  # Also available: fonts
+    scan_settle_max_ms: int = 5000  # Upper bound on waiting for network idle + DOM quiescence
+    scan_settle_quiet_ms: int = 300  # DOM must be unchanged this long to count as settled
+    http_cache_dir: str = "http_cache"  # Subresources shared by all scanner workers, per origin
+    http_cache_max_bytes: int = 500_000_000  # LRU-evicted beyond this; 0 disables the cache
+    readability_char_budget: int = 20_000  # Visible text per page graded for readability
+    
+    # Scan result size
+    max_issue_samples: int = 20  # Distinct element snippets kept per rule
+    max_snippet_chars: int = 300
+    max_result_bytes: int = 1_000_000  # Results are trimmed to fit; Mongo's hard limit is 16MB
+    
     class Config:
         env_file = ".env"
         case_sensitive = False
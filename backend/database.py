@@ -10,6 +10,12 @@ db = client.aura_db
 users_collection = db["users"]
 projects_collection = db["projects"]
 scan_results_collection = db["scan_results"]
+scan_jobs_collection = db["scan_jobs"]
+scan_schedules_collection = db["scan_schedules"]
+project_rollups_collection = db["project_rollups"]
+project_rollup_buckets_collection = db["project_rollup_buckets"]
+scan_fingerprints_collection = db["scan_fingerprints"]
+scan_issues_collection = db["scan_issues"]
 
 async def create_indexes():
     """Create database indexes for better query performance"""
@@ -23,6 +29,34 @@ async def create_indexes():
         
         # Scan Results: index on projectId and createdAt for history queries
         await scan_results_collection.create_index([("projectId", 1), ("createdAt", -1)])
+        # Per-page results of a site crawl point at their aggregate result
+        await scan_results_collection.create_index("parentScanId", sparse=True)
+        # Screenshot garbage collection checks for remaining references
+        await scan_results_collection.create_index("screenshotUrl")
+        
+        # Scan Jobs: per-user rate limiting and queue recovery on startup
+        await scan_jobs_collection.create_index([("userId", 1), ("createdAt", -1)])
+        await scan_jobs_collection.create_index([("status", 1), ("createdAt", 1)])
+        
+        # Scan Schedules: one per project, polled by due time
+        await scan_schedules_collection.create_index("projectId", unique=True)
+        await scan_schedules_collection.create_index([("enabled", 1), ("nextRunAt", 1)])
+        
+        # Rollups: one document per project, buckets per project/granularity/period
+        await project_rollups_collection.create_index("projectId", unique=True)
+        await project_rollup_buckets_collection.create_index(
+            [("projectId", 1), ("granularity", 1), ("start", -1)], unique=True
+        )
+        
+        # Fingerprints: diffs read one scan's set from this index; deletes cascade per scan or project
+        await scan_fingerprints_collection.create_index([("scanId", 1), ("fingerprint", 1)], unique=True)
+        await scan_fingerprints_collection.create_index("projectId")
+        
+        # Issues: pages of one scan in _id order, filtered by rule or severity; deletes cascade per scan or project
+        await scan_issues_collection.create_index([("scanId", 1), ("_id", 1)])
+        await scan_issues_collection.create_index([("scanId", 1), ("rule", 1), ("severity", 1), ("_id", 1)])
+        await scan_issues_collection.create_index([("scanId", 1), ("severity", 1), ("_id", 1)])
+        await scan_issues_collection.create_index("projectId")
         
         print("Database indexes created successfully")
     except Exception as e:
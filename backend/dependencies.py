@@ -1,3 +1,7 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+from bson import ObjectId
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from jose import JWTError, jwt
@@ -5,26 +9,64 @@ from pydantic import ValidationError
 
 import models
 from config import settings
-from database import users_collection
+from database import users_collection, projects_collection
+from services.cache import TTLCache
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/login")
 
-async def get_current_active_user(token: str = Depends(oauth2_scheme)):
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+# Dashboard polling hits these on every request; see services/cache.py
+token_cache = TTLCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)  # token -> email
+user_cache = TTLCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)  # email -> user
+project_cache = TTLCache(settings.auth_cache_ttl_seconds, settings.auth_cache_max_entries)  # project id -> project
+# The API never updates or deletes users, so cached users are only dropped by the TTL; a user changed
+# or removed directly in the database keeps authenticating for up to auth_cache_ttl_seconds
+
+def decode_token_email(token: str) -> Optional[str]:
+    """Email from a valid token; verified tokens are remembered until they expire"""
+    email = token_cache.get(token)
+    if email is not None:
+        return email
     try:
         payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
         email: str = payload.get("sub")
         if email is None:
-            raise credentials_exception
+            return None
         token_data = models.TokenData(email=email)
     except (JWTError, ValidationError):
+        return None
+
+    expires_in = payload["exp"] - datetime.now(timezone.utc).timestamp() if "exp" in payload else None
+    token_cache.set(token, token_data.email, ttl=expires_in)
+    return token_data.email
+
+async def get_current_active_user(token: str = Depends(oauth2_scheme)):
+    credentials_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED,
+        detail="Could not validate credentials",
+        headers={"WWW-Authenticate": "Bearer"},
+    )
+    email = decode_token_email(token)
+    if email is None:
         raise credentials_exception
 
-    user = await users_collection.find_one({"email": token_data.email})
+    user = user_cache.get(email)
     if user is None:
-        raise credentials_exception
-    return user
\ No newline at end of file
+        user = await users_collection.find_one({"email": email})
+        if user is None:
+            raise credentials_exception
+        user_cache.set(email, user)
+    return user
+
+async def find_owned_project(project_id: ObjectId, user_id: ObjectId) -> Optional[dict]:
+    """The project if `user_id` owns it, otherwise None (cached per project)"""
+    project = project_cache.get(project_id)
+    if project is None:
+        project = await projects_collection.find_one({"_id": project_id})
+        if project is None:
+            return None
+        project_cache.set(project_id, project)
+    return project if project["userId"] == user_id else None
+
+def forget_project(project_id: ObjectId):
+    """Drop a cached project after it is changed or deleted"""
+    project_cache.invalidate(project_id)
@@ -0,0 +1,113 @@
+"""
+Response compression and conditional GET support for the API.
+
+`CompressionMiddleware` compresses complete responses (not streams such as
+the SSE job events or static files) of compressible types once they reach a
+size threshold: with brotli when the client accepts it and the optional
+`brotli` package is installed, otherwise with gzip. The encoded bytes are a
+different representation, so a compressed response's ETag gets the encoding
+as a suffix; `etag_matches` ignores that suffix when comparing If-None-Match.
+"""
+import gzip
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # Optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript")
+ENCODING_SUFFIXES = ("-br", "-gzip")
+
+def accepted_encodings(accept_encoding: str) -> Dict[str, float]:
+    """Content codings from an Accept-Encoding header with their q-values"""
+    encodings = {}
+    for part in accept_encoding.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if name:
+            encodings[name.lower()] = quality
+    return encodings
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    encodings = accepted_encodings(accept_encoding)
+    if brotli and encodings.get("br", 0) > 0:
+        return "br"
+    if encodings.get("gzip", 0) > 0:
+        return "gzip"
+    return None
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an If-None-Match header covers `etag` (weak comparison, encoding suffix ignored)"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip().removeprefix("W/")
+        for suffix in ENCODING_SUFFIXES:
+            if tag.endswith(suffix + '"'):
+                tag = tag[:-len(suffix) - 1] + '"'
+                break
+        if tag == etag.removeprefix("W/"):
+            return True
+    return False
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 5):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    def compress(self, body: bytes, encoding: str) -> bytes:
+        if encoding == "br":
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level)
+
+    async def __call__(self, scope, receive, send):
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", "")) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start: Optional[Dict] = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                start = message  # Held back until the first body chunk shows whether to compress
+                return
+            if passthrough or message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start["headers"])
+            if (message.get("more_body") or len(body) < self.minimum_size or "content-encoding" in headers
+                    or not headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)):
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+
+            body = self.compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            etag = headers.get("etag")
+            if etag and etag.endswith('"'):
+                headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            await send(start)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
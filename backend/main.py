@@ -1,9 +1,15 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from routers import auth, projects, scan
 from config import settings
 from database import init_db
+from http_responses import CompressionMiddleware
+from services import metrics
+from services.scanner_pool import scanner_pool
+from services.scan_jobs import scan_job_scheduler
+from services.scan_schedules import scan_schedule_runner
 import os
 
 app = FastAPI(
@@ -21,18 +27,41 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress JSON responses; streams (SSE job events) and screenshots pass through untouched
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_bytes)
+
 # Ensure screenshots directory exists
 os.makedirs("screenshots", exist_ok=True)
 
-# Mount the screenshots directory to serve images
-app.mount("/screenshots", StaticFiles(directory="screenshots"), name="screenshots")
+class ScreenshotFiles(StaticFiles):
+    """Screenshots are content-addressed, so a file never changes under its name"""
+
+    def file_response(self, *args, **kwargs):
+        response = super().file_response(*args, **kwargs)
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable"
+        return response
+
+# Mount the screenshots directory to serve images (StaticFiles adds ETag / 304 handling)
+app.mount("/screenshots", ScreenshotFiles(directory="screenshots"), name="screenshots")
 
 # Startup event to initialize database indexes
 @app.on_event("startup")
 async def startup_event():
-    """Initialize database indexes on startup"""
+    """Initialize database indexes, the scanner pool and the job scheduler on startup"""
     from database import create_indexes
     await create_indexes()
+    # Spawn the warm scanner workers so the first scan doesn't pay browser startup
+    scanner_pool.start()
+    await scan_job_scheduler.start()
+    # Recurring scans; safe to run in every app process (runs are claimed atomically)
+    await scan_schedule_runner.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop the schedules, job scheduler, scanner workers and their browsers"""
+    await scan_schedule_runner.stop()
+    await scan_job_scheduler.stop()
+    scanner_pool.shutdown()
 
 app.include_router(auth.router)
 app.include_router(projects.router)
@@ -46,6 +75,13 @@ def read_root():
         "environment": settings.environment
     }
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """Prometheus metrics: scan stage timings, queue depth, worker pool and caches"""
+    if not settings.metrics_enabled:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint for monitoring"""
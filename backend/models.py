@@ -6,10 +6,12 @@ from pydantic import (
     PlainSerializer,
     WithJsonSchema,
     field_validator,
+    model_validator,
     HttpUrl,
 )
-from typing import List, Optional, Annotated
+from typing import Dict, List, Optional, Annotated, Literal
 from datetime import datetime
+import re
 from bson import ObjectId
 
 # Modern Pydantic V2 way to handle ObjectIds
@@ -66,6 +68,56 @@ class Project(ProjectBase):
         arbitrary_types_allowed=True,
     )
 
+class ProjectRollup(BaseModel):
+    latestScore: Optional[int] = None
+    previousScore: Optional[int] = None
+    delta: int = 0
+    averageScore: Optional[float] = None  # Over recentScores
+    recentScores: List[int] = []  # Oldest first
+    scanCount: int = 0
+    latestScanId: Optional[PyObjectId] = None
+    latestScanAt: Optional[datetime] = None
+    severityCounts: Dict[str, int] = {}
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+    )
+
+class ProjectOverview(Project):
+    rollup: Optional[ProjectRollup] = None  # None until the project's first scan
+
+class TrendBucket(BaseModel):
+    start: datetime
+    granularity: str
+    scans: int
+    averageScore: float
+    severityCounts: Dict[str, int] = {}
+    ruleCounts: Dict[str, int] = {}
+
+class ScanDiffItem(BaseModel):
+    fingerprint: str
+    rule: str
+    severity: str
+    target: str
+    element: str
+
+class ScanDiffSummary(BaseModel):
+    fromScanId: PyObjectId
+    toScanId: PyObjectId
+    newCount: int
+    fixedCount: int
+    persistingCount: int
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+    )
+
+class ScanDiff(ScanDiffSummary):
+    new: List[ScanDiffItem] = []  # Capped at the request's limit; the counts are exact
+    fixed: List[ScanDiffItem] = []
+    newByRule: Dict[str, int] = {}
+    fixedByRule: Dict[str, int] = {}
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -77,17 +129,165 @@ class AccessibilityIssue(BaseModel):
     element: str
     description: str
     guideline: str
+    severity: Optional[str] = None
+
+class ScanIssuePage(BaseModel):
+    items: List[AccessibilityIssue]
+    nextCursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+class IssueGroup(BaseModel):
+    guideline: str
+    description: str
+    severity: str
+    count: int  # Every affected node; the stored issues are only a sample
+
+class ScanRequest(BaseModel):
+    mode: Literal["single", "crawl"] = "single"
+    # Reuse the previous result when the page hasn't changed (single mode only)
+    incremental: bool = False
+    # Crawl mode only; capped by the crawl_* settings
+    maxPages: Optional[int] = Field(None, ge=1)
+    maxDepth: Optional[int] = Field(None, ge=0)
+    concurrency: Optional[int] = Field(None, ge=1)
+    include: List[str] = []  # Regexes matched against path + query
+    exclude: List[str] = []
+
+    @field_validator('include', 'exclude')
+    @classmethod
+    def validate_patterns(cls, v: List[str]) -> List[str]:
+        for pattern in v:
+            try:
+                re.compile(pattern)
+            except re.error:
+                raise ValueError(f'Invalid URL pattern: {pattern}')
+        return v
 
 class ScanResult(BaseModel):
     id: PyObjectId = Field(alias="_id")
     projectId: PyObjectId
-    scanType: str = "live"
+    scanType: str = "live"  # live, crawl (site aggregate) or page (one page of a crawl)
     accessibilityScore: int = Field(..., ge=0, le=100)
-    issues: List[AccessibilityIssue]
+    # Embedded only in results saved before issues moved to /scan/results/{id}/issues
+    issues: List[AccessibilityIssue] = []
+    issueGroups: List[IssueGroup] = []
+    severityCounts: Dict[str, int] = {}
     genericSuggestions: List[str] = []
     aiSuggestions: List[str] = []
     screenshotUrl: str
+    thumbnailUrl: Optional[str] = None
+    pageUrl: Optional[str] = None
+    parentScanId: Optional[PyObjectId] = None
+    pagesScanned: Optional[int] = None
+    unchangedFrom: Optional[PyObjectId] = None  # Set when the page matched this earlier scan
+    # Blocked requests, an estimate of their bytes, settle time (ms) and time saved over the old fixed wait
+    loadStats: Optional[Dict[str, int]] = None
+    cacheStats: Optional[Dict[str, int]] = None  # Subresource HTTP cache hits, misses, bytes saved
+    stageTimings: Optional[Dict[str, int]] = None  # Milliseconds per scan stage
+    createdAt: datetime
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+    )
+
+class ScanSummary(BaseModel):
+    """History list entry; the full result comes from /scan/results/{id}"""
+    id: PyObjectId = Field(alias="_id")
+    scanType: str = "live"
+    accessibilityScore: int
+    severityCounts: Dict[str, int] = {}
+    thumbnailUrl: Optional[str] = None
+    pagesScanned: Optional[int] = None
+    unchangedFrom: Optional[PyObjectId] = None
+    createdAt: datetime
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+    )
+
+class ScanHistoryPage(BaseModel):
+    items: List[ScanSummary]
+    nextCursor: Optional[str] = None  # Pass back as ?cursor= for the next page
+
+class ScanScheduleRequest(BaseModel):
+    # Exactly one of intervalMinutes or cron (five fields, UTC)
+    intervalMinutes: Optional[int] = Field(None, ge=1)
+    cron: Optional[str] = Field(None, max_length=100)
+    mode: Literal["single", "crawl"] = "single"
+    incremental: bool = True
+    enabled: bool = True
+
+    @model_validator(mode='after')
+    def validate_timing(self):
+        if (self.intervalMinutes is None) == (self.cron is None):
+            raise ValueError('Set either intervalMinutes or cron')
+        return self
+
+class ScanSchedule(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    projectId: PyObjectId
+    intervalMinutes: Optional[int] = None
+    cron: Optional[str] = None
+    mode: str = "single"
+    incremental: bool = True
+    enabled: bool
+    nextRunAt: datetime
+    lastRunAt: Optional[datetime] = None
+    lastJobId: Optional[PyObjectId] = None
+    lastStatus: Optional[str] = None
+    consecutiveFailures: int = 0
+    lastDiff: Optional[ScanDiffSummary] = None  # Against the scan before the latest scheduled one
+    createdAt: datetime
+
+    model_config = ConfigDict(
+        populate_by_name=True,
+        arbitrary_types_allowed=True,
+    )
+
+class ScanJobStage(BaseModel):
+    stage: str
+    at: datetime
+
+class ScanBatchRequest(BaseModel):
+    projectIds: Optional[List[str]] = None
+    allProjects: bool = False  # Scan every project the user owns
+
+    @model_validator(mode='after')
+    def validate_selection(self):
+        if bool(self.projectIds) == self.allProjects:
+            raise ValueError('Set either projectIds or allProjects')
+        return self
+
+class ScanBatchItem(BaseModel):
+    projectId: PyObjectId
+    resultId: Optional[PyObjectId] = None
+    score: Optional[int] = None
+    error: Optional[str] = None
+
+    model_config = ConfigDict(
+        arbitrary_types_allowed=True,
+    )
+
+class ScanBatchProgress(BaseModel):
+    total: int
+    completed: int = 0
+    failed: int = 0
+    results: List[ScanBatchItem] = []
+
+class ScanJob(BaseModel):
+    id: PyObjectId = Field(alias="_id")
+    projectId: Optional[PyObjectId] = None  # None for batch jobs, which cover several projects
+    mode: str = "single"  # single, crawl or batch
+    status: str  # queued, running, completed, failed
+    stages: List[ScanJobStage] = []
+    resultId: Optional[PyObjectId] = None
+    error: Optional[str] = None
+    scheduleId: Optional[PyObjectId] = None  # Set for scans started by a schedule
+    batch: Optional[ScanBatchProgress] = None
     createdAt: datetime
+    startedAt: Optional[datetime] = None
+    finishedAt: Optional[datetime] = None
 
     model_config = ConfigDict(
         populate_by_name=True,
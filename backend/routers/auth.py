@@ -18,7 +18,7 @@ async def register_user(user: models.UserCreate):
             detail="Email already registered",
         )
     
-    hashed_password = security.get_password_hash(user.password)
+    hashed_password = await security.get_password_hash_async(user.password)
     user_data = user.dict()
     user_data["password"] = hashed_password
     user_data["createdAt"] = datetime.now(timezone.utc)
@@ -31,7 +31,7 @@ async def register_user(user: models.UserCreate):
 @router.post("/login", response_model=models.Token)
 async def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
     user = await users_collection.find_one({"email": form_data.username})
-    if not user or not security.verify_password(form_data.password, user["password"]):
+    if not user or not await security.verify_password_async(form_data.password, user["password"]):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
@@ -1,13 +1,24 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from typing import List, Optional, Tuple
 from bson import ObjectId
+from bson.errors import InvalidId
 from datetime import datetime, timezone
+import base64
+import hashlib
 import pymongo
 
 import models
-from database import projects_collection, scan_results_collection
-from dependencies import get_current_active_user
+from database import projects_collection, scan_results_collection, scan_jobs_collection, scan_schedules_collection
+from config import settings
+from services.scan_jobs import crawl_options
+from dependencies import get_current_active_user, find_owned_project, forget_project
+from http_responses import etag_matches
 from utils import validate_url, logger
+from services.rollups import delete_rollups, get_trend, GRANULARITIES
+from services.scan_diff import delete_project_fingerprints, diff_scans
+from services.scan_issues import delete_project_issues
+from services.scan_schedules import save_schedule, shortest_gap
+from services.screenshot_store import release_screenshots
 
 router = APIRouter(prefix="/projects", tags=["Projects"])
 
@@ -49,32 +60,201 @@ async def get_projects(current_user: models.User = Depends(get_current_active_us
     ).sort("createdAt", pymongo.DESCENDING).to_list(100)
     return projects
 
+@router.get("/overview", response_model=List[models.ProjectOverview])
+async def get_projects_overview(current_user: models.User = Depends(get_current_active_user)):
+    """All of the user's projects with their score rollups, in one query"""
+    return await projects_collection.aggregate([
+        {"$match": {"userId": ObjectId(current_user["_id"])}},
+        {"$sort": {"createdAt": pymongo.DESCENDING}},
+        {"$limit": 100},
+        {"$lookup": {
+            "from": "project_rollups",
+            "localField": "_id",
+            "foreignField": "projectId",
+            "as": "rollup",
+        }},
+        {"$set": {"rollup": {"$arrayElemAt": ["$rollup", 0]}}},
+    ]).to_list(100)
+
 @router.get("/{project_id}", response_model=models.Project)
 async def get_project(project_id: str, current_user: models.User = Depends(get_current_active_user)):
-    project = await projects_collection.find_one({"_id": ObjectId(project_id), "userId": ObjectId(current_user["_id"])})
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
     if project:
         return project
     raise HTTPException(status_code=404, detail="Project not found")
 
-@router.get("/{project_id}/history", response_model=List[models.ScanResult])
-async def get_scan_history(project_id: str, current_user: models.User = Depends(get_current_active_user)):
-    project = await projects_collection.find_one({"_id": ObjectId(project_id), "userId": ObjectId(current_user["_id"])})
+@router.get("/{project_id}/trend", response_model=List[models.TrendBucket])
+async def get_score_trend(
+    project_id: str,
+    granularity: str = Query("day", pattern=f"^({'|'.join(GRANULARITIES)})$"),
+    limit: int = Query(30, ge=1, le=365),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
+    return await get_trend(project["_id"], granularity, limit)
 
-    history = await scan_results_collection.find(
-        {"projectId": ObjectId(project_id)}
-    ).sort("createdAt", pymongo.DESCENDING).to_list(100)
+@router.get("/{project_id}/schedule", response_model=models.ScanSchedule)
+async def get_scan_schedule(project_id: str, current_user: models.User = Depends(get_current_active_user)):
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    schedule = await scan_schedules_collection.find_one({"projectId": project["_id"]})
+    if not schedule:
+        raise HTTPException(status_code=404, detail="No schedule for this project")
+    return schedule
 
-    return history
+@router.put("/{project_id}/schedule", response_model=models.ScanSchedule)
+async def set_scan_schedule(project_id: str, schedule_request: models.ScanScheduleRequest,
+                            current_user: models.User = Depends(get_current_active_user)):
+    """Create or replace the project's recurring scan"""
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    definition = schedule_request.model_dump()
+    try:
+        gap = shortest_gap(definition)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cron expression: {e}")
+    if gap.total_seconds() < settings.schedule_min_interval_minutes * 60:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Scheduled scans can run at most every {settings.schedule_min_interval_minutes} minutes"
+        )
+    definition["options"] = crawl_options(models.ScanRequest(mode="crawl")) if schedule_request.mode == "crawl" else None
+
+    schedule = await save_schedule(project, ObjectId(current_user["_id"]), definition)
+    logger.info(f"Scan schedule set for project {project_id} by user {current_user['email']}")
+    return schedule
+
+@router.delete("/{project_id}/schedule", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_scan_schedule(project_id: str, current_user: models.User = Depends(get_current_active_user)):
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+    await scan_schedules_collection.delete_one({"projectId": project["_id"]})
+    return
+
+async def find_diff_scan(project_id: ObjectId, scan_id: Optional[str], before: Optional[dict] = None) -> dict:
+    """The project's result `scan_id`, or its latest one (older than `before` if given)"""
+    projection = {"createdAt": 1, "fingerprinted": 1}
+    if scan_id:
+        try:
+            query = {"_id": ObjectId(scan_id), "projectId": project_id}
+        except InvalidId:
+            raise HTTPException(status_code=400, detail="Invalid scan ID format")
+        scan = await scan_results_collection.find_one(query, projection)
+    else:
+        query = {"projectId": project_id, "parentScanId": None}
+        if before:
+            query["$or"] = [
+                {"createdAt": {"$lt": before["createdAt"]}},
+                {"createdAt": before["createdAt"], "_id": {"$lt": before["_id"]}},
+            ]
+        scan = await scan_results_collection.find_one(
+            query, projection, sort=[("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+        )
+    if not scan:
+        raise HTTPException(status_code=404, detail="Scan result not found" if scan_id else "Not enough scans to compare")
+    if not scan.get("fingerprinted"):
+        raise HTTPException(status_code=409, detail=f"Scan {scan['_id']} predates violation fingerprints and can't be diffed")
+    return scan
+
+@router.get("/{project_id}/diff", response_model=models.ScanDiff)
+async def get_scan_diff(
+    project_id: str,
+    from_scan: Optional[str] = Query(None, alias="from"),
+    to_scan: Optional[str] = Query(None, alias="to"),
+    limit: int = Query(100, ge=0, le=1000),
+    current_user: models.User = Depends(get_current_active_user),
+):
+    """New, fixed and persisting violations between two scans (default: the latest two)"""
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    to_result = await find_diff_scan(project["_id"], to_scan)
+    from_result = await find_diff_scan(project["_id"], from_scan, before=to_result)
+    return await diff_scans(from_result["_id"], to_result["_id"], limit)
+
+# Only what the history list shows; issues and suggestions stay in the database
+SUMMARY_PROJECTION = {field: 1 for field in models.ScanSummary.model_fields if field != "id"}
+
+def encode_history_cursor(scan: dict) -> str:
+    """Opaque cursor pointing just past `scan` in newest-first order"""
+    created_at = scan["createdAt"].replace(tzinfo=timezone.utc)
+    raw = f"{round(created_at.timestamp() * 1000)}:{scan['_id']}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def decode_history_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    try:
+        millis, scan_id = base64.urlsafe_b64decode(cursor.encode()).decode().split(":")
+        return datetime.fromtimestamp(int(millis) / 1000, tz=timezone.utc), ObjectId(scan_id)
+    except (ValueError, InvalidId, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+@router.get("/{project_id}/history", response_model=models.ScanHistoryPage)
+async def get_scan_history(
+    project_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    current_user: models.User = Depends(get_current_active_user),
+):
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
+    # Per-page results of a crawl are reached through their aggregate result
+    query = {"projectId": project["_id"], "parentScanId": None}
+    if cursor:
+        # Keyset pagination on the (projectId, createdAt) index, _id breaks ties
+        created_at, scan_id = decode_history_cursor(cursor)
+        query["$or"] = [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lt": scan_id}},
+        ]
+
+    # Just the keys first: they decide the ETag, so a 304 skips loading the summaries
+    keys = await scan_results_collection.find(query, {"createdAt": 1}).sort(
+        [("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    next_cursor = encode_history_cursor(keys[limit - 1]) if len(keys) > limit else None
+    # Summaries never change, so the ids on the page identify its content; browsers revalidate every time
+    page_key = " ".join([str(scan["_id"]) for scan in keys[:limit]] + [next_cursor or ""])
+    headers = {"ETag": f'"{hashlib.sha1(page_key.encode()).hexdigest()[:20]}"',
+               "Cache-Control": "private, no-cache", "Vary": "Authorization"}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    response.headers.update(headers)
+
+    scans = await scan_results_collection.find(
+        {"_id": {"$in": [scan["_id"] for scan in keys[:limit]]}}, SUMMARY_PROJECTION
+    ).sort([("createdAt", pymongo.DESCENDING), ("_id", pymongo.DESCENDING)]).to_list(limit)
+    return {"items": scans, "nextCursor": next_cursor}
 
 @router.delete("/{project_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_project(project_id: str, current_user: models.User = Depends(get_current_active_user)):
+    # Check ownership before touching anything that belongs to the project
+    project = await find_owned_project(ObjectId(project_id), ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=404, detail="Project not found")
+
     # --- ADD THIS: Also delete associated scan results ---
-    await scan_results_collection.delete_many({"projectId": ObjectId(project_id)})
+    screenshot_urls = await scan_results_collection.distinct("screenshotUrl", {"projectId": project["_id"]})
+    await scan_results_collection.delete_many({"projectId": project["_id"]})
+    await release_screenshots(scan_results_collection, screenshot_urls)
+    await scan_jobs_collection.delete_many({"projectId": project["_id"]})
+    await delete_rollups(project["_id"])
+    await delete_project_fingerprints(project["_id"])
+    await delete_project_issues(project["_id"])
+    await scan_schedules_collection.delete_one({"projectId": project["_id"]})
     # ---------------------------------------------------
     
-    delete_result = await projects_collection.delete_one({"_id": ObjectId(project_id), "userId": ObjectId(current_user["_id"])})
-    if delete_result.deleted_count == 0:
-        raise HTTPException(status_code=404, detail="Project not found")
+    await projects_collection.delete_one({"_id": project["_id"]})
+    forget_project(project["_id"])
     return
\ No newline at end of file
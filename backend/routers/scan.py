@@ -1,74 +1,216 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from bson import ObjectId
-from datetime import datetime, timezone
+from bson.errors import InvalidId
+from typing import List, Optional
 import asyncio
+import json
 
 import models
-from database import projects_collection, scan_results_collection
-from dependencies import get_current_active_user
-from utils import logger, sanitize_error_message
-from services.scanner_wrapper import scan_website
+from config import settings
+from database import projects_collection, scan_results_collection, scan_jobs_collection
+from dependencies import get_current_active_user, find_owned_project
+from http_responses import etag_matches
+from utils import logger
+from services.rollups import forget_scan, rebuild_rollup
+from services.scan_diff import delete_fingerprints
+from services.scan_issues import delete_issues, find_issues
+from services.screenshot_store import release_screenshots
+from services.scan_jobs import scan_job_scheduler, count_recent_jobs, crawl_options, stage_event, TERMINAL_STAGES
 
 router = APIRouter(prefix="/scan", tags=["Scanning"])
 
-@router.post("/{project_id}", response_model=models.ScanResult, status_code=status.HTTP_201_CREATED)
-async def start_new_scan(project_id: str, current_user = Depends(get_current_active_user)):
-    """Start a new accessibility scan for a project"""
+# A saved result never changes, so browsers may keep it; Vary keeps one user's copy from another
+RESULT_CACHE_HEADERS = {"Cache-Control": "private, max-age=31536000, immutable", "Vary": "Authorization"}
+
+def scan_result_response(scan_results, headers=None) -> ORJSONResponse:
+    """Validated ScanResult(s) encoded with orjson, skipping FastAPI's generic encoder"""
+    if isinstance(scan_results, list):
+        content = [models.ScanResult.model_validate(result).model_dump(by_alias=True) for result in scan_results]
+    else:
+        content = models.ScanResult.model_validate(scan_results).model_dump(by_alias=True)
+    return ORJSONResponse(content, headers=headers)
+
+@router.post("/batch", response_model=models.ScanJob, status_code=status.HTTP_202_ACCEPTED)
+async def start_batch_scan(batch_request: models.ScanBatchRequest, current_user = Depends(get_current_active_user)):
+    """Queue one job scanning several projects (or all of them) on a shared browser"""
+    user_id = ObjectId(current_user["_id"])
+    if batch_request.allProjects:
+        query = {"userId": user_id}
+    else:
+        try:
+            # dict.fromkeys drops duplicates, keeping the requested order
+            p_ids = list(dict.fromkeys(ObjectId(project_id) for project_id in batch_request.projectIds))
+        except Exception:
+            raise HTTPException(status_code=400, detail="Invalid project ID format")
+        query = {"_id": {"$in": p_ids}, "userId": user_id}
+
+    projects = await projects_collection.find(query, {"url": 1}).to_list(None)
+    if not projects:
+        raise HTTPException(status_code=404, detail="No projects found")
+    if not batch_request.allProjects and len(projects) != len(p_ids):
+        found = {project["_id"] for project in projects}
+        missing = ", ".join(str(p_id) for p_id in p_ids if p_id not in found)
+        raise HTTPException(status_code=404, detail=f"Projects not found: {missing}")
+    if len(projects) > settings.batch_max_projects:
+        raise HTTPException(status_code=400, detail=f"A batch can scan at most {settings.batch_max_projects} projects")
+
+    if await count_recent_jobs(user_id) + len(projects) > settings.scan_rate_limit_per_hour:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Scan limit reached ({settings.scan_rate_limit_per_hour} per hour). Please try again later."
+        )
+
+    job = await scan_job_scheduler.submit_batch(projects, user_id)
+    logger.info(f"Queued batch scan job {job['_id']} for {len(projects)} projects by user {current_user['email']}")
+    return job
+
+@router.post("/{project_id}", response_model=models.ScanJob, status_code=status.HTTP_202_ACCEPTED)
+async def start_new_scan(project_id: str, scan_request: Optional[models.ScanRequest] = None,
+                         current_user = Depends(get_current_active_user)):
+    """Queue a new accessibility scan (or site crawl) for a project and return the job immediately"""
     try:
         p_id = ObjectId(project_id)
     except Exception:
         raise HTTPException(status_code=400, detail="Invalid project ID format")
     
-    project = await projects_collection.find_one({"_id": p_id, "userId": ObjectId(current_user["_id"])})
+    user_id = ObjectId(current_user["_id"])
+    project = await find_owned_project(p_id, user_id)
     if not project:
         raise HTTPException(status_code=404, detail="Project not found")
 
+    if await count_recent_jobs(user_id) >= settings.scan_rate_limit_per_hour:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail=f"Scan limit reached ({settings.scan_rate_limit_per_hour} per hour). Please try again later."
+        )
+
+    scan_request = scan_request or models.ScanRequest()
+    options = crawl_options(scan_request) if scan_request.mode == "crawl" else None
+    job = await scan_job_scheduler.submit(project, user_id, scan_request.mode, options,
+                                          incremental=scan_request.incremental)
+    logger.info(f"Queued scan job {job['_id']} for project {project_id} by user {current_user['email']}")
+    return job
+
+async def get_owned_job(job_id: str, current_user) -> dict:
     try:
-        logger.info(f"Starting scan for project {project_id} by user {current_user['email']}")
-        
-        # Run scanner in thread pool
-        loop = asyncio.get_event_loop()
-        scan_data = await loop.run_in_executor(None, scan_website, project["url"], project_id)
-            
-    except Exception as e:
-        logger.error(f"Scan failed for project {project_id}: {str(e)}")
-        error_msg = sanitize_error_message(e)
-        raise HTTPException(status_code=400, detail=f"Scan failed: {error_msg}")
-
-    # Use calculated score from scanner, or fallback to simple calculation
-    score = scan_data.get("score", max(0, 100 - (len(scan_data["issues"]) * 2)))
-
-    result_to_save = {
-        "projectId": p_id,
-        "scanType": "live",
-        "accessibilityScore": score,
-        "issues": scan_data["issues"],
-        "genericSuggestions": scan_data["genericSuggestions"],
-        "aiSuggestions": scan_data["aiSuggestions"],
-        "screenshotUrl": scan_data["screenshot_url"],
-        "createdAt": datetime.now(timezone.utc)
-    }
-
-    new_result = await scan_results_collection.insert_one(result_to_save)
-    created_result = await scan_results_collection.find_one({"_id": new_result.inserted_id})
-    
-    logger.info(f"Scan completed for project {project_id}: Score {score}")
-    return created_result
+        j_id = ObjectId(job_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+
+    job = await scan_jobs_collection.find_one({"_id": j_id, "userId": ObjectId(current_user["_id"])})
+    if not job:
+        raise HTTPException(status_code=404, detail="Scan job not found")
+    return job
+
+@router.get("/jobs/{job_id}", response_model=models.ScanJob)
+async def get_scan_job(job_id: str, current_user = Depends(get_current_active_user)):
+    return await get_owned_job(job_id, current_user)
+
+@router.get("/jobs/{job_id}/events")
+async def stream_scan_job(job_id: str, current_user = Depends(get_current_active_user)):
+    """Server-sent events: one `progress` event per stage until the job finishes"""
+    job = await get_owned_job(job_id, current_user)
+
+    async def event_stream():
+        subscriber = scan_job_scheduler.subscribe(job["_id"])
+        try:
+            seen = 0
+            current = job
+            while True:
+                # Replay stages from the stored document (covers anything published
+                # before we subscribed, or by another app process), then wait for more
+                current = await scan_jobs_collection.find_one({"_id": job["_id"]}) or current
+                for stage in current["stages"][seen:]:
+                    yield f"event: progress\ndata: {json.dumps(stage_event(current, stage))}\n\n"
+                seen = len(current["stages"])
+                if current["status"] in TERMINAL_STAGES:
+                    return
+                try:
+                    await asyncio.wait_for(subscriber.get(), timeout=5)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+        finally:
+            scan_job_scheduler.unsubscribe(job["_id"], subscriber)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @router.get("/results/{result_id}", response_model=models.ScanResult)
-async def get_scan_result(result_id: str, current_user = Depends(get_current_active_user)):
-    scan_result = await scan_results_collection.find_one({"_id": ObjectId(result_id)})
+async def get_scan_result(result_id: str, request: Request, current_user = Depends(get_current_active_user)):
+    # Ownership and the ETag need only the project id; the full document is loaded unless it's a 304
+    scan_result = await scan_results_collection.find_one({"_id": ObjectId(result_id)}, {"projectId": 1})
+    if not scan_result:
+        raise HTTPException(status_code=404, detail="Scan result not found")
+
+    project = await find_owned_project(scan_result["projectId"], ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=403, detail="Not authorized to view this scan result")
+
+    headers = {"ETag": f'"{scan_result["_id"]}"', **RESULT_CACHE_HEADERS}
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    scan_result = await scan_results_collection.find_one({"_id": scan_result["_id"]})
+    if not scan_result:
+        raise HTTPException(status_code=404, detail="Scan result not found")
+    return scan_result_response(scan_result, headers)
+
+@router.get("/results/{result_id}/issues", response_model=models.ScanIssuePage)
+async def get_scan_issues(
+    result_id: str,
+    rule: Optional[str] = None,
+    severity: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=200),
+    current_user = Depends(get_current_active_user),
+):
+    """Issue samples of a scan result, a page at a time, optionally for one rule or severity"""
+    scan_result = await scan_results_collection.find_one({"_id": ObjectId(result_id)}, {"projectId": 1, "issues": 1})
+    if not scan_result:
+        raise HTTPException(status_code=404, detail="Scan result not found")
+
+    project = await find_owned_project(scan_result["projectId"], ObjectId(current_user["_id"]))
+    if not project:
+        raise HTTPException(status_code=403, detail="Not authorized to view this scan result")
+
+    if "issues" in scan_result:
+        # Saved before issues had their own collection: page through the embedded list by offset
+        try:
+            offset = int(cursor) if cursor else 0
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        if offset < 0:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        issues = [issue for issue in scan_result["issues"]
+                  if (not rule or issue["guideline"] == rule) and (not severity or issue.get("severity") == severity)]
+        next_cursor = str(offset + limit) if len(issues) > offset + limit else None
+        return {"items": issues[offset:offset + limit], "nextCursor": next_cursor}
+
+    try:
+        after = ObjectId(cursor) if cursor else None
+    except InvalidId:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    # Keyset pagination on the scanId indexes of scan_issues
+    issues = await find_issues(scan_result["_id"], rule, severity, after, limit + 1)
+    next_cursor = str(issues[limit - 1]["_id"]) if len(issues) > limit else None
+    return {"items": issues[:limit], "nextCursor": next_cursor}
+
+@router.get("/results/{result_id}/pages", response_model=List[models.ScanResult])
+async def get_crawl_pages(result_id: str, current_user = Depends(get_current_active_user)):
+    """Per-page results belonging to a site crawl"""
+    scan_result = await scan_results_collection.find_one({"_id": ObjectId(result_id)}, {"projectId": 1})
     if not scan_result:
         raise HTTPException(status_code=404, detail="Scan result not found")
 
-    project = await projects_collection.find_one({
-        "_id": scan_result["projectId"],
-        "userId": ObjectId(current_user["_id"])
-    })
+    project = await find_owned_project(scan_result["projectId"], ObjectId(current_user["_id"]))
     if not project:
         raise HTTPException(status_code=403, detail="Not authorized to view this scan result")
 
-    return scan_result
+    return scan_result_response(await scan_results_collection.find({"parentScanId": scan_result["_id"]}).to_list(None))
 
 @router.delete("/results/{result_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_scan_result(result_id: str, current_user = Depends(get_current_active_user)):
@@ -77,13 +219,20 @@ async def delete_scan_result(result_id: str, current_user = Depends(get_current_
         raise HTTPException(status_code=404, detail="Scan result not found")
 
     # Security Check: Verify the user owns the project this scan belongs to
-    project = await projects_collection.find_one({
-        "_id": scan_result["projectId"],
-        "userId": ObjectId(current_user["_id"])
-    })
+    project = await find_owned_project(scan_result["projectId"], ObjectId(current_user["_id"]))
     if not project:
         raise HTTPException(status_code=403, detail="Not authorized to delete this scan result")
 
-    # Delete the scan result
-    await scan_results_collection.delete_one({"_id": ObjectId(result_id)})
+    # Delete the scan result (and its per-page results if it was a crawl)
+    pages = await scan_results_collection.find({"parentScanId": ObjectId(result_id)}, {"screenshotUrl": 1}).to_list(None)
+    await scan_results_collection.delete_many({"parentScanId": ObjectId(result_id)})
+    deleted = await scan_results_collection.delete_one({"_id": ObjectId(result_id)})
+    await delete_fingerprints([scan_result["_id"]])
+    await delete_issues([scan_result["_id"]] + [p["_id"] for p in pages])
+    await release_screenshots(scan_results_collection, [scan_result["screenshotUrl"]] + [p["screenshotUrl"] for p in pages])
+    if not scan_result.get("parentScanId"):
+        # Only the request that actually deleted it takes the scan out of the trend buckets
+        if deleted.deleted_count:
+            await forget_scan(project, scan_result)
+        await rebuild_rollup(project)
     return
\ No newline at end of file
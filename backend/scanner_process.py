@@ -1,32 +1,158 @@
 """
 Standalone scanner script that runs in a separate process.
 This avoids asyncio event loop conflicts on Windows.
+
+Run with --worker to keep a browser warm and serve scan requests over
+stdin/stdout as length-prefixed frames (see services/framing.py and
+services/scanner_pool.py).
 """
 import sys
 import json
-from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeout
-from bs4 import BeautifulSoup
-from urllib.parse import urljoin
+import asyncio
+from playwright.async_api import async_playwright, TimeoutError as PlaywrightTimeout
 import os
-import requests
-import colorsys
-import textstat
-from io import BytesIO
-from PIL import Image
-
-# Ensure screenshots directory exists
-os.makedirs("screenshots", exist_ok=True)
-
-# AI Model Setup (lazy load to save memory)
-processor = None
-model = None
-
-def load_ai_model():
-    global processor, model
-    if processor is None:
-        from transformers import BlipProcessor, BlipForConditionalGeneration
-        processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base")
+import hashlib
+import time
+from contextlib import contextmanager
+from urllib.parse import urlparse
+from services.contrast import (
+    AA_NORMAL, parse_ratio, suggest_background,
+    suggest_foreground,
+)
+from services.crawler import CrawlScope, crawl_site, aggregate_site_results
+from services.captioner import Captioner
+from services.image_fetcher import ImageFetcher
+from services.framing import read_frame, write_frame
+from services.http_cache import HttpCache
+from services.readability import ReadabilityScorer, readability_suggestions, text_blocks
+from services.result_builder import ResultBuilder, fit_result
+from services.scan_profile import ResourceBlocker, wait_until_settled
+from services.screenshot_store import ScreenshotStore, PLACEHOLDER_URL
+
+
+# Worker settings; the pool passes overrides from config.Settings on the command line
+WORKER_OPTIONS = {
+    "caption_cache_dir": "caption_cache",
+    "captioner_threads": 0,
+    "captioner_quantize": False,
+    "captioner_batch_size": 8,
+    "captioner_batch_wait_ms": 25,
+    "alt_text_max_images": 5,
+    "image_max_bytes": 5_000_000,
+    "image_fetch_timeout": 10,
+    "image_fetch_concurrency": 8,
+    "screenshot_format": "webp",
+    "screenshot_quality": 80,
+    "thumbnail_width": 320,
+    "max_issue_samples": 20,
+    "max_snippet_chars": 300,
+    "max_result_bytes": 1_000_000,
+    "block_categories": ["analytics", "ads", "media"],
+    "settle_max_ms": 5000,
+    "settle_quiet_ms": 300,
+    "readability_char_budget": 20_000,
+    "http_cache_dir": "http_cache",
+    "http_cache_max_bytes": 500_000_000,
+}
+
+# The fixed post-navigation sleep the settle wait replaced, for the saved-time stat
+FIXED_SETTLE_MS = 2000
+
+class StageTimer:
+    """Accumulates wall-clock milliseconds per scan stage"""
+
+    def __init__(self):
+        self.timings = {}
+
+    @contextmanager
+    def __call__(self, stage):
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            elapsed = round((time.monotonic() - start) * 1000)
+            self.timings[stage] = self.timings.get(stage, 0) + elapsed
+
+def worker_stats():
+    """Cumulative cache counters for this worker, sent with every response"""
+    contrast_cache = suggest_foreground.cache_info()
+    stats = {"contrastHits": contrast_cache.hits, "contrastMisses": contrast_cache.misses,
+             "readabilityHits": readability_scorer.hits, "readabilityMisses": readability_scorer.misses}
+    if http_cache is not None:
+        stats.update(http_cache.stats())
+    if captioner is not None:
+        stats.update(captionHits=captioner.hits, captionMisses=captioner.misses,
+                     captionerLoadMs=round(captioner.load_seconds * 1000) if captioner.load_seconds else None)
+    return stats
+
+# AI Model Setup: loaded lazily, then kept for the life of the process
+captioner = None
+
+# Readability grades by text hash, shared by every scan in this worker
+readability_scorer = ReadabilityScorer()
+
+def get_captioner():
+    global captioner
+    if captioner is None:
+        captioner = Captioner(
+            cache_dir=WORKER_OPTIONS["caption_cache_dir"],
+            threads=WORKER_OPTIONS["captioner_threads"],
+            quantize=WORKER_OPTIONS["captioner_quantize"],
+            batch_size=WORKER_OPTIONS["captioner_batch_size"],
+            batch_wait_ms=WORKER_OPTIONS["captioner_batch_wait_ms"],
+        )
+    return captioner
+
+screenshot_store = None
+
+def get_screenshot_store():
+    global screenshot_store
+    if screenshot_store is None:
+        screenshot_store = ScreenshotStore(
+            image_format=WORKER_OPTIONS["screenshot_format"],
+            quality=WORKER_OPTIONS["screenshot_quality"],
+            thumbnail_width=WORKER_OPTIONS["thumbnail_width"],
+        )
+    return screenshot_store
+
+http_cache = None
+
+def get_http_cache():
+    """The shared subresource cache, or None when it's disabled"""
+    global http_cache
+    if http_cache is None and WORKER_OPTIONS["http_cache_max_bytes"] > 0:
+        http_cache = HttpCache(WORKER_OPTIONS["http_cache_dir"], WORKER_OPTIONS["http_cache_max_bytes"])
+    return http_cache
+
+image_fetcher = None
+
+def get_image_fetcher():
+    global image_fetcher
+    if image_fetcher is None:
+        image_fetcher = ImageFetcher(
+            max_bytes=WORKER_OPTIONS["image_max_bytes"],
+            timeout=WORKER_OPTIONS["image_fetch_timeout"],
+            max_connections=WORKER_OPTIONS["image_fetch_concurrency"],
+        )
+    return image_fetcher
+
+# axe-core is bundled and pinned so results don't depend on a CDN or drift between versions
+AXE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "axe.min.js")
+AXE_VERSION = "4.10.3"
+AXE_SHA256 = "880970c081707360e64f34cea25ff91892f5bc95675b0776925b9709dd8a68bb"
+_axe_source = None
+
+def load_axe_source():
+    """Read the bundled axe-core once per process and check it is the pinned build"""
+    global _axe_source
+    if _axe_source is None:
+        with open(AXE_PATH, "rb") as f:
+            data = f.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if digest != AXE_SHA256:
+            raise RuntimeError(f"Bundled axe-core does not match the pinned v{AXE_VERSION} build (sha256 {digest})")
+        _axe_source = data.decode("utf-8")
+    return _axe_source
 
 # Suggestion map with severity levels
 SUGGESTION_MAP = {
@@ -51,202 +177,513 @@ SUGGESTION_MAP = {
     "duplicate-id": {"text": "Fix: Ensure every id attribute is unique.", "severity": "minor", "points": 2},
 }
 
-def hex_to_rgb(hex_color):
-    hex_color = hex_color.lstrip('#')
-    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
-
-def rgb_to_hex(rgb):
-    return '#{:02x}{:02x}{:02x}'.format(int(rgb[0] * 255), int(rgb[1] * 255), int(rgb[2] * 255))
-
-def get_relative_luminance(rgb):
-    r, g, b = [x / 255.0 for x in rgb]
-    def srgb_to_linear(c):
-        return c / 12.92 if c <= 0.03928 else ((c + 0.055) / 1.055) ** 2.4
-    return 0.2126 * srgb_to_linear(r) + 0.7152 * srgb_to_linear(g) + 0.0722 * srgb_to_linear(b)
-
-def get_contrast_ratio(rgb1, rgb2):
-    l1 = get_relative_luminance(rgb1)
-    l2 = get_relative_luminance(rgb2)
-    return (l1 + 0.05) / (l2 + 0.05) if l1 > l2 else (l2 + 0.05) / (l1 + 0.05)
-
-def suggest_contrast_fix(fg_hex, bg_hex):
-    fg_rgb = hex_to_rgb(fg_hex)
-    bg_rgb = hex_to_rgb(bg_hex)
-    fg_h, fg_l, fg_s = colorsys.rgb_to_hls(fg_rgb[0]/255, fg_rgb[1]/255, fg_rgb[2]/255)
-    bg_l = colorsys.rgb_to_hls(bg_rgb[0]/255, bg_rgb[1]/255, bg_rgb[2]/255)[1]
-    step = 0.01 if bg_l < 0.5 else -0.01
-    new_fg_l = fg_l
-    for _ in range(100):
-        new_fg_l = max(0, min(1, new_fg_l + step))
-        new_fg_rgb_norm = colorsys.hls_to_rgb(fg_h, new_fg_l, fg_s)
-        new_fg_rgb = (new_fg_rgb_norm[0] * 255, new_fg_rgb_norm[1] * 255, new_fg_rgb_norm[2] * 255)
-        if get_contrast_ratio(new_fg_rgb, bg_rgb) >= 4.5:
-            return rgb_to_hex(new_fg_rgb_norm)
-    return None
-
-def generate_alt_text(image_url):
+def suggest_contrast_fix(fg_hex, bg_hex, ratio=AA_NORMAL):
+    return suggest_foreground(fg_hex.lower(), bg_hex.lower(), ratio)
+
+# Resolve every image-alt target to its src in one round trip
+IMAGE_SOURCES_JS = """(selectors) => selectors.map(selector => {
+    try {
+        const el = document.querySelector(selector);
+        const src = el && el.getAttribute('src');
+        return src ? { src, url: el.currentSrc || new URL(src, document.baseURI).href } : null;
+    } catch (e) {
+        return null;
+    }
+})"""
+
+# Rules whose AI suggestions are expensive and depend only on the element itself
+REUSABLE_RULES = ("image-alt", "color-contrast")
+
+def element_key(rule, html):
+    return hashlib.sha1(f"{rule}\0{html}".encode("utf-8")).hexdigest()[:16]
+
+# Hash of the rendered DOM without scripts, styles, comments and nonces, so
+# per-request noise doesn't make an unchanged page look different (cyrb53)
+DOM_HASH_JS = """() => {
+    const root = document.documentElement.cloneNode(true);
+    root.querySelectorAll('script, style, noscript, template').forEach(el => el.remove());
+    root.querySelectorAll('[nonce]').forEach(el => el.removeAttribute('nonce'));
+    const walker = document.createTreeWalker(root, NodeFilter.SHOW_COMMENT);
+    const comments = [];
+    while (walker.nextNode()) comments.push(walker.currentNode);
+    comments.forEach(c => c.remove());
+    const text = root.outerHTML.replace(/\\s+/g, ' ');
+    let h1 = 0xdeadbeef, h2 = 0x41c6ce57;
+    for (let i = 0; i < text.length; i++) {
+        const ch = text.charCodeAt(i);
+        h1 = Math.imul(h1 ^ ch, 2654435761);
+        h2 = Math.imul(h2 ^ ch, 1597334677);
+    }
+    h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507) ^ Math.imul(h2 ^ (h2 >>> 13), 3266489909);
+    h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507) ^ Math.imul(h1 ^ (h1 >>> 13), 3266489909);
+    return (h2 >>> 0).toString(16).padStart(8, '0') + (h1 >>> 0).toString(16).padStart(8, '0');
+}"""
+
+def first_selector(node):
+    target = node.get("target") or [None]
+    # Targets inside iframes / shadow DOM are lists of selectors; skip those
+    return target[0] if isinstance(target[0], str) else None
+
+async def generate_alt_texts(page, nodes, responses, timer=None):
+    """Alt text for the first few image-alt nodes: {selector: (src, alt_text)}.
+
+    Images are fetched concurrently (reusing bytes the page already loaded)
+    and captioned together in one batch.
+    """
+    selectors = list(dict.fromkeys(filter(None, (first_selector(node) for node in nodes))))
+    if not selectors:
+        return {}
     try:
-        load_ai_model()
-        response = requests.get(image_url, stream=True, timeout=10)
-        response.raise_for_status()
-        raw_image = Image.open(BytesIO(response.content)).convert("RGB")
-        inputs = processor(raw_image, return_tensors="pt")
-        out = model.generate(**inputs, max_new_tokens=50)
-        return processor.decode(out[0], skip_special_tokens=True)
-    except:
-        return ""
+        sources = await page.evaluate(IMAGE_SOURCES_JS, selectors)
+    except Exception:
+        return {}
+    candidates = [(selector, src) for selector, src in zip(selectors, sources) if src]
+    candidates = candidates[:WORKER_OPTIONS["alt_text_max_images"]]
 
-def scan(url, project_id):
-    with sync_playwright() as p:
-        browser = p.chromium.launch(
-            headless=True,
-            args=['--disable-blink-features=AutomationControlled', '--no-sandbox']
-        )
-        context = browser.new_context(
-            user_agent='Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-            viewport={'width': 1920, 'height': 1080},
-            ignore_https_errors=True
-        )
-        page = context.new_page()
-        
-        try:
-            page.goto(url, wait_until="domcontentloaded", timeout=30000)
-            page.wait_for_timeout(2000)
-        except PlaywrightTimeout:
-            raise RuntimeError("Timeout loading page")
-        
-        html_content = page.content()
-        
-        # Inject Axe using URL to bypass CSP
-        try:
-            page.add_script_tag(url="https://cdnjs.cloudflare.com/ajax/libs/axe-core/4.7.2/axe.min.js")
-            page.wait_for_function("typeof axe !== 'undefined'", timeout=5000)
-        except Exception:
-            # Fallback: return basic scan without Axe
-            context.close()
-            browser.close()
-            return {
-                "issues": [],
-                "genericSuggestions": ["Website security policies prevented full scan"],
-                "aiSuggestions": [],
-                "screenshot_url": screenshot_path
-            }
-        
-        # Run scan
+    timer = timer or StageTimer()
+    with timer("image_fetch"):
+        images = await get_image_fetcher().fetch_many([src["url"] for _, src in candidates], responses)
+
+    async def caption(data):
+        if data is None:
+            return ""
         try:
-            axe_results = page.evaluate("axe.run(document, { iframes: true })")
+            return await get_captioner().caption(data)
         except Exception:
-            axe_results = {"violations": []}
-        
-        # Screenshot
-        screenshot_path = f"screenshots/{project_id}.png"
-        try:
-            page.screenshot(path=screenshot_path, full_page=True)
-        except:
-            screenshot_path = "screenshots/placeholder.png"
-        
-        # Process results with scoring
-        issues, generic_suggestions, ai_suggestions = [], [], []
-        total_deductions = 0
-        
+            return ""
+
+    with timer("captioning"):
+        alt_texts = await asyncio.gather(*(caption(images[src["url"]]) for _, src in candidates))
+    return {selector: (src["src"], alt_text) for (selector, src), alt_text in zip(candidates, alt_texts)}
+
+BROWSER_ARGS = ['--disable-blink-features=AutomationControlled', '--no-sandbox']
+
+CONTEXT_OPTIONS = {
+    "user_agent": 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    "viewport": {'width': 1920, 'height': 1080},
+    "ignore_https_errors": True,
+}
+
+async def launch_browser(p):
+    return await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+
+def _no_progress(stage):
+    pass
+
+async def open_scan_context(browser):
+    """New browser context with resource blocking, the HTTP cache and axe preloaded.
+
+    Returns (context, blocker, cache session or None).
+    """
+    context = await browser.new_context(**CONTEXT_OPTIONS)
+    try:
+        # Route handlers run newest first: the blocker decides before the cache is consulted
+        cache = get_http_cache()
+        cache_session = await cache.install(context) if cache else None
+        blocker = ResourceBlocker(WORKER_OPTIONS["block_categories"])
+        await blocker.install(context)
+        # Init scripts run in every frame before page scripts and aren't subject to CSP
+        await context.add_init_script(script=load_axe_source())
+    except Exception:
+        await context.close()
+        raise
+    return context, blocker, cache_session
+
+async def scan_page(browser, url, project_id, progress=_no_progress, collect_links=False, previous=None,
+                    on_issues=None, scan_context=None):
+    """Scan a single page in a fresh, isolated browser context.
+
+    `progress` is called with a stage name as each stage completes. With
+    `on_issues`, issue samples are handed over in chunks as soon as axe's
+    results are grouped, and the result carries only their count
+    (`streamedIssues`) instead of the list. With
+    `collect_links` the result also carries the page's anchor hrefs.
+    `previous` (etag, lastModified, domHash, elementSuggestions of the last
+    scan) enables incremental mode: an unchanged page returns
+    {"unchanged": True} and unchanged elements reuse their AI suggestions.
+    A `scan_context` from open_scan_context is used instead of a fresh
+    context and left open, so sequential scans of one origin share its
+    connections and HTTP cache.
+    """
+    owned = scan_context is None
+    context, blocker, cache_session = await open_scan_context(browser) if owned else scan_context
+    blocked_before = blocker.stats()
+    cached_before = cache_session.stats() if cache_session else None
+    try:
+        timer = StageTimer()
+        with timer("total"):
+            result = await _scan_in_context(context, url, progress, previous or {}, timer, on_issues)
+        result["stageTimings"] = timer.timings
+        result["loadStats"] = {key: value - blocked_before[key] for key, value in blocker.stats().items()}
+        if "settle" in timer.timings:
+            result["loadStats"]["settleMs"] = timer.timings["settle"]
+            # A page slower to settle than the old fixed sleep saved nothing (it was just scanned more reliably)
+            result["loadStats"]["settleSavedMs"] = max(0, FIXED_SETTLE_MS - timer.timings["settle"])
+        if cache_session:
+            result["cacheStats"] = {key: value - cached_before[key] for key, value in cache_session.stats().items()}
+        if collect_links:
+            result["links"] = await _page_links(context.pages[0])
+        return result
+    finally:
+        if owned:
+            await context.close()
+        else:
+            for page in context.pages:
+                await page.close()
+
+async def _page_links(page):
+    try:
+        return await page.eval_on_selector_all("a[href]", "els => els.map(e => e.href)")
+    except Exception:
+        return []
+
+async def _not_modified(context, url, previous):
+    """Cheap conditional GET against the validators stored with the last scan"""
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("lastModified"):
+        headers["If-Modified-Since"] = previous["lastModified"]
+    if not headers:
+        return False
+    try:
+        response = await context.request.get(url, headers=headers, timeout=10000)
+        return response.status == 304
+    except Exception:
+        return False
+
+async def _scan_in_context(context, url, progress, previous, timer, on_issues):
+    with timer("conditional_get"):
+        not_modified = await _not_modified(context, url, previous)
+    if not_modified:
+        return {"unchanged": True, "reason": "not-modified"}
+
+    page = await context.new_page()
+    image_responses = ImageFetcher.track_responses(page)
+    
+    try:
+        with timer("navigation"):
+            response = await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+    except PlaywrightTimeout:
+        raise RuntimeError("Timeout loading page")
+    with timer("settle"):
+        await wait_until_settled(page, WORKER_OPTIONS["settle_max_ms"], WORKER_OPTIONS["settle_quiet_ms"])
+    progress("navigated")
+    
+    headers = response.headers if response else {}
+    page_state = {
+        "etag": headers.get("etag"),
+        "lastModified": headers.get("last-modified"),
+    }
+    with timer("dom_hash"):
+        page_state["domHash"] = await page.evaluate(DOM_HASH_JS)
+    if previous.get("domHash") and previous["domHash"] == page_state["domHash"]:
+        return {"unchanged": True, "reason": "same-dom", **page_state}
+    reusable = previous.get("elementSuggestions") or {}
+    
+    # Axe comes from the context init script; re-inject if the page clobbered it
+    try:
+        with timer("axe_inject"):
+            axe_version = await page.evaluate("typeof axe !== 'undefined' ? axe.version : null")
+            if axe_version != AXE_VERSION:
+                await page.evaluate(load_axe_source())
+                axe_version = await page.evaluate("typeof axe !== 'undefined' ? axe.version : null")
+        if axe_version != AXE_VERSION:
+            raise RuntimeError(f"Expected axe-core {AXE_VERSION}, page has {axe_version}")
+    except Exception:
+        # Fallback: return basic scan without Axe
+        return {
+            "issues": [],
+            "issueGroups": [],
+            "severityCounts": {},
+            "genericSuggestions": ["Website security policies prevented full scan"],
+            "aiSuggestions": [],
+            "screenshot_url": PLACEHOLDER_URL,
+            "thumbnail_url": PLACEHOLDER_URL,
+            **page_state,
+        }
+    
+    # Run scan
+    try:
+        with timer("axe_run"):
+            axe_results = await page.evaluate("axe.run(document, { iframes: true })")
+    except Exception:
+        axe_results = {"violations": []}
+    progress("axe_done")
+    
+    # Group the violations now, so streamed issues can be stored while the rest of the scan runs
+    with timer("issues"):
+        builder = ResultBuilder(WORKER_OPTIONS["max_issue_samples"], WORKER_OPTIONS["max_snippet_chars"])
+        streamed = 0
         for violation in axe_results.get("violations", []):
             vid = violation["id"]
             suggestion_info = SUGGESTION_MAP.get(vid, {"text": "Fix this accessibility issue.", "severity": "moderate", "points": 4})
-            
-            if vid in SUGGESTION_MAP:
-                generic_suggestions.append(f"Suggestion for '{vid}': {suggestion_info['text']}")
-            
+            generic = f"Suggestion for '{vid}': {suggestion_info['text']}" if vid in SUGGESTION_MAP else None
+            group = builder.add_violation(violation, suggestion_info["severity"], generic)
             for node in violation["nodes"]:
                 # Deduct points based on severity
-                total_deductions += suggestion_info['points']
-                
-                issues.append({
-                    "element": node["html"],
-                    "description": violation["description"],
-                    "guideline": vid
-                })
-                
+                builder.add_node(group, node, suggestion_info['points'])
+            if on_issues and len(builder.issues) > streamed:
+                on_issues(builder.issues[streamed:])
+                streamed = len(builder.issues)
+    
+    # Screenshot, stored compressed and content-addressed with a thumbnail
+    try:
+        with timer("screenshot"):
+            png = await page.screenshot(full_page=True)
+            screenshot = await asyncio.to_thread(get_screenshot_store().save, png)
+    except:
+        screenshot = {"screenshot_url": PLACEHOLDER_URL, "thumbnail_url": PLACEHOLDER_URL}
+    progress("screenshot")
+    
+    # Alt text for images missing it, fetched and captioned concurrently
+    image_alt_nodes = [
+        node for violation in axe_results.get("violations", []) if violation["id"] == "image-alt"
+        for node in violation["nodes"] if element_key("image-alt", node["html"]) not in reusable
+    ]
+    alt_texts = await generate_alt_texts(page, image_alt_nodes, image_responses, timer) if image_alt_nodes else {}
+    
+    # AI suggestions, with per-category counters
+    with timer("suggestions"):
+        element_suggestions = {}
+    
+        for violation in axe_results.get("violations", []):
+            vid = violation["id"]
+            for node in violation["nodes"]:
+                # Per-element suggestions are keyed so the next scan can reuse them
+                key = element_key(vid, node["html"]) if vid in REUSABLE_RULES else None
+                if key is not None and key in reusable:
+                    # Element unchanged since the last scan: reuse its suggestion
+                    for text in reusable[key]:
+                        builder.suggest(text)
+                    element_suggestions[key] = reusable[key]
+                    continue
+                suggestions_before = len(builder.ai_suggestions)
+            
                 # Generate REAL AI suggestions
-                if vid == "image-alt" and len([s for s in ai_suggestions if "Alt Text" in s]) < 5:
-                    try:
-                        img_element = page.locator(node["target"][0]).first
-                        img_src = img_element.get_attribute("src", timeout=2000)
-                        if img_src:
-                            full_img_url = urljoin(url, img_src)
-                            # Generate actual alt text using BLIP model
-                            alt_text = generate_alt_text(full_img_url)
-                            if alt_text:
-                                ai_suggestions.append(f"🤖 AI Generated Alt Text: '{alt_text}' (for {img_src[:40]}...)")
-                            else:
-                                ai_suggestions.append(f"🤖 AI Suggestion: Add descriptive alt text for '{img_src[:40]}...'")
-                    except Exception as e:
-                        ai_suggestions.append(f"🤖 AI Suggestion: Add descriptive alt text for this image")
-                
+                if vid == "image-alt":
+                    generated = alt_texts.get(first_selector(node))
+                    if generated:
+                        img_src, alt_text = generated
+                        if alt_text:
+                            builder.suggest(f"🤖 AI Generated Alt Text: '{alt_text}' (for {img_src[:40]}...)")
+                        else:
+                            builder.suggest(f"🤖 AI Suggestion: Add descriptive alt text for '{img_src[:40]}...'")
+            
                 elif vid == "color-contrast":
                     try:
                         data = node.get("any", [{}])[0].get("data", {})
                         fg_color = data.get("fgColor")
                         bg_color = data.get("bgColor")
                         if fg_color and bg_color:
-                            # Calculate actual fixed color
-                            new_color = suggest_contrast_fix(fg_color, bg_color)
+                            # axe reports 3:1 for large text, 4.5:1 otherwise
+                            ratio = parse_ratio(data.get("expectedContrastRatio"))
+                            new_color = suggest_contrast_fix(fg_color, bg_color, ratio)
+                            new_bg = suggest_background(fg_color.lower(), bg_color.lower(), ratio)
                             if new_color:
-                                ai_suggestions.append(f"🎨 AI Color Fix: Change text color from {fg_color} to {new_color} (meets WCAG AA 4.5:1 ratio)")
+                                fix = f"🎨 AI Color Fix: Change text color from {fg_color} to {new_color} (meets WCAG AA {ratio:g}:1 ratio)"
+                                if new_bg:
+                                    fix += f", or change the background from {bg_color} to {new_bg}"
+                                builder.suggest(fix)
+                            elif new_bg:
+                                builder.suggest(f"🎨 AI Color Fix: Change background color from {bg_color} to {new_bg} (meets WCAG AA {ratio:g}:1 ratio)")
                             else:
-                                ai_suggestions.append(f"🎨 AI Suggestion: Increase contrast between {fg_color} and {bg_color}")
-                    except Exception as e:
-                        ai_suggestions.append(f"🎨 AI Suggestion: Improve text color contrast")
-                
-                elif vid == "link-name" and len([s for s in ai_suggestions if "Link" in s]) < 3:
-                    ai_suggestions.append(f"🔗 AI Suggestion: Use descriptive link text (avoid 'click here', 'read more')")
-                
-                elif vid == "button-name" and len([s for s in ai_suggestions if "Button" in s]) < 3:
-                    ai_suggestions.append(f"🔘 AI Suggestion: Add clear, action-oriented button text")
-        
-        # Add Flesch readability analysis
+                                builder.suggest(f"🎨 AI Suggestion: Increase contrast between {fg_color} and {bg_color}")
+                    except Exception:
+                        builder.suggest("🎨 AI Suggestion: Improve text color contrast")
+            
+                elif vid == "link-name":
+                    builder.suggest("🔗 AI Suggestion: Use descriptive link text (avoid 'click here', 'read more')", "link", 3)
+            
+                elif vid == "button-name":
+                    builder.suggest("🔘 AI Suggestion: Add clear, action-oriented button text", "button", 3)
+            
+                if key is not None and len(builder.ai_suggestions) > suggestions_before:
+                    element_suggestions[key] = builder.ai_suggestions[suggestions_before:]
+    
+    # Add Flesch readability analysis over the page's visible text blocks
+    with timer("readability"):
         try:
-            soup = BeautifulSoup(html_content, "html.parser")
-            paragraphs = soup.find_all('p')
-            readability_checked = 0
-            for p in paragraphs:
-                if readability_checked >= 3:
-                    break
-                text = p.get_text().strip()
-                if len(text.split()) > 20:  # At least 20 words
-                    try:
-                        grade = textstat.flesch_kincaid_grade(text)
-                        if grade > 10:
-                            preview = text[:70] + '...' if len(text) > 70 else text
-                            ai_suggestions.append(f"📚 AI Readability Analysis: Text has grade level {grade:.1f} (college level). Simplify for broader audience: '{preview}'")
-                            readability_checked += 1
-                    except:
-                        pass
-        except:
+            blocks = await text_blocks(page, WORKER_OPTIONS["readability_char_budget"])
+            for suggestion in readability_suggestions(readability_scorer.grade_blocks(blocks)):
+                builder.suggest(suggestion)
+        except Exception:
             pass
-        
-        # Calculate score (100 - deductions, minimum 0)
-        score = max(0, 100 - total_deductions)
-        
-        # Always add at least one AI suggestion if there are issues
-        if len(issues) > 0 and len(ai_suggestions) == 0:
-            ai_suggestions.append("🤖 AI Tip: Focus on fixing critical issues first (image alt text, form labels, button names)")
-            ai_suggestions.append("🎨 AI Tip: Ensure sufficient color contrast (4.5:1 for normal text, 3:1 for large text)")
-            ai_suggestions.append("📚 AI Tip: Use semantic HTML elements (<main>, <nav>, <header>) for better structure")
-        
-        context.close()
-        browser.close()
-        
-        return {
-            "issues": issues,
-            "genericSuggestions": list(set(generic_suggestions)),
-            "aiSuggestions": ai_suggestions,
-            "screenshot_url": screenshot_path,
-            "score": score
-        }
+    
+    # Always add at least one AI suggestion if there are issues
+    if builder.issues and not builder.ai_suggestions:
+        builder.suggest("🤖 AI Tip: Focus on fixing critical issues first (image alt text, form labels, button names)")
+        builder.suggest("🎨 AI Tip: Ensure sufficient color contrast (4.5:1 for normal text, 3:1 for large text)")
+        builder.suggest("📚 AI Tip: Use semantic HTML elements (<main>, <nav>, <header>) for better structure")
+    progress("ai_suggestions")
+    
+    result = {
+        **builder.result(),
+        **screenshot,
+        "elementSuggestions": element_suggestions,
+        **page_state,
+    }
+    if on_issues:
+        # Already sent; the parent puts them back and fits the whole result
+        result["issues"] = []
+        result["streamedIssues"] = streamed
+    return fit_result(result, WORKER_OPTIONS["max_result_bytes"])
+
+async def _scan_once(url, project_id):
+    async with async_playwright() as p:
+        browser = await launch_browser(p)
+        try:
+            return await scan_page(browser, url, project_id)
+        finally:
+            await browser.close()
+
+async def crawl(browser, url, project_id, options, progress=_no_progress):
+    """Scan a site: discovered same-origin pages, several contexts at a time"""
+    scope = CrawlScope(url, options.get("include", []), options.get("exclude", []))
+
+    async def fetch_text(target):
+        context = await browser.new_context(**CONTEXT_OPTIONS)
+        try:
+            response = await context.request.get(target, timeout=10000)
+            return await response.text() if response.ok else None
+        except Exception:
+            return None
+        finally:
+            await context.close()
+
+    async def scan_one(page_url, index):
+        return await scan_page(browser, page_url, project_id, collect_links=True)
+
+    pages = await crawl_site(
+        url, scope, scan_one, fetch_text,
+        max_depth=options["max_depth"],
+        max_pages=options["max_pages"],
+        concurrency=options["concurrency"],
+        on_page=lambda page: progress("page_scanned"),
+    )
+    return fit_result(aggregate_site_results(pages), WORKER_OPTIONS["max_result_bytes"])
+
+def origin_groups(targets):
+    """Targets grouped by URL origin, in first-seen order"""
+    groups = {}
+    for target in targets:
+        parsed = urlparse(target["url"])
+        groups.setdefault(f"{parsed.scheme}://{parsed.netloc}".lower(), []).append(target)
+    return list(groups.values())
+
+async def scan_batch(browser, targets, concurrency, progress=_no_progress, on_result=None):
+    """Scan many projects' pages on one browser, up to `concurrency` origins at a time.
+
+    Pages of one origin are scanned one after another in a shared context.
+    `on_result(project_id, result)` gets each page's result (or {"error": ...})
+    as soon as it's done.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    counts = {"scanned": 0, "failed": 0}
+
+    async def scan_group(group):
+        async with semaphore:
+            scan_context = await open_scan_context(browser)
+            try:
+                for target in group:
+                    try:
+                        result = await scan_page(browser, target["url"], target["project_id"],
+                                                 scan_context=scan_context)
+                        counts["scanned"] += 1
+                    except Exception as e:
+                        result = {"error": str(e)}
+                        counts["failed"] += 1
+                    if on_result:
+                        on_result(target["project_id"], result)
+                    progress("project_scanned")
+            finally:
+                await scan_context[0].close()
+
+    await asyncio.gather(*(scan_group(group) for group in origin_groups(targets)))
+    return counts
+
+def scan(url, project_id):
+    """One-shot scan: launch a browser, scan a single page, tear everything down"""
+    return asyncio.run(_scan_once(url, project_id))
+
+# --- Worker mode: one warm browser serving many scans ---
+
+async def serve(protocol_out):
+    """Serve requests from the pool until stdin closes.
+
+    Requests:  {"id": 1, "cmd": "scan", "url": ..., "project_id": ..., "previous": {...}}
+               {"id": 1, "cmd": "crawl", "url": ..., "project_id": ..., "options": {...}}
+               {"id": 1, "cmd": "batch", "targets": [{"url": ..., "project_id": ...}], "concurrency": 4}
+               {"id": 2, "cmd": "ping"}
+    Responses: {"id": 1, "result": {...}, "stats": {...}}
+               {"id": 1, "error": {"type": "TimeoutError", "message": "..."}}
+    Events:    {"id": 1, "event": "progress", "stage": "navigated"}
+               {"id": 1, "event": "issues", "issues": [...]}  (scans only, in order)
+               {"id": 1, "event": "result", "project_id": ..., "result": {...}}  (batches only)
+    """
+    def send(message):
+        write_frame(protocol_out, message)
+
+    loop = asyncio.get_running_loop()
+    load_axe_source()
+    async with async_playwright() as p:
+        started = time.monotonic()
+        browser = await launch_browser(p)
+        send({"event": "ready", "browserLaunchMs": round((time.monotonic() - started) * 1000)})
+
+        while True:
+            request = await loop.run_in_executor(None, read_frame, sys.stdin.buffer)
+            if request is None:
+                break
+            request_id = request.get("id")
+            cmd = request.get("cmd")
+            try:
+                if cmd == "ping":
+                    if not browser.is_connected():
+                        raise RuntimeError("Browser disconnected")
+                    send({"id": request_id, "result": "pong", "stats": worker_stats()})
+                elif cmd in ("scan", "crawl"):
+                    def progress(stage, request_id=request_id):
+                        send({"id": request_id, "event": "progress", "stage": stage})
+                    if cmd == "scan":
+                        def on_issues(issues, request_id=request_id):
+                            send({"id": request_id, "event": "issues", "issues": issues})
+                        result = await scan_page(browser, request["url"], request["project_id"], progress,
+                                                 previous=request.get("previous"), on_issues=on_issues)
+                    else:
+                        result = await crawl(browser, request["url"], request["project_id"], request["options"], progress)
+                    send({"id": request_id, "result": result, "stats": worker_stats()})
+                elif cmd == "batch":
+                    def progress(stage, request_id=request_id):
+                        send({"id": request_id, "event": "progress", "stage": stage})
+                    def on_result(project_id, result, request_id=request_id):
+                        send({"id": request_id, "event": "result", "project_id": project_id, "result": result})
+                    result = await scan_batch(browser, request["targets"], request["concurrency"], progress, on_result)
+                    send({"id": request_id, "result": result, "stats": worker_stats()})
+                else:
+                    raise RuntimeError(f"Unknown command: {cmd}")
+            except Exception as e:
+                send({"id": request_id, "error": {"type": type(e).__name__, "message": str(e)}})
+
+        await browser.close()
+        await get_image_fetcher().close()
+
+def run_worker(options):
+    WORKER_OPTIONS.update(options)
+    # Keep the real stdout for the protocol and point fd 1 at stderr, so stray
+    # prints from transformers/torch/playwright can't corrupt the message stream
+    protocol_out = os.fdopen(os.dup(sys.stdout.fileno()), "wb")
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    asyncio.run(serve(protocol_out))
 
 if __name__ == "__main__":
+    if len(sys.argv) in (2, 3) and sys.argv[1] == "--worker":
+        run_worker(json.loads(sys.argv[2]) if len(sys.argv) == 3 else {})
+        sys.exit(0)
+
     if len(sys.argv) != 3:
-        print(json.dumps({"error": "Usage: scanner_process.py <url> <project_id>"}))
+        print(json.dumps({"error": "Usage: scanner_process.py <url> <project_id> | --worker [options-json]"}))
         sys.exit(1)
     
     url = sys.argv[1]
@@ -0,0 +1,197 @@
+"""
+Resident BLIP captioning service for scanner workers.
+
+The model is loaded once per worker process and kept for the worker's
+lifetime. Images requested by concurrent scans (crawl pages, batch scans)
+are micro-batched into a single `generate` call. Captions are cached on disk
+by image content hash, so the same logo or icon is never captioned twice,
+across scans, projects and workers.
+"""
+import asyncio
+import hashlib
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from typing import Dict, List, Optional, Tuple
+
+from PIL import Image
+
+MODEL_NAME = "Salesforce/blip-image-captioning-base"
+INPUT_SIZE = 384  # BLIP base resizes everything to 384x384
+
+def decode_image(data: bytes) -> Image.Image:
+    """Decode image bytes to an RGB image no larger than the model input"""
+    image = Image.open(BytesIO(data))
+    # JPEGs can be decoded straight at a reduced scale; a no-op for other formats
+    image.draft("RGB", (INPUT_SIZE, INPUT_SIZE))
+    image.thumbnail((INPUT_SIZE, INPUT_SIZE))
+    return image.convert("RGB")
+
+class CaptionCache:
+    """Captions keyed by image sha256: small in-memory LRU in front of files on disk"""
+
+    def __init__(self, directory: str, memory_entries: int = 1024):
+        self.directory = directory
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, digest: str) -> str:
+        return os.path.join(self.directory, digest[:2], f"{digest}.txt")
+
+    def get(self, digest: str) -> Optional[str]:
+        if digest in self._memory:
+            self._memory.move_to_end(digest)
+            return self._memory[digest]
+        try:
+            with open(self._path(digest), encoding="utf-8") as f:
+                caption = f.read()
+        except OSError:
+            return None
+        self._remember(digest, caption)
+        return caption
+
+    def put(self, digest: str, caption: str):
+        self._remember(digest, caption)
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write-then-rename so other workers never read a half-written caption
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(caption)
+        os.replace(tmp_path, path)
+
+    def _remember(self, digest: str, caption: str):
+        self._memory[digest] = caption
+        self._memory.move_to_end(digest)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+class Captioner:
+    """Loads BLIP once and captions images in micro-batches"""
+
+    def __init__(self, cache_dir: str = "caption_cache", threads: int = 0, quantize: bool = False,
+                 batch_size: int = 8, batch_wait_ms: int = 25, model_name: str = MODEL_NAME):
+        self.cache = CaptionCache(cache_dir)
+        self.threads = threads
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.batch_wait = batch_wait_ms / 1000
+        self.model_name = model_name
+        self.hits = 0
+        self.misses = 0
+        self.load_seconds = None
+        self._processor = None
+        self._model = None
+        self._load_lock = threading.Lock()
+        # One inference thread: torch parallelises inside each call already
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="blip")
+        self._pending: List[Tuple[str, bytes, asyncio.Future]] = []
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    def load(self):
+        """Load the model (once); safe to call from any thread"""
+        with self._load_lock:
+            if self._model is not None:
+                return
+            import torch
+            from transformers import BlipProcessor, BlipForConditionalGeneration
+
+            started = time.monotonic()
+            if self.threads:
+                torch.set_num_threads(self.threads)
+            processor = BlipProcessor.from_pretrained(self.model_name)
+            model = BlipForConditionalGeneration.from_pretrained(self.model_name)
+            model.eval()
+            if self.quantize:
+                # Dynamic int8 quantization of the Linear layers: smaller and faster on CPU
+                model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+            self._processor, self._model = processor, model
+            self.load_seconds = time.monotonic() - started
+
+    def caption_images(self, images: List[Image.Image]) -> List[str]:
+        """Caption a batch of decoded images in one generate call (blocking)"""
+        self.load()
+        import torch
+
+        with torch.inference_mode():
+            inputs = self._processor(images=images, return_tensors="pt")
+            out = self._model.generate(**inputs, max_new_tokens=50)
+        return [self._processor.decode(tokens, skip_special_tokens=True).strip() for tokens in out]
+
+    def caption_bytes(self, data: bytes) -> str:
+        """Caption one image synchronously, going through the cache"""
+        digest = hashlib.sha256(data).hexdigest()
+        cached = self.cache.get(digest)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        self.misses += 1
+        caption = self.caption_images([decode_image(data)])[0]
+        self.cache.put(digest, caption)
+        return caption
+
+    async def caption(self, data: bytes) -> str:
+        """Caption one image; concurrent callers are batched together"""
+        digest = hashlib.sha256(data).hexdigest()
+        cached = self.cache.get(digest)
+        if cached is not None:
+            self.hits += 1
+            return cached
+        if digest in self._inflight:
+            # The same image is already being captioned for another scan
+            self.hits += 1
+            return await asyncio.shield(self._inflight[digest])
+
+        self.misses += 1
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._inflight[digest] = future
+        self._pending.append((digest, data, future))
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_wait, self._flush)
+        return await asyncio.shield(future)
+
+    def _flush(self):
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        while self._pending:
+            batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[Tuple[str, bytes, asyncio.Future]]):
+        images, waiting = [], []
+        for digest, data, future in batch:
+            try:
+                images.append(decode_image(data))
+                waiting.append((digest, future))
+            except Exception as e:
+                self._inflight.pop(digest, None)
+                future.set_exception(e)
+        if not images:
+            return
+
+        loop = asyncio.get_running_loop()
+        try:
+            captions = await loop.run_in_executor(self._executor, self.caption_images, images)
+        except Exception as e:
+            for digest, future in waiting:
+                self._inflight.pop(digest, None)
+                future.set_exception(e)
+            return
+
+        for (digest, future), caption in zip(waiting, captions):
+            self._inflight.pop(digest, None)
+            try:
+                self.cache.put(digest, caption)
+            except OSError:
+                pass
+            future.set_result(caption)
@@ -0,0 +1,103 @@
+"""
+Colour contrast fixes for color-contrast violations.
+
+WCAG contrast only depends on relative luminance, so the luminance a fixed
+colour needs against the other one follows directly from the target ratio.
+The lightness that reaches it is then found by bisection over HLS lightness
+(hue and saturation are kept, and luminance is monotonic in lightness).
+Results are memoized per (fg, bg, target) for the worker's lifetime, since
+the same colour pairs repeat across nodes, pages and scans.
+"""
+import colorsys
+from functools import lru_cache
+from typing import Optional, Tuple
+
+AA_NORMAL = 4.5
+AA_LARGE = 3.0
+AAA_NORMAL = 7.0
+AAA_LARGE = 4.5
+
+# Bisection steps; 2^-16 of the lightness range is well below one 8-bit step
+SEARCH_STEPS = 16
+
+def hex_to_rgb(hex_color: str) -> Tuple[int, int, int]:
+    hex_color = hex_color.lstrip('#')
+    if len(hex_color) == 3:
+        hex_color = "".join(c * 2 for c in hex_color)
+    return tuple(int(hex_color[i:i+2], 16) for i in (0, 2, 4))
+
+def rgb_to_hex(rgb) -> str:
+    """Hex for an RGB triple with 0-1 channels"""
+    return '#{:02x}{:02x}{:02x}'.format(*(round(min(1, max(0, c)) * 255) for c in rgb))
+
+def _linear(channel: float) -> float:
+    return channel / 12.92 if channel <= 0.03928 else ((channel + 0.055) / 1.055) ** 2.4
+
+def relative_luminance(rgb) -> float:
+    """Relative luminance of an RGB triple with 0-255 channels"""
+    r, g, b = (_linear(c / 255.0) for c in rgb)
+    return 0.2126 * r + 0.7152 * g + 0.0722 * b
+
+def contrast_ratio(rgb1, rgb2) -> float:
+    l1, l2 = relative_luminance(rgb1), relative_luminance(rgb2)
+    return (max(l1, l2) + 0.05) / (min(l1, l2) + 0.05)
+
+def parse_ratio(value, default: float = AA_NORMAL) -> float:
+    """Target ratio from axe's expectedContrastRatio ("4.5:1"), or the default"""
+    try:
+        return float(str(value).split(":")[0])
+    except (TypeError, ValueError):
+        return default
+
+def target_luminance(fixed_luminance: float, ratio: float, lighter: bool) -> Optional[float]:
+    """Luminance a colour needs to reach `ratio` against one of `fixed_luminance`"""
+    if lighter:
+        target = ratio * (fixed_luminance + 0.05) - 0.05
+        return target if target <= 1 else None
+    target = (fixed_luminance + 0.05) / ratio - 0.05
+    return target if target >= 0 else None
+
+def _luminance_at(h: float, lightness: float, s: float) -> float:
+    return relative_luminance([c * 255 for c in colorsys.hls_to_rgb(h, lightness, s)])
+
+def _solve(rgb, fixed_rgb, ratio: float, lighter: bool) -> Optional[str]:
+    """Closest colour with rgb's hue and saturation that reaches `ratio` against fixed_rgb"""
+    target = target_luminance(relative_luminance(fixed_rgb), ratio, lighter)
+    if target is None:
+        return None
+    h, lightness, s = colorsys.rgb_to_hls(*(c / 255 for c in rgb))
+
+    # Invariant: `lo` misses the target, `hi` meets it
+    lo, hi = lightness, (1.0 if lighter else 0.0)
+    reached = (lambda lum: lum >= target) if lighter else (lambda lum: lum <= target)
+    if not reached(_luminance_at(h, hi, s)):
+        return None
+    for _ in range(SEARCH_STEPS):
+        mid = (lo + hi) / 2
+        if reached(_luminance_at(h, mid, s)):
+            hi = mid
+        else:
+            lo = mid
+
+    # Rounding to 8 bits can land just short of the ratio; step on until it holds
+    step = 1 / 255 if lighter else -1 / 255
+    while True:
+        candidate = rgb_to_hex(colorsys.hls_to_rgb(h, hi, s))
+        if contrast_ratio(hex_to_rgb(candidate), fixed_rgb) >= ratio or hi in (0.0, 1.0):
+            return candidate
+        hi = min(1.0, max(0.0, hi + step))
+
+def _fix(rgb, fixed_rgb, ratio: float) -> Optional[str]:
+    # Move away from the fixed colour first, the way that needs the smaller change
+    lighter = relative_luminance(rgb) >= relative_luminance(fixed_rgb)
+    return _solve(rgb, fixed_rgb, ratio, lighter) or _solve(rgb, fixed_rgb, ratio, not lighter)
+
+@lru_cache(maxsize=4096)
+def suggest_foreground(fg_hex: str, bg_hex: str, ratio: float = AA_NORMAL) -> Optional[str]:
+    """Text colour reaching `ratio` on bg_hex, keeping fg_hex's hue"""
+    return _fix(hex_to_rgb(fg_hex), hex_to_rgb(bg_hex), ratio)
+
+@lru_cache(maxsize=4096)
+def suggest_background(fg_hex: str, bg_hex: str, ratio: float = AA_NORMAL) -> Optional[str]:
+    """Background colour reaching `ratio` behind fg_hex, keeping bg_hex's hue"""
+    return _fix(hex_to_rgb(bg_hex), hex_to_rgb(fg_hex), ratio)
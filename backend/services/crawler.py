@@ -0,0 +1,188 @@
+"""
+Site crawl mode: discover same-origin pages and scan them concurrently.
+
+Runs inside a scanner worker. Pages are discovered from sitemap.xml and
+in-page anchors, breadth first, bounded by depth, page count and URL
+patterns; every candidate goes through utils.validate_url. The per-page
+results are folded into one site-level result with duplicate violations
+(shared headers, footers, nav) counted once.
+"""
+import asyncio
+import re
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+from urllib.parse import urldefrag, urljoin, urlparse
+
+from services.result_builder import (
+    MAX_FINGERPRINTS, count_distinct, group_severity_counts, merge_fingerprints, merge_issue_groups,
+    merge_severity_counts,
+)
+from utils import validate_url
+
+SKIPPED_EXTENSIONS = (
+    ".pdf", ".zip", ".gz", ".jpg", ".jpeg", ".png", ".gif", ".svg", ".webp", ".ico",
+    ".mp3", ".mp4", ".webm", ".avi", ".mov", ".css", ".js", ".json", ".xml", ".rss",
+    ".doc", ".docx", ".xls", ".xlsx", ".ppt", ".pptx", ".exe", ".dmg",
+)
+
+LOC_PATTERN = re.compile(r"<loc>\s*([^<\s]+)\s*</loc>", re.IGNORECASE)
+
+class CrawlScope:
+    """Decides which discovered URLs belong to the crawl"""
+
+    def __init__(self, start_url: str, include: Iterable[str] = (), exclude: Iterable[str] = ()):
+        parsed = urlparse(start_url)
+        self.scheme = parsed.scheme
+        self.netloc = parsed.netloc.lower()
+        self.include = [re.compile(p) for p in include]
+        self.exclude = [re.compile(p) for p in exclude]
+
+    @property
+    def origin(self) -> str:
+        return f"{self.scheme}://{self.netloc}"
+
+    def normalize(self, url: str, base: Optional[str] = None) -> Optional[str]:
+        """Absolute, fragment-free URL if it is in scope, otherwise None"""
+        if not url:
+            return None
+        url = urldefrag(urljoin(base or self.origin, url.strip()))[0]
+        parsed = urlparse(url)
+        if parsed.scheme != self.scheme or parsed.netloc.lower() != self.netloc:
+            return None
+        if parsed.path.lower().endswith(SKIPPED_EXTENSIONS):
+            return None
+        if not validate_url(url):
+            return None
+        target = parsed.path + (f"?{parsed.query}" if parsed.query else "")
+        if self.include and not any(p.search(target) for p in self.include):
+            return None
+        if any(p.search(target) for p in self.exclude):
+            return None
+        return url
+
+async def discover_sitemap(scope: CrawlScope, fetch_text: Callable[[str], Awaitable[Optional[str]]],
+                           limit: int) -> List[str]:
+    """In-scope page URLs from /sitemap.xml, following one level of sitemap index"""
+    body = await fetch_text(f"{scope.origin}/sitemap.xml")
+    if not body:
+        return []
+
+    urls: List[str] = []
+    locs = LOC_PATTERN.findall(body)
+    if "<sitemapindex" in body.lower():
+        nested = []
+        for loc in locs[:5]:
+            nested_body = await fetch_text(loc) if validate_url(loc) else None
+            if nested_body:
+                nested.extend(LOC_PATTERN.findall(nested_body))
+        locs = nested
+
+    for loc in locs:
+        url = scope.normalize(loc)
+        if url and url not in urls:
+            urls.append(url)
+            if len(urls) >= limit:
+                break
+    return urls
+
+async def crawl_site(start_url: str, scope: CrawlScope,
+                     scan_one: Callable[[str, int], Awaitable[Dict]],
+                     fetch_text: Callable[[str], Awaitable[Optional[str]]],
+                     max_depth: int, max_pages: int, concurrency: int,
+                     on_page: Callable[[Dict], None] = lambda page: None) -> List[Dict]:
+    """Breadth-first crawl scanning up to `concurrency` pages at a time.
+
+    `scan_one(url, index)` scans one page and returns its result, including
+    a "links" list of hrefs found on the page. Returns per-page results in
+    discovery order; failed pages carry an "error" instead of scan data.
+    """
+    start = scope.normalize(start_url) or start_url
+    queue: asyncio.Queue = asyncio.Queue()
+    scheduled: Dict[str, int] = {}  # url -> index, also caps the crawl at max_pages
+    pages: Dict[int, Dict] = {}
+
+    def schedule(url: str, depth: int):
+        if url in scheduled or len(scheduled) >= max_pages:
+            return
+        scheduled[url] = len(scheduled)
+        queue.put_nowait((url, depth))
+
+    schedule(start, 0)
+    for url in await discover_sitemap(scope, fetch_text, max_pages):
+        schedule(url, 1)
+
+    async def worker():
+        while True:
+            url, depth = await queue.get()
+            index = scheduled[url]
+            try:
+                result = await scan_one(url, index)
+                links = result.pop("links", [])
+                if depth < max_depth:
+                    for href in links:
+                        link = scope.normalize(href, base=url)
+                        if link:
+                            schedule(link, depth + 1)
+                page = {"url": url, **result}
+            except Exception as e:
+                page = {"url": url, "error": str(e)}
+            pages[index] = page
+            on_page(page)
+            queue.task_done()
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, concurrency))]
+    try:
+        await queue.join()
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    return [pages[i] for i in sorted(pages)]
+
+def aggregate_site_results(pages: List[Dict]) -> Dict:
+    """Fold per-page results into one site-level result"""
+    scanned = [page for page in pages if "error" not in page]
+    if not scanned:
+        errors = "; ".join(page["error"] for page in pages[:3])
+        raise RuntimeError(f"No pages could be scanned: {errors}")
+
+    issues, seen_issues = [], set()
+    generic_suggestions, ai_suggestions = [], []
+    for page in scanned:
+        for issue in page["issues"]:
+            key = (issue["guideline"], issue["element"])
+            if key not in seen_issues:
+                seen_issues.add(key)
+                issues.append(issue)
+        for text in page["genericSuggestions"]:
+            if text not in generic_suggestions:
+                generic_suggestions.append(text)
+        for text in page["aiSuggestions"]:
+            if text not in ai_suggestions:
+                ai_suggestions.append(text)
+
+    # Site-level only; pages are saved without their own
+    page_fingerprints = [page.pop("fingerprints", []) for page in scanned]
+    fingerprints = merge_fingerprints(page_fingerprints)
+    groups = merge_issue_groups(page.get("issueGroups", []) for page in scanned)
+    if len(fingerprints) < MAX_FINGERPRINTS and all(len(entries) < MAX_FINGERPRINTS for entries in page_fingerprints):
+        # An element repeated across pages (header, footer, nav) counts once
+        groups = count_distinct(groups, fingerprints)
+        severity_counts = group_severity_counts(groups)
+    else:
+        # Some elements went untracked past the fingerprint cap: fall back to per-page totals
+        severity_counts = merge_severity_counts(page.get("severityCounts", {}) for page in scanned)
+
+    scores = [page.get("score", 0) for page in scanned]
+    return {
+        "issues": issues,
+        "issueGroups": groups,
+        "severityCounts": severity_counts,
+        "fingerprints": fingerprints,
+        "genericSuggestions": generic_suggestions,
+        "aiSuggestions": ai_suggestions,
+        "screenshot_url": scanned[0]["screenshot_url"],
+        "thumbnail_url": scanned[0].get("thumbnail_url"),
+        "score": round(sum(scores) / len(scores)),
+        "pages": pages,
+    }
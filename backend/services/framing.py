@@ -0,0 +1,55 @@
+"""
+Length-prefixed message frames for the scanner worker protocol.
+
+Each frame is a 4-byte big-endian payload length followed by a compact
+UTF-8 JSON object. Unlike newline-delimited text, a frame is read with
+exact-size reads whatever it contains, and a truncated or oversized frame
+is detected instead of being mis-parsed.
+"""
+import json
+import struct
+from typing import BinaryIO, Dict, Optional
+
+HEADER = struct.Struct(">I")
+MAX_FRAME_BYTES = 256 * 1024 * 1024
+
+class FrameError(ValueError):
+    """The stream does not contain a valid frame"""
+
+def encode_frame(message: Dict) -> bytes:
+    payload = json.dumps(message, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+    if len(payload) > MAX_FRAME_BYTES:
+        raise FrameError(f"Frame of {len(payload)} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    return HEADER.pack(len(payload)) + payload
+
+def write_frame(stream: BinaryIO, message: Dict):
+    stream.write(encode_frame(message))
+    stream.flush()
+
+def _read_exactly(stream: BinaryIO, size: int) -> Optional[bytes]:
+    chunks, remaining = [], size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            if remaining == size:
+                return None
+            raise FrameError("Stream ended in the middle of a frame")
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+def read_frame(stream: BinaryIO) -> Optional[Dict]:
+    """Next message from the stream, or None at a clean end of stream"""
+    header = _read_exactly(stream, HEADER.size)
+    if header is None:
+        return None
+    (size,) = HEADER.unpack(header)
+    if size > MAX_FRAME_BYTES:
+        raise FrameError(f"Frame of {size} bytes exceeds the {MAX_FRAME_BYTES} byte limit")
+    payload = _read_exactly(stream, size) if size else b""
+    if payload is None:
+        raise FrameError("Stream ended in the middle of a frame")
+    try:
+        return json.loads(payload)
+    except ValueError as e:
+        raise FrameError(f"Malformed frame: {e}")
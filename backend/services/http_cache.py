@@ -0,0 +1,252 @@
+"""
+Disk-backed HTTP cache for page subresources, shared by scanner workers.
+
+Every scan runs in a fresh browser context, so without this each rescan
+downloads the same stylesheets, scripts, fonts and images again. Requests
+are intercepted with Playwright routing: fresh entries are served from
+disk, stale ones with a validator are revalidated with a conditional
+request, and anything cacheable that was fetched is stored. Entries live
+under one directory per origin and are evicted least recently used (by
+file mtime, which every hit bumps) once the cache outgrows its size bound.
+Documents are never cached: every scan must see the current page.
+"""
+import asyncio
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Optional
+from urllib.parse import urlparse
+
+CACHEABLE_TYPES = {"stylesheet", "script", "font", "image"}
+MAX_ENTRY_BYTES = 10_000_000
+# Without explicit freshness, reuse for a tenth of the time since Last-Modified, up to a day
+HEURISTIC_FRACTION = 0.1
+HEURISTIC_MAX_SECONDS = 24 * 3600
+# Hop-by-hop headers and ones that no longer describe the stored (decoded) body
+DROPPED_HEADERS = {"content-encoding", "content-length", "transfer-encoding", "connection", "keep-alive", "set-cookie"}
+
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    for part in (value or "").split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+def _http_date(value: Optional[str]) -> Optional[float]:
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+def freshness_lifetime(headers: Dict[str, str], now: float) -> float:
+    """Seconds a response stays fresh in a shared cache (RFC 9111 section 4.2.1)"""
+    directives = parse_cache_control(headers.get("cache-control"))
+    for name in ("s-maxage", "max-age"):
+        if directives.get(name):
+            try:
+                return max(0, int(directives[name]))
+            except ValueError:
+                pass
+    date = _http_date(headers.get("date")) or now
+    expires = _http_date(headers.get("expires"))
+    if "expires" in headers:
+        return max(0, expires - date) if expires else 0
+    last_modified = _http_date(headers.get("last-modified"))
+    if last_modified:
+        return min(HEURISTIC_MAX_SECONDS, max(0, (date - last_modified) * HEURISTIC_FRACTION))
+    return 0
+
+def is_storable(status: int, headers: Dict[str, str]) -> bool:
+    directives = parse_cache_control(headers.get("cache-control"))
+    if status != 200 or "no-store" in directives or "private" in directives:
+        return False
+    if "set-cookie" in headers:
+        return False
+    vary = {v.strip().lower() for v in headers.get("vary", "").split(",") if v.strip()}
+    if vary - {"accept-encoding"}:
+        return False  # The variants can't be told apart from the URL alone
+    return True
+
+class HttpCache:
+    """Responses stored as <origin>/<url hash>.json (metadata) and .body files"""
+
+    def __init__(self, directory: str, max_bytes: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._sizes: Optional[Dict[str, int]] = None  # Entry path -> bytes, for this process's view
+        self._lock = threading.Lock()  # Stores run on worker threads
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+
+    def _path(self, url: str) -> str:
+        parsed = urlparse(url)
+        origin = hashlib.sha1(f"{parsed.scheme}://{parsed.netloc}".lower().encode()).hexdigest()[:16]
+        return os.path.join(self.directory, origin, hashlib.sha256(url.encode("utf-8")).hexdigest())
+
+    def _index(self) -> Dict[str, int]:
+        if self._sizes is None:
+            self._sizes = {path: size for path, size, _ in self._scan()}
+        return self._sizes
+
+    def _scan(self):
+        """(entry path, bytes, mtime) of every entry on disk"""
+        if not os.path.isdir(self.directory):
+            return
+        for origin in os.scandir(self.directory):
+            if not origin.is_dir():
+                continue
+            for entry in os.scandir(origin.path):
+                if entry.name.endswith(".body"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    yield entry.path[:-len(".body")], stat.st_size, stat.st_mtime
+
+    def load(self, url: str) -> Optional[Dict]:
+        """Stored metadata plus body for `url`, or None"""
+        path = self._path(url)
+        try:
+            with open(path + ".json") as f:
+                meta = json.load(f)
+            with open(path + ".body", "rb") as f:
+                meta["body"] = f.read()
+            os.utime(path + ".body")  # Most recently used
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url else None
+
+    def _write(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def store(self, url: str, status: int, headers: Dict[str, str], body: bytes, now: float):
+        path = self._path(url)
+        headers = {name: value for name, value in headers.items() if name.lower() not in DROPPED_HEADERS}
+        meta = {"url": url, "status": status, "headers": headers, "storedAt": now,
+                "expiresAt": now + freshness_lifetime(headers, now)}
+        # Body first: an entry only counts once its metadata exists
+        self._write(path + ".body", body)
+        self._write(path + ".json", json.dumps(meta).encode("utf-8"))
+        with self._lock:
+            index = self._index()
+            index[path] = len(body)
+            if sum(index.values()) > self.max_bytes:
+                self._evict()
+
+    def refresh(self, url: str, meta: Dict, headers: Dict[str, str], now: float):
+        """Extend a revalidated entry's freshness with the 304's headers"""
+        merged = {**meta["headers"], **{n: v for n, v in headers.items() if n.lower() not in DROPPED_HEADERS}}
+        fresh = {key: value for key, value in meta.items() if key != "body"}
+        fresh.update(headers=merged, storedAt=now, expiresAt=now + freshness_lifetime(merged, now))
+        self._write(self._path(url) + ".json", json.dumps(fresh).encode("utf-8"))
+
+    def _evict(self):
+        """Delete least recently used entries (across all workers) down to 90% of the bound"""
+        entries = sorted(self._scan(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes * 0.9:
+                break
+            for suffix in (".json", ".body"):
+                try:
+                    os.remove(path + suffix)
+                except OSError:
+                    pass
+            total -= size
+        self._sizes = None
+
+    async def install(self, context) -> "CacheSession":
+        session = CacheSession(self)
+        await context.route("**/*", session.handle)
+        return session
+
+    def stats(self) -> Dict[str, int]:
+        return {"httpCacheHits": self.hits, "httpCacheMisses": self.misses,
+                "httpCacheRevalidated": self.revalidated, "httpCacheBytesSaved": self.bytes_saved}
+
+class CacheSession:
+    """Route handler for one browser context, counting what the cache did for it"""
+
+    def __init__(self, cache: HttpCache):
+        self.cache = cache
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self.bytes_saved = 0
+
+    def _count(self, outcome: str, saved: int = 0):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        setattr(self.cache, outcome, getattr(self.cache, outcome) + 1)
+        self.bytes_saved += saved
+        self.cache.bytes_saved += saved
+
+    async def handle(self, route):
+        request = route.request
+        if (request.method != "GET" or request.resource_type not in CACHEABLE_TYPES
+                or "range" in request.headers):
+            await route.fallback()
+            return
+
+        try:
+            await self._serve(route, request)
+        except Exception:
+            # Fetch failed or the page went away; let the browser try on its own
+            try:
+                await route.fallback()
+            except Exception:
+                pass
+
+    async def _serve(self, route, request):
+        now = time.time()
+        entry = await asyncio.to_thread(self.cache.load, request.url)
+        if entry:
+            directives = parse_cache_control(entry["headers"].get("cache-control"))
+            if now < entry["expiresAt"] and "no-cache" not in directives:
+                await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+                self._count("hits", len(entry["body"]))
+                return
+
+            validators = {}
+            if entry["headers"].get("etag"):
+                validators["if-none-match"] = entry["headers"]["etag"]
+            if entry["headers"].get("last-modified"):
+                validators["if-modified-since"] = entry["headers"]["last-modified"]
+            if validators:
+                response = await route.fetch(headers={**request.headers, **validators})
+                if response.status == 304:
+                    await asyncio.to_thread(self.cache.refresh, request.url, entry, response.headers, now)
+                    await route.fulfill(status=entry["status"], headers=entry["headers"], body=entry["body"])
+                    self._count("revalidated", len(entry["body"]))
+                    return
+                await self._store_and_fulfill(route, request, response, now)
+                return
+
+        response = await route.fetch()
+        await self._store_and_fulfill(route, request, response, now)
+
+    async def _store_and_fulfill(self, route, request, response, now: float):
+        body = await response.body()
+        headers = response.headers
+        if is_storable(response.status, headers) and len(body) <= MAX_ENTRY_BYTES:
+            directives = parse_cache_control(headers.get("cache-control"))
+            # Worth keeping if it stays fresh for a while or can be revalidated cheaply
+            if (freshness_lifetime(headers, now) > 0 or "etag" in headers or "last-modified" in headers
+                    or "no-cache" in directives):
+                await asyncio.to_thread(self.cache.store, request.url, response.status, headers, body, now)
+        await route.fulfill(response=response, body=body)
+        self._count("misses")
+
+    def stats(self) -> Dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "revalidated": self.revalidated,
+                "bytesSaved": self.bytes_saved}
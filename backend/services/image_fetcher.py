@@ -0,0 +1,82 @@
+"""
+Image bytes for alt-text generation.
+
+Images the page already loaded are read back from Playwright's captured
+responses, so they aren't downloaded twice. Anything else is fetched through
+one pooled HTTP client per worker. Every body is capped at `max_bytes`.
+"""
+import asyncio
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+# Captured image responses kept per page
+MAX_TRACKED_RESPONSES = 500
+
+class ImageTooLarge(ValueError):
+    pass
+
+class ImageFetcher:
+    def __init__(self, max_bytes: int, timeout: float, max_connections: int):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self._client: Optional[httpx.AsyncClient] = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_connections),
+            )
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @staticmethod
+    def track_responses(page) -> Dict[str, object]:
+        """Start remembering the page's image responses, keyed by URL"""
+        responses: Dict[str, object] = {}
+
+        def on_response(response):
+            if response.request.resource_type == "image" and len(responses) < MAX_TRACKED_RESPONSES:
+                responses[response.url] = response
+
+        page.on("response", on_response)
+        return responses
+
+    async def fetch(self, url: str, responses: Optional[Dict[str, object]] = None) -> bytes:
+        response = (responses or {}).get(url)
+        if response is not None and response.ok:
+            try:
+                body = await response.body()
+                if len(body) > self.max_bytes:
+                    raise ImageTooLarge(url)
+                return body
+            except ImageTooLarge:
+                raise
+            except Exception:
+                pass  # Body no longer available in the browser; download it instead
+
+        async with self.client.stream("GET", url) as r:
+            r.raise_for_status()
+            if int(r.headers.get("content-length") or 0) > self.max_bytes:
+                raise ImageTooLarge(url)
+            chunks, size = [], 0
+            async for chunk in r.aiter_bytes():
+                size += len(chunk)
+                if size > self.max_bytes:
+                    raise ImageTooLarge(url)
+                chunks.append(chunk)
+        return b"".join(chunks)
+
+    async def fetch_many(self, urls: Iterable[str], responses: Optional[Dict[str, object]] = None) -> Dict[str, Optional[bytes]]:
+        """Fetch distinct URLs concurrently; failed or oversized images map to None"""
+        urls = list(dict.fromkeys(urls))
+        results = await asyncio.gather(*(self.fetch(url, responses) for url in urls), return_exceptions=True)
+        return {url: (None if isinstance(data, BaseException) else data) for url, data in zip(urls, results)}
@@ -0,0 +1,134 @@
+"""
+Minimal Prometheus instrumentation (text exposition format 0.0.4).
+
+Counters, histograms and callback gauges with labels, safe to update from
+the scan threads. `render()` produces the body served at /metrics.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+# Seconds; scans range from sub-second stages to multi-minute crawls
+DEFAULT_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+
+_lock = threading.Lock()
+_registry: List["Metric"] = []
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{str(value)}"'.replace("\n", " ") for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = tuple(labels)
+        with _lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.label_names)
+
+    def samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()):
+        super().__init__(name, documentation, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with _lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        self._series: Dict[Tuple[str, ...], List[float]] = {}  # bucket counts..., sum, count
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a block, in seconds"""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(time.monotonic() - start, **labels)
+
+    def samples(self):
+        with _lock:
+            series = {key: list(values) for key, values in self._series.items()}
+        for key, values in sorted(series.items()):
+            for bound, count in zip(self.buckets, values):
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.label_names, key, le)} {count}"
+            yield f"{self.name}_sum{_format_labels(self.label_names, key)} {_format_value(values[-2])}"
+            yield f"{self.name}_count{_format_labels(self.label_names, key)} {values[-1]}"
+
+class Gauge(Metric):
+    """Value read from a callback at scrape time: {label values tuple: value}"""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = (),
+                 callback: Callable[[], Dict[Tuple[str, ...], float]] = dict):
+        super().__init__(name, documentation, labels)
+        self.callback = callback
+
+    def samples(self):
+        try:
+            values = self.callback()
+        except Exception:
+            values = {}
+        for key, value in sorted(values.items()):
+            yield f"{self.name}{_format_labels(self.label_names, key)} {_format_value(value)}"
+
+def render() -> str:
+    with _lock:
+        metrics = list(_registry)
+    return "\n".join(metric.render() for metric in metrics) + "\n"
+
+# Scan pipeline metrics, updated by the scanner pool and the job scheduler
+scan_stage_seconds = Histogram("aura_scan_stage_seconds", "Time spent in each scan stage", ["stage"])
+scan_duration_seconds = Histogram("aura_scan_duration_seconds", "Scan job time from start to finish", ["mode", "status"])
+scan_jobs_total = Counter("aura_scan_jobs_total", "Finished scan jobs", ["mode", "status"])
+worker_startup_seconds = Histogram("aura_scanner_worker_startup_seconds", "Scanner worker spawn until ready", ["phase"])
+worker_restarts_total = Counter("aura_scanner_worker_restarts_total", "Scanner workers replaced", ["reason"])
+cache_requests_total = Counter("aura_cache_requests_total", "Worker cache lookups", ["cache", "result"])
+http_cache_bytes_saved_total = Counter("aura_http_cache_bytes_saved_total", "Subresource bytes served from the HTTP cache")
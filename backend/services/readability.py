@@ -0,0 +1,90 @@
+"""
+Readability analysis over the rendered DOM.
+
+Visible text blocks (paragraphs, list items, headings, quotes) are pulled
+out of the live page in one `page.evaluate`, preferring the main content
+region and stopping at a character budget, so the full HTML is never
+serialized or re-parsed in Python. Grades are cached by text hash: headers,
+footers and boilerplate repeat across the pages of a site.
+"""
+import hashlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+import textstat
+
+MIN_WORDS = 20  # Shorter blocks don't give a meaningful grade
+HARD_GRADE = 10  # Above this, text reads at college level
+MAX_SUGGESTIONS = 3
+
+# Returns [{tag, text}] for visible blocks in document order, within charBudget
+TEXT_BLOCKS_JS = """([charBudget, minWords]) => {
+    const BLOCKS = 'p, li, h1, h2, h3, h4, h5, h6, blockquote, dd, figcaption';
+    const root = document.querySelector('main, [role="main"], article') || document.body;
+    if (!root) return [];
+    const blocks = [];
+    let used = 0;
+    for (const el of root.querySelectorAll(BLOCKS)) {
+        // Nested blocks (a <p> inside an <li>) are covered by their outer block
+        const outer = el.parentElement && el.parentElement.closest(BLOCKS);
+        if (outer && root.contains(outer)) continue;
+        if (!el.getClientRects().length) continue;
+        const style = getComputedStyle(el);
+        if (style.visibility === 'hidden' || style.display === 'none') continue;
+        const text = (el.innerText || '').replace(/\\s+/g, ' ').trim();
+        if (text.split(' ').length < minWords) continue;
+        blocks.push({ tag: el.tagName.toLowerCase(), text: text.slice(0, charBudget - used) });
+        used += text.length;
+        if (used >= charBudget) break;
+    }
+    return blocks;
+}"""
+
+class ReadabilityScorer:
+    """Flesch-Kincaid grades with an in-memory LRU keyed by text sha1"""
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._grades: "OrderedDict[bytes, Optional[float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def grade(self, text: str) -> Optional[float]:
+        key = hashlib.sha1(text.encode("utf-8")).digest()
+        if key in self._grades:
+            self.hits += 1
+            self._grades.move_to_end(key)
+            return self._grades[key]
+        self.misses += 1
+        try:
+            grade = textstat.flesch_kincaid_grade(text)
+        except Exception:
+            grade = None
+        self._grades[key] = grade
+        if len(self._grades) > self.max_entries:
+            self._grades.popitem(last=False)
+        return grade
+
+    def grade_blocks(self, blocks: List[Dict]) -> List[Tuple[Dict, float]]:
+        """(block, grade) for every block that could be graded"""
+        graded = []
+        for block in blocks:
+            grade = self.grade(block["text"])
+            if grade is not None:
+                graded.append((block, grade))
+        return graded
+
+async def text_blocks(page, char_budget: int) -> List[Dict]:
+    return await page.evaluate(TEXT_BLOCKS_JS, [char_budget, MIN_WORDS])
+
+def readability_suggestions(graded: List[Tuple[Dict, float]]) -> List[str]:
+    """Suggestions for the first few hard-to-read blocks"""
+    suggestions = []
+    for block, grade in graded:
+        if len(suggestions) >= MAX_SUGGESTIONS:
+            break
+        if grade > HARD_GRADE:
+            text = block["text"]
+            preview = text[:70] + '...' if len(text) > 70 else text
+            suggestions.append(f"📚 AI Readability Analysis: Text has grade level {grade:.1f} (college level). Simplify for broader audience: '{preview}'")
+    return suggestions
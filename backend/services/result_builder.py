@@ -0,0 +1,172 @@
+"""
+Folds axe violations into a bounded scan result.
+
+Nodes are grouped per rule: every node counts towards the group (and the
+score), but only a capped sample of distinct, truncated element snippets is
+kept as issues (stored in their own collection, see services/scan_issues.py).
+Every node also gets a stable fingerprint so scans can be diffed by set
+operations. AI suggestions are capped per category with
+counters rather than by rescanning the list. `fit_result` shrinks a finished
+result until its JSON encoding fits the configured document size.
+"""
+import hashlib
+import json
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+SEVERITIES = ("critical", "serious", "moderate", "minor")
+MAX_FINGERPRINTS = 5000  # Distinct violating elements tracked per result
+# Stored in their own collections (a crawl's pages as separate results), not in the result document
+DETACHED_FIELDS = ("fingerprints", "issues", "pages")
+
+# Build tools number ids and classes (css-1a2b3c, item-42); attribute values churn on every deploy
+_SELECTOR_NAME = re.compile(r"[#.][\w-]+")
+_DIGITS = re.compile(r"\d+")
+_VOLATILE_ATTRIBUTE = re.compile(r'\s(?:nonce|data-[\w-]+|aria-describedby|aria-labelledby|aria-controls)="[^"]*"')
+
+def normalize_target(target) -> str:
+    """axe's target (selectors, nested per iframe/shadow root) as one stable path"""
+    parts = [normalize_target(part) if isinstance(part, list) else str(part) for part in target or []]
+    path = " >> ".join(parts)
+    return _SELECTOR_NAME.sub(lambda m: _DIGITS.sub("0", m.group()), " ".join(path.split()))
+
+def normalize_html(html: str) -> str:
+    html = _VOLATILE_ATTRIBUTE.sub("", " ".join(html.split())).replace(" >", ">")
+    return _DIGITS.sub("0", html)
+
+def fingerprint(rule: str, target, html: str) -> str:
+    """Identifies one violating element across scans: rule, selector path and markup"""
+    html_hash = hashlib.sha1(normalize_html(html).encode("utf-8")).hexdigest()
+    key = f"{rule}|{normalize_target(target)}|{html_hash}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:20]
+
+def truncate_snippet(html: str, max_chars: int) -> str:
+    html = " ".join(html.split())
+    return html if len(html) <= max_chars else html[:max_chars] + "…"
+
+class ResultBuilder:
+    def __init__(self, max_samples: int = 20, max_snippet_chars: int = 300):
+        self.max_samples = max_samples
+        self.max_snippet_chars = max_snippet_chars
+        self.issues: List[Dict] = []
+        self.groups: Dict[str, Dict] = {}
+        self.generic_suggestions: Dict[str, None] = {}  # Ordered set
+        self.ai_suggestions: List[str] = []
+        self.suggestion_counts: Counter = Counter()
+        self.deductions = 0
+        self._samples: Dict[str, set] = {}
+        self.fingerprints: Dict[str, Dict] = {}
+
+    def add_violation(self, violation: Dict, severity: str, generic: Optional[str] = None) -> Dict:
+        """Group for an axe violation, created on first use"""
+        rule = violation["id"]
+        if generic:
+            self.generic_suggestions[generic] = None
+        if rule not in self.groups:
+            self.groups[rule] = {
+                "guideline": rule,
+                "description": violation["description"],
+                "severity": severity,
+                "count": 0,
+            }
+            self._samples[rule] = set()
+        return self.groups[rule]
+
+    def add_node(self, group: Dict, node: Dict, points: int):
+        """Count a node; keep its snippet if it is new and the sample isn't full"""
+        group["count"] += 1
+        self.deductions += points
+        rule = group["guideline"]
+        snippet = truncate_snippet(node["html"], self.max_snippet_chars)
+        if len(self.fingerprints) < MAX_FINGERPRINTS:
+            key = fingerprint(rule, node.get("target"), node["html"])
+            if key not in self.fingerprints:
+                self.fingerprints[key] = {"fingerprint": key, "rule": rule, "severity": group["severity"],
+                                          "target": normalize_target(node.get("target")), "element": snippet}
+        samples = self._samples[rule]
+        if snippet not in samples and len(samples) < self.max_samples:
+            samples.add(snippet)
+            self.issues.append({"element": snippet, "description": group["description"], "guideline": rule,
+                                "severity": group["severity"]})
+
+    def suggest(self, text: str, category: Optional[str] = None, limit: Optional[int] = None) -> bool:
+        """Add an AI suggestion unless its category already has `limit` of them"""
+        if category is not None:
+            if limit is not None and self.suggestion_counts[category] >= limit:
+                return False
+            self.suggestion_counts[category] += 1
+        self.ai_suggestions.append(text)
+        return True
+
+    @property
+    def score(self) -> int:
+        return max(0, 100 - self.deductions)
+
+    def severity_counts(self) -> Dict[str, int]:
+        return group_severity_counts(self.groups.values())
+
+    def result(self) -> Dict:
+        return {
+            "issues": self.issues,
+            "issueGroups": list(self.groups.values()),
+            "severityCounts": self.severity_counts(),
+            "genericSuggestions": list(self.generic_suggestions),
+            "aiSuggestions": self.ai_suggestions,
+            "score": self.score,
+            "fingerprints": list(self.fingerprints.values()),
+        }
+
+def group_severity_counts(groups: Iterable[Dict]) -> Dict[str, int]:
+    counts = Counter()
+    for group in groups:
+        counts[group["severity"]] += group["count"]
+    return {severity: counts[severity] for severity in SEVERITIES if counts[severity]}
+
+def merge_issue_groups(group_lists: Iterable[List[Dict]]) -> List[Dict]:
+    """Sum per-rule counts across several results"""
+    merged: Dict[str, Dict] = {}
+    for groups in group_lists:
+        for group in groups:
+            if group["guideline"] in merged:
+                merged[group["guideline"]]["count"] += group["count"]
+            else:
+                merged[group["guideline"]] = dict(group)
+    return list(merged.values())
+
+def merge_severity_counts(count_dicts: Iterable[Dict[str, int]]) -> Dict[str, int]:
+    counts = Counter()
+    for severity_counts in count_dicts:
+        counts.update(severity_counts)
+    return {severity: counts[severity] for severity in SEVERITIES if counts[severity]}
+
+def merge_fingerprints(fingerprint_lists: Iterable[List[Dict]]) -> List[Dict]:
+    merged: Dict[str, Dict] = {}
+    for fingerprints in fingerprint_lists:
+        for entry in fingerprints:
+            if len(merged) >= MAX_FINGERPRINTS:
+                return list(merged.values())
+            merged.setdefault(entry["fingerprint"], entry)
+    return list(merged.values())
+
+def count_distinct(groups: List[Dict], fingerprints: List[Dict]) -> List[Dict]:
+    """Groups recounted as distinct violating elements, from a merged fingerprint set"""
+    per_rule = Counter(entry["rule"] for entry in fingerprints)
+    return [dict(group, count=per_rule[group["guideline"]]) for group in groups if per_rule[group["guideline"]]]
+
+def result_size(result: Dict) -> int:
+    """Encoded size of what will be stored in the result document"""
+    stored = {key: value for key, value in result.items() if key not in DETACHED_FIELDS}
+    return len(json.dumps(stored, ensure_ascii=False, default=str).encode("utf-8"))
+
+def fit_result(result: Dict, max_bytes: int) -> Dict:
+    """Shrink a result in place until it encodes to at most max_bytes"""
+    if not max_bytes or result_size(result) <= max_bytes:
+        return result
+
+    # The cached per-element suggestions first (only incremental rescans lose out)
+    if result.get("elementSuggestions"):
+        result["elementSuggestions"] = {}
+    while len(result["aiSuggestions"]) > 10 and result_size(result) > max_bytes:
+        result["aiSuggestions"] = result["aiSuggestions"][:len(result["aiSuggestions"]) // 2]
+    return result
@@ -0,0 +1,124 @@
+"""
+Per-project score rollups for the dashboard.
+
+Every saved scan updates one `project_rollups` document per project (latest
+and previous score, delta, recent scores and their average, latest severity
+counts) and two `project_rollup_buckets` documents (the day and the week it
+falls in) that accumulate scores and violation counts by rule and severity.
+Both are written with single atomic updates, so concurrent scans of the same
+project can't lose counts, and reading them never touches scan history.
+"""
+from datetime import datetime, timedelta
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import DESCENDING
+
+from database import project_rollups_collection, project_rollup_buckets_collection, scan_results_collection
+
+RECENT_SCORES = 10  # Scores kept for the sparkline and rolling average
+GRANULARITIES = ("day", "week")
+
+ROLLUP_SOURCE_FIELDS = {"accessibilityScore": 1, "severityCounts": 1, "issueGroups": 1, "createdAt": 1}
+
+def bucket_start(at: datetime, granularity: str) -> datetime:
+    day = at.replace(hour=0, minute=0, second=0, microsecond=0)
+    return day - timedelta(days=day.weekday()) if granularity == "week" else day
+
+def _rollup_update(project: Dict, scan: Dict) -> List[Dict]:
+    """Pipeline update folding one scan into the rollup document"""
+    score = scan["accessibilityScore"]
+    return [
+        {"$set": {
+            "userId": project["userId"],
+            # Stage expressions see the document as it was before this stage
+            "previousScore": "$latestScore",
+            "latestScore": score,
+            "delta": {"$subtract": [score, {"$ifNull": ["$latestScore", score]}]},
+            "latestScanId": scan["_id"],
+            "latestScanAt": scan["createdAt"],
+            "severityCounts": {"$literal": scan.get("severityCounts", {})},
+            "recentScores": {"$slice": [
+                {"$concatArrays": [{"$ifNull": ["$recentScores", []]}, [score]]}, -RECENT_SCORES
+            ]},
+            "scanCount": {"$add": [{"$ifNull": ["$scanCount", 0]}, 1]},
+        }},
+        {"$set": {"averageScore": {"$round": [{"$avg": "$recentScores"}, 1]}}},
+    ]
+
+async def record_scan(project: Dict, result_id: ObjectId):
+    """Fold a newly saved (top-level) scan result into the project's rollups"""
+    scan = await scan_results_collection.find_one({"_id": result_id}, ROLLUP_SOURCE_FIELDS)
+    if not scan:
+        return
+    await project_rollups_collection.update_one(
+        {"projectId": project["_id"]}, _rollup_update(project, scan), upsert=True
+    )
+
+    for granularity in GRANULARITIES:
+        await project_rollup_buckets_collection.update_one(
+            _bucket_key(project["_id"], scan, granularity),
+            {"$inc": _bucket_increments(scan, 1), "$set": {"userId": project["userId"]}},
+            upsert=True,
+        )
+
+def _bucket_key(project_id: ObjectId, scan: Dict, granularity: str) -> Dict:
+    return {"projectId": project_id, "granularity": granularity, "start": bucket_start(scan["createdAt"], granularity)}
+
+def _bucket_increments(scan: Dict, sign: int) -> Dict[str, int]:
+    increments = {"scans": sign, "scoreSum": sign * scan["accessibilityScore"]}
+    for severity, count in scan.get("severityCounts", {}).items():
+        increments[f"severityCounts.{severity}"] = sign * count
+    for group in scan.get("issueGroups", []):
+        increments[f"ruleCounts.{group['guideline']}"] = sign * group["count"]
+    return increments
+
+async def forget_scan(project: Dict, scan: Dict):
+    """Take a deleted (top-level) scan result back out of its day and week buckets"""
+    for granularity in GRANULARITIES:
+        key = _bucket_key(project["_id"], scan, granularity)
+        await project_rollup_buckets_collection.update_one(key, {"$inc": _bucket_increments(scan, -1)})
+        # A bucket whose last scan is gone would otherwise average over nothing
+        await project_rollup_buckets_collection.delete_one({**key, "scans": {"$lte": 0}})
+
+async def rebuild_rollup(project: Dict):
+    """Recompute the rollup from the latest results, e.g. after one was deleted (see forget_scan for buckets)"""
+    scans = await scan_results_collection.find(
+        {"projectId": project["_id"], "parentScanId": None}, ROLLUP_SOURCE_FIELDS
+    ).sort("createdAt", DESCENDING).limit(RECENT_SCORES).to_list(RECENT_SCORES)
+    if not scans:
+        await project_rollups_collection.delete_one({"projectId": project["_id"]})
+        return
+
+    scores = [scan["accessibilityScore"] for scan in reversed(scans)]
+    latest = scans[0]
+    previous_score = scans[1]["accessibilityScore"] if len(scans) > 1 else None
+    await project_rollups_collection.update_one(
+        {"projectId": project["_id"]},
+        {"$set": {
+            "userId": project["userId"],
+            "previousScore": previous_score,
+            "latestScore": latest["accessibilityScore"],
+            "delta": latest["accessibilityScore"] - (previous_score if previous_score is not None else latest["accessibilityScore"]),
+            "latestScanId": latest["_id"],
+            "latestScanAt": latest["createdAt"],
+            "severityCounts": latest.get("severityCounts", {}),
+            "recentScores": scores,
+            "scanCount": await scan_results_collection.count_documents({"projectId": project["_id"], "parentScanId": None}),
+            "averageScore": round(sum(scores) / len(scores), 1),
+        }},
+        upsert=True,
+    )
+
+async def delete_rollups(project_id: ObjectId):
+    await project_rollups_collection.delete_one({"projectId": project_id})
+    await project_rollup_buckets_collection.delete_many({"projectId": project_id})
+
+async def get_trend(project_id: ObjectId, granularity: str, limit: int) -> List[Dict]:
+    """Most recent buckets, oldest first, with their average score"""
+    buckets = await project_rollup_buckets_collection.find(
+        {"projectId": project_id, "granularity": granularity}, {"_id": 0, "projectId": 0, "userId": 0}
+    ).sort("start", DESCENDING).limit(limit).to_list(limit)
+    for bucket in buckets:
+        bucket["averageScore"] = round(bucket["scoreSum"] / bucket["scans"], 1)
+    return list(reversed(buckets))
@@ -0,0 +1,83 @@
+"""
+Violation fingerprints and scan-to-scan diffs.
+
+Each scan's fingerprints (see services/result_builder.py) are stored in
+`scan_fingerprints`, one small document per distinct violating element,
+indexed by (scanId, fingerprint). A diff reads just the fingerprint column
+of both scans from that index, compares them as sets, and only then loads
+details for the new and fixed elements it returns.
+"""
+from typing import Dict, List, Optional, Set
+
+from bson import ObjectId
+
+from database import scan_fingerprints_collection
+
+INSERT_CHUNK = 1000
+
+async def save_fingerprints(scan_id: ObjectId, project_id: ObjectId, fingerprints: List[Dict]):
+    for start in range(0, len(fingerprints), INSERT_CHUNK):
+        await scan_fingerprints_collection.insert_many([
+            {"scanId": scan_id, "projectId": project_id, **entry}
+            for entry in fingerprints[start:start + INSERT_CHUNK]
+        ], ordered=False)
+
+async def copy_fingerprints(from_scan_id: ObjectId, to_scan_id: ObjectId, project_id: ObjectId):
+    """Give a result saved as unchanged the fingerprints of the scan it copies"""
+    entries = await scan_fingerprints_collection.find(
+        {"scanId": from_scan_id}, {"_id": 0, "scanId": 0, "projectId": 0}
+    ).to_list(None)
+    await save_fingerprints(to_scan_id, project_id, entries)
+
+async def delete_fingerprints(scan_ids: List[ObjectId]):
+    await scan_fingerprints_collection.delete_many({"scanId": {"$in": scan_ids}})
+
+async def delete_project_fingerprints(project_id: ObjectId):
+    await scan_fingerprints_collection.delete_many({"projectId": project_id})
+
+async def fingerprint_set(scan_id: ObjectId) -> Set[str]:
+    # Covered by the (scanId, fingerprint) index: no documents are fetched
+    cursor = scan_fingerprints_collection.find({"scanId": scan_id}, {"_id": 0, "fingerprint": 1})
+    return {entry["fingerprint"] async for entry in cursor}
+
+async def _details(scan_id: ObjectId, fingerprints: Set[str], limit: int) -> List[Dict]:
+    if not fingerprints or not limit:
+        return []
+    wanted = sorted(fingerprints)[:limit]
+    return await scan_fingerprints_collection.find(
+        {"scanId": scan_id, "fingerprint": {"$in": wanted}}, {"_id": 0, "scanId": 0, "projectId": 0}
+    ).sort([("rule", 1), ("fingerprint", 1)]).to_list(limit)
+
+async def _count_by_rule(scan_id: ObjectId, fingerprints: Set[str]) -> Dict[str, int]:
+    if not fingerprints:
+        return {}
+    counts = await scan_fingerprints_collection.aggregate([
+        {"$match": {"scanId": scan_id, "fingerprint": {"$in": list(fingerprints)}}},
+        {"$group": {"_id": "$rule", "count": {"$sum": 1}}},
+    ]).to_list(None)
+    return {entry["_id"]: entry["count"] for entry in counts}
+
+async def diff_scans(from_scan_id: ObjectId, to_scan_id: ObjectId, limit: Optional[int] = 100) -> Dict:
+    """New, fixed and persisting violations between two scans.
+
+    With `limit=None` only the counts are computed (cheap enough to run
+    after every scheduled scan).
+    """
+    before = await fingerprint_set(from_scan_id)
+    after = await fingerprint_set(to_scan_id)
+    new, fixed = after - before, before - after
+    diff = {
+        "fromScanId": from_scan_id,
+        "toScanId": to_scan_id,
+        "newCount": len(new),
+        "fixedCount": len(fixed),
+        "persistingCount": len(after & before),
+    }
+    if limit is not None:
+        diff.update(
+            new=await _details(to_scan_id, new, limit),
+            fixed=await _details(from_scan_id, fixed, limit),
+            newByRule=await _count_by_rule(to_scan_id, new),
+            fixedByRule=await _count_by_rule(from_scan_id, fixed),
+        )
+    return diff
@@ -0,0 +1,87 @@
+"""
+Issue samples of each scan, stored apart from the result document.
+
+The result document keeps the per-rule issueGroups (severity and exact
+counts); the sampled elements live in `scan_issues`, one small document per
+issue, so a heavy page can't push its result towards Mongo's document limit
+and history and result reads don't drag the samples along. Issues are read
+a page at a time in insertion order (keyset on _id), optionally filtered by
+rule and severity. Results saved before this kept them in an embedded
+`issues` array, which is still served as it is.
+"""
+import asyncio
+from typing import Dict, List, Optional
+
+from bson import ObjectId
+
+from database import scan_issues_collection
+from utils import logger
+
+INSERT_CHUNK = 1000
+
+async def save_issues(scan_id: ObjectId, project_id: ObjectId, issues: List[Dict]):
+    for start in range(0, len(issues), INSERT_CHUNK):
+        await scan_issues_collection.insert_many([
+            {"scanId": scan_id, "projectId": project_id, "rule": issue["guideline"],
+             "severity": issue.get("severity"), "element": issue["element"], "description": issue["description"]}
+            for issue in issues[start:start + INSERT_CHUNK]
+        ])
+
+async def copy_issues(from_scan_id: ObjectId, to_scan_id: ObjectId, project_id: ObjectId):
+    """Give a result saved as unchanged the issues of the scan it copies"""
+    issues = await find_issues(from_scan_id, limit=None)
+    await save_issues(to_scan_id, project_id, issues)
+
+async def delete_issues(scan_ids: List[ObjectId]):
+    await scan_issues_collection.delete_many({"scanId": {"$in": scan_ids}})
+
+async def delete_project_issues(project_id: ObjectId):
+    await scan_issues_collection.delete_many({"projectId": project_id})
+
+async def find_issues(scan_id: ObjectId, rule: Optional[str] = None, severity: Optional[str] = None,
+                      after: Optional[ObjectId] = None, limit: Optional[int] = 50) -> List[Dict]:
+    """One page of a scan's issues in the order they were found, each with its _id"""
+    query = {"scanId": scan_id}
+    if rule:
+        query["rule"] = rule
+    if severity:
+        query["severity"] = severity
+    if after:
+        query["_id"] = {"$gt": after}
+    cursor = scan_issues_collection.find(query, {"scanId": 0, "projectId": 0}).sort("_id", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [{"_id": issue["_id"], "guideline": issue["rule"], "severity": issue.get("severity"),
+             "element": issue["element"], "description": issue["description"]}
+            async for issue in cursor]
+
+class IssueWriter:
+    """Stores a scan's issues chunk by chunk while the worker streams them"""
+
+    def __init__(self, scan_id: ObjectId, project_id: ObjectId):
+        self.scan_id = scan_id
+        self.project_id = project_id
+        self.saved = 0
+        self._pending: List[asyncio.Future] = []
+        self._lock = asyncio.Lock()  # One chunk at a time keeps _id order = the order found
+
+    async def _save(self, issues: List[Dict]):
+        async with self._lock:
+            await save_issues(self.scan_id, self.project_id, issues)
+
+    def add(self, issues: List[Dict]):
+        """Start storing a chunk (call on the event loop)"""
+        self._pending.append(asyncio.ensure_future(self._save(issues)))
+        self.saved += len(issues)
+
+    async def flush(self):
+        await asyncio.gather(*self._pending)
+
+    async def discard(self):
+        """Remove whatever was stored for a scan that won't be saved"""
+        await asyncio.gather(*self._pending, return_exceptions=True)
+        if self.saved:
+            try:
+                await delete_issues([self.scan_id])
+            except Exception as e:
+                logger.error(f"Could not delete streamed issues of scan {self.scan_id}: {str(e)}")
@@ -0,0 +1,514 @@
+"""
+Asynchronous scan jobs.
+
+Scans are persisted as documents in `scan_jobs` and dispatched to the scanner
+pool by a bounded scheduler that round-robins between users, so one user
+queueing many scans can't starve everybody else. Progress stages are written
+to the job document and pushed to live subscribers (the SSE endpoint).
+"""
+import asyncio
+import os
+import socket
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from config import settings
+from services import metrics
+from database import projects_collection, scan_jobs_collection, scan_results_collection
+from services.rollups import record_scan
+from services.scan_diff import copy_fingerprints, save_fingerprints
+from services.scan_issues import IssueWriter, copy_issues, save_issues
+from services.scanner_wrapper import scan_website, crawl_website, batch_scan_websites
+from utils import logger, sanitize_error_message
+
+TERMINAL_STAGES = ("completed", "failed")
+
+async def count_recent_jobs(user_id: ObjectId) -> int:
+    """Number of scans the user submitted by hand in the last hour (a batch counts each project)"""
+    since = datetime.now(timezone.utc) - timedelta(hours=1)
+    totals = await scan_jobs_collection.aggregate([
+        {"$match": {"userId": user_id, "createdAt": {"$gte": since}, "scheduleId": None}},
+        {"$group": {"_id": None, "scans": {"$sum": {"$ifNull": ["$batch.total", 1]}}}},
+    ]).to_list(1)
+    return totals[0]["scans"] if totals else 0
+
+def stage_event(job: Dict, stage: Dict) -> Dict:
+    """JSON-ready progress event for one stage of a job document"""
+    event = {"jobId": str(job["_id"]), "stage": stage["stage"], "at": stage["at"].isoformat()}
+    if stage["stage"] == "completed" and job.get("resultId"):
+        event["resultId"] = str(job["resultId"])
+    if stage["stage"] == "failed":
+        event["error"] = job.get("error")
+    if job.get("batch"):
+        event["batch"] = {key: job["batch"][key] for key in ("total", "completed", "failed")}
+    return event
+
+def crawl_options(scan_request) -> Dict:
+    """Crawl options for the worker, clamped to the configured limits"""
+    def clamp(value, limit):
+        return limit if value is None else min(value, limit)
+
+    return {
+        "max_pages": clamp(scan_request.maxPages, settings.crawl_max_pages),
+        "max_depth": clamp(scan_request.maxDepth, settings.crawl_max_depth),
+        "concurrency": clamp(scan_request.concurrency, settings.crawl_max_concurrency),
+        "include": scan_request.include,
+        "exclude": scan_request.exclude,
+    }
+
+def observe_stage_timings(scan_data: Dict):
+    """Feed a scanner output's stage timings (ms) into the stage histogram"""
+    for page in [scan_data] + scan_data.get("pages", []):
+        for stage, ms in (page.get("stageTimings") or {}).items():
+            metrics.scan_stage_seconds.observe(ms / 1000, stage=stage)
+
+def build_scan_result(project_id: ObjectId, scan_data: Dict, scan_type: str = "live", **fields) -> Dict:
+    """ScanResult document for one scanner output (its issues are saved separately)"""
+    # Use calculated score from scanner, or fallback to simple calculation
+    score = scan_data.get("score", max(0, 100 - (len(scan_data["issues"]) * 2)))
+
+    return {
+        "projectId": project_id,
+        "scanType": scan_type,
+        "accessibilityScore": score,
+        "issueGroups": scan_data.get("issueGroups", []),
+        "severityCounts": scan_data.get("severityCounts", {}),
+        "genericSuggestions": scan_data["genericSuggestions"],
+        "aiSuggestions": scan_data["aiSuggestions"],
+        "screenshotUrl": scan_data["screenshot_url"],
+        "thumbnailUrl": scan_data.get("thumbnail_url"),
+        "loadStats": scan_data.get("loadStats"),
+        "cacheStats": scan_data.get("cacheStats"),
+        "stageTimings": scan_data.get("stageTimings"),
+        # Older results and pages of a crawl have no fingerprints to diff against
+        "fingerprinted": "fingerprints" in scan_data,
+        "createdAt": datetime.now(timezone.utc),
+        **fields,
+    }
+
+# Page state kept on each result so the next scan can run incrementally
+PAGE_STATE_FIELDS = ("etag", "lastModified", "domHash", "elementSuggestions")
+
+async def find_previous_scan(project_id: ObjectId) -> Optional[Dict]:
+    """Page state of the project's latest single-page scan"""
+    return await scan_results_collection.find_one(
+        {"projectId": project_id, "scanType": "live"},
+        {field: 1 for field in PAGE_STATE_FIELDS + ("unchangedFrom",)},
+        sort=[("createdAt", -1)],
+    )
+
+async def save_unchanged_result(project_id: ObjectId, previous: Dict, scan_data: Dict) -> ObjectId:
+    """Cheap copy of the previous result for a page that hasn't changed"""
+    # The previous result is itself complete (issues, fingerprints and counts), whether or not
+    # the scan it was copied from still exists
+    source = await scan_results_collection.find_one({"_id": previous["_id"]})
+    if not source:
+        raise RuntimeError("Previous scan result no longer exists")
+    original_id = source.get("unchangedFrom")
+    if not original_id or not await scan_results_collection.find_one({"_id": original_id}, {"_id": 1}):
+        original_id = source["_id"]
+
+    result_to_save = {key: value for key, value in source.items() if key not in ("_id", "createdAt")}
+    for field in PAGE_STATE_FIELDS:
+        if scan_data.get(field):
+            result_to_save[field] = scan_data[field]
+    result_to_save["unchangedFrom"] = original_id
+    result_to_save["createdAt"] = datetime.now(timezone.utc)
+
+    new_result = await scan_results_collection.insert_one(result_to_save)
+    if source.get("fingerprinted"):
+        await copy_fingerprints(source["_id"], new_result.inserted_id, project_id)
+    if "issues" not in source:
+        await copy_issues(source["_id"], new_result.inserted_id, project_id)
+    logger.info(f"Scan for project {project_id} unchanged since {original_id} ({scan_data.get('reason')})")
+    return new_result.inserted_id
+
+async def save_scan_result(project_id: ObjectId, scan_data: Dict, result_id: Optional[ObjectId] = None,
+                           issues_saved: int = 0) -> ObjectId:
+    """Persist the scanner output as a ScanResult document.
+
+    `issues_saved` of the issues were already stored under `result_id`
+    while the scan ran; only the rest are inserted here.
+    """
+    page_state = {field: scan_data.get(field) for field in PAGE_STATE_FIELDS}
+    result_to_save = build_scan_result(project_id, scan_data, **page_state)
+    if result_id:
+        result_to_save["_id"] = result_id
+    new_result = await scan_results_collection.insert_one(result_to_save)
+    await save_issues(new_result.inserted_id, project_id, scan_data["issues"][issues_saved:])
+    await save_fingerprints(new_result.inserted_id, project_id, scan_data.get("fingerprints", []))
+    logger.info(f"Scan completed for project {project_id}: Score {result_to_save['accessibilityScore']}")
+    return new_result.inserted_id
+
+async def save_crawl_result(project_id: ObjectId, crawl_data: Dict) -> ObjectId:
+    """Persist a site-level aggregate result plus one child result per scanned page"""
+    pages = [page for page in crawl_data.pop("pages") if "error" not in page]
+    site_result = build_scan_result(project_id, crawl_data, "crawl", pagesScanned=len(pages))
+    new_result = await scan_results_collection.insert_one(site_result)
+    await save_issues(new_result.inserted_id, project_id, crawl_data["issues"])
+    await save_fingerprints(new_result.inserted_id, project_id, crawl_data.get("fingerprints", []))
+
+    if pages:
+        inserted = await scan_results_collection.insert_many([
+            build_scan_result(project_id, page, "page", pageUrl=page["url"], parentScanId=new_result.inserted_id)
+            for page in pages
+        ])
+        for page, page_id in zip(pages, inserted.inserted_ids):
+            await save_issues(page_id, project_id, page["issues"])
+    logger.info(f"Crawl completed for project {project_id}: {len(pages)} pages, Score {site_result['accessibilityScore']}")
+    return new_result.inserted_id
+
+class ScanJobScheduler:
+    """Dispatches queued scan jobs to the scanner pool, fairly across users"""
+
+    def __init__(self, max_concurrent: int):
+        self.max_concurrent = max_concurrent
+        # userId -> queued job ids; users are served round-robin in insertion order
+        self._queues: "OrderedDict[str, Deque[ObjectId]]" = OrderedDict()
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._tasks = []
+        self._finish_listeners: List[Callable[[Dict], Awaitable[None]]] = []
+        # Running jobs carry this owner and a lease the heartbeat keeps extending
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Set[ObjectId] = set()
+
+    @property
+    def queue_depth(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    async def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        # Dedicated threads so scans never eat into the default executor
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="scan")
+        await self._recover()
+        self._tasks = [asyncio.create_task(self._dispatch_loop()) for _ in range(self.max_concurrent)]
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        if self._executor:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _lease_until(self, now: datetime) -> datetime:
+        return now + timedelta(seconds=settings.scan_job_lease_seconds)
+
+    async def _fail_expired(self):
+        """Fail running jobs whose owner stopped renewing their lease (crashed or restarted)"""
+        now = datetime.now(timezone.utc)
+        # Jobs claimed before leases existed have none; no live process is running them
+        result = await scan_jobs_collection.update_many(
+            {"status": "running", "$or": [{"leaseUntil": {"$lt": now}}, {"leaseUntil": None}]},
+            {"$set": {"status": "failed", "error": "Scan was interrupted", "finishedAt": now},
+             "$push": {"stages": {"stage": "failed", "at": now}}},
+        )
+        if result.modified_count:
+            logger.warning(f"Failed {result.modified_count} interrupted scan jobs")
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(settings.scan_job_lease_seconds / 3)
+            try:
+                if self._running:
+                    await scan_jobs_collection.update_many(
+                        {"_id": {"$in": list(self._running)}, "status": "running", "owner": self.owner},
+                        {"$set": {"leaseUntil": self._lease_until(datetime.now(timezone.utc))}},
+                    )
+                await self._fail_expired()
+            except Exception as e:
+                logger.error(f"Scan job heartbeat failed: {str(e)}")
+
+    async def _recover(self):
+        """Fail interrupted jobs and requeue queued ones left over from a previous run"""
+        await self._fail_expired()
+        async for job in scan_jobs_collection.find({"status": "queued"}, {"userId": 1}).sort("createdAt", 1):
+            self._enqueue(job["userId"], job["_id"])
+
+    async def submit(self, project: Optional[Dict], user_id: ObjectId, mode: str = "single",
+                     options: Optional[Dict] = None, incremental: bool = False, **fields) -> Dict:
+        now = datetime.now(timezone.utc)
+        job = {
+            "projectId": project["_id"] if project else None,
+            "userId": user_id,
+            "mode": mode,
+            "options": options,
+            "incremental": incremental,
+            "status": "queued",
+            "stages": [{"stage": "queued", "at": now}],
+            "resultId": None,
+            "error": None,
+            "createdAt": now,
+            "startedAt": None,
+            "finishedAt": None,
+            **fields,
+        }
+        new_job = await scan_jobs_collection.insert_one(job)
+        job["_id"] = new_job.inserted_id
+        self._enqueue(user_id, job["_id"])
+        return job
+
+    async def submit_batch(self, projects: List[Dict], user_id: ObjectId) -> Dict:
+        """Queue one job scanning all `projects` on a shared browser"""
+        return await self.submit(
+            None, user_id, "batch", {"projectIds": [project["_id"] for project in projects]},
+            batch={"total": len(projects), "completed": 0, "failed": 0, "results": []},
+        )
+
+    def _enqueue(self, user_id: ObjectId, job_id: ObjectId):
+        self._queues.setdefault(str(user_id), deque()).append(job_id)
+        if self._wakeup:
+            self._wakeup.set()
+
+    def _next_job_id(self) -> Optional[ObjectId]:
+        if not self._queues:
+            return None
+        user_key, jobs = self._queues.popitem(last=False)
+        job_id = jobs.popleft()
+        if jobs:
+            # Back of the line until every other waiting user has had a turn
+            self._queues[user_key] = jobs
+        return job_id
+
+    async def _dispatch_loop(self):
+        while True:
+            job_id = self._next_job_id()
+            if job_id is None:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+            try:
+                await self._run(job_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scan job {job_id} crashed the scheduler: {e}")
+
+    async def _run(self, job_id: ObjectId):
+        now = datetime.now(timezone.utc)
+        # Atomic claim: with several app processes, only one of them runs a job
+        job = await scan_jobs_collection.find_one_and_update(
+            {"_id": job_id, "status": "queued"},
+            {"$set": {"status": "running", "startedAt": now, "owner": self.owner, "leaseUntil": self._lease_until(now)}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return
+        self._running.add(job_id)
+        try:
+            await self._run_claimed(job)
+        finally:
+            self._running.discard(job_id)
+
+    async def _run_claimed(self, job: Dict):
+        job_id = job["_id"]
+        await self.publish(job_id, "started")
+
+        if job.get("mode") == "batch":
+            await self._run_batch(job)
+            return
+
+        project = await projects_collection.find_one({"_id": job["projectId"]})
+        if not project:
+            await self._finish(job_id, "failed", error="Project not found")
+            return
+
+        pending = []
+        # Streamed issues are stored under the result's id before the result itself exists
+        issue_writer = IssueWriter(ObjectId(), project["_id"])
+
+        def schedule_publish(stage: str):
+            pending.append(asyncio.ensure_future(self.publish(job_id, stage)))
+
+        def on_progress(stage: str):
+            # Called from the scan thread; hop back onto the event loop
+            self._loop.call_soon_threadsafe(schedule_publish, stage)
+
+        def on_issues(issues: List[Dict]):
+            self._loop.call_soon_threadsafe(issue_writer.add, issues)
+
+        project_id = str(project["_id"])
+        try:
+            logger.info(f"Starting scan job {job_id} for project {project_id}")
+            if job.get("mode") == "crawl":
+                crawl_data = await self._loop.run_in_executor(
+                    self._executor, crawl_website, project["url"], project_id, job["options"], on_progress
+                )
+                observe_stage_timings(crawl_data)
+                with metrics.scan_stage_seconds.time(stage="mongo_insert"):
+                    result_id = await save_crawl_result(project["_id"], crawl_data)
+            else:
+                previous = await find_previous_scan(project["_id"]) if job.get("incremental") else None
+                previous_state = {field: previous.get(field) for field in PAGE_STATE_FIELDS} if previous else None
+                scan_data = await self._loop.run_in_executor(
+                    self._executor, scan_website, project["url"], project_id, on_progress, previous_state, on_issues
+                )
+                observe_stage_timings(scan_data)
+                with metrics.scan_stage_seconds.time(stage="mongo_insert"):
+                    if scan_data.get("unchanged") and previous:
+                        result_id = await save_unchanged_result(project["_id"], previous, scan_data)
+                    else:
+                        await issue_writer.flush()
+                        result_id = await save_scan_result(project["_id"], scan_data, issue_writer.scan_id,
+                                                           issue_writer.saved)
+        except Exception as e:
+            logger.error(f"Scan failed for project {project_id}: {str(e)}")
+            await asyncio.gather(*pending, return_exceptions=True)
+            await issue_writer.discard()
+            await self._finish(job_id, "failed", error=f"Scan failed: {sanitize_error_message(e)}")
+            return
+
+        try:
+            await record_scan(project, result_id)
+        except Exception as e:
+            # The scan itself is saved; a stale dashboard rollup shouldn't fail the job
+            logger.error(f"Could not update rollups for project {project_id}: {str(e)}")
+
+        # Keep stages in order: progress events land before the terminal one
+        await asyncio.gather(*pending, return_exceptions=True)
+        await self._finish(job_id, "completed", resultId=result_id)
+
+    async def _run_batch(self, job: Dict):
+        """Scan every project of a batch job, saving results in insert_many chunks as they arrive"""
+        job_id = job["_id"]
+        projects = await projects_collection.find(
+            {"_id": {"$in": job["options"]["projectIds"]}, "userId": job["userId"]}
+        ).to_list(None)
+        by_id = {str(project["_id"]): project for project in projects}
+        # Projects deleted since the batch was queued
+        missing = [{"projectId": project_id, "error": "Project not found"}
+                   for project_id in job["options"]["projectIds"] if str(project_id) not in by_id]
+        batch = {"total": job["batch"]["total"], "completed": 0, "failed": len(missing), "results": missing}
+        received: asyncio.Queue = asyncio.Queue()
+        buffered: List[Dict] = []
+
+        async def flush():
+            if not buffered:
+                return
+            docs = [build_scan_result(item["project"]["_id"], item["data"]) for item in buffered]
+            with metrics.scan_stage_seconds.time(stage="mongo_insert"):
+                inserted = await scan_results_collection.insert_many(docs)
+            for item, doc, result_id in zip(buffered, docs, inserted.inserted_ids):
+                await save_issues(result_id, item["project"]["_id"], item["data"]["issues"])
+                await save_fingerprints(result_id, item["project"]["_id"], item["data"].get("fingerprints", []))
+                batch["results"].append({"projectId": item["project"]["_id"], "resultId": result_id,
+                                         "score": doc["accessibilityScore"]})
+                try:
+                    await record_scan(item["project"], result_id)
+                except Exception as e:
+                    logger.error(f"Could not update rollups for project {item['project']['_id']}: {str(e)}")
+            buffered.clear()
+            await self.publish(job_id, "results_saved", batch=batch)
+
+        async def consume():
+            while True:
+                item = await received.get()
+                if item is None:
+                    break
+                project_id, data = item
+                project = by_id.get(project_id)
+                if project is None:
+                    continue
+                if "error" in data:
+                    batch["failed"] += 1
+                    batch["results"].append({"projectId": project["_id"], "error": sanitize_error_message(data["error"])})
+                else:
+                    batch["completed"] += 1
+                    observe_stage_timings(data)
+                    buffered.append({"project": project, "data": data})
+                if len(buffered) >= settings.batch_insert_size:
+                    await flush()
+                else:
+                    await self.publish(job_id, "project_scanned", batch=batch)
+
+        def on_result(project_id: str, data: Dict):
+            # Called from the scan thread; hop back onto the event loop
+            self._loop.call_soon_threadsafe(received.put_nowait, (project_id, data))
+
+        consumer = asyncio.create_task(consume())
+        targets = [{"url": project["url"], "project_id": str(project["_id"])} for project in projects]
+        logger.info(f"Starting batch scan job {job_id}: {len(targets)} projects")
+        error = None
+        try:
+            if targets:
+                await self._loop.run_in_executor(self._executor, batch_scan_websites, targets, on_result)
+        except Exception as e:
+            logger.error(f"Batch scan job {job_id} failed: {str(e)}")
+            error = f"Scan failed: {sanitize_error_message(e)}"
+
+        # Results delivered before the scan returned were scheduled first, so they're queued ahead of this
+        received.put_nowait(None)
+        try:
+            await consumer
+            await flush()
+        except Exception as e:
+            logger.error(f"Could not save batch scan job {job_id} results: {str(e)}")
+            await self._finish(job_id, "failed", error=f"Scan failed: {sanitize_error_message(e)}", batch=batch)
+            return
+
+        # A batch that saved anything completed; `error` says why it stopped early
+        status = "failed" if error and not batch["completed"] else "completed"
+        await self._finish(job_id, status, error=error, batch=batch)
+
+    def add_finish_listener(self, listener: Callable[[Dict], Awaitable[None]]):
+        """Have `listener(job)` awaited whenever a job completes or fails"""
+        self._finish_listeners.append(listener)
+
+    async def _finish(self, job_id: ObjectId, status: str, **fields):
+        fields["finishedAt"] = datetime.now(timezone.utc)
+        # Only while this process still holds the job; an expired lease means it was already failed
+        job = await self.publish(job_id, status, {"status": "running", "owner": self.owner}, status=status, **fields)
+        if not job:
+            logger.warning(f"Scan job {job_id} was no longer leased to this process; dropped its {status} status")
+            return
+        mode = job.get("mode") or "single"
+        metrics.scan_jobs_total.inc(mode=mode, status=status)
+        if job.get("startedAt"):
+            duration = (job["finishedAt"] - job["startedAt"]).total_seconds()
+            metrics.scan_duration_seconds.observe(duration, mode=mode, status=status)
+        for listener in self._finish_listeners:
+            try:
+                await listener(job)
+            except Exception as e:
+                logger.error(f"Job finish listener failed for {job_id}: {str(e)}")
+
+    async def publish(self, job_id: ObjectId, stage: str, condition: Optional[Dict] = None, **fields) -> Optional[Dict]:
+        """Record a progress stage on the job (if it matches `condition`) and notify live subscribers"""
+        entry = {"stage": stage, "at": datetime.now(timezone.utc)}
+        job = await scan_jobs_collection.find_one_and_update(
+            {"_id": job_id, **(condition or {})},
+            {"$push": {"stages": entry}, "$set": fields} if fields else {"$push": {"stages": entry}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not job:
+            return None
+        event = stage_event(job, entry)
+        for subscriber in self._subscribers.get(str(job_id), ()):
+            subscriber.put_nowait(event)
+        return job
+
+    def subscribe(self, job_id: ObjectId) -> asyncio.Queue:
+        subscriber: asyncio.Queue = asyncio.Queue()
+        self._subscribers.setdefault(str(job_id), set()).add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, job_id: ObjectId, subscriber: asyncio.Queue):
+        subscribers = self._subscribers.get(str(job_id))
+        if subscribers is not None:
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[str(job_id)]
+
+scan_job_scheduler = ScanJobScheduler(max_concurrent=settings.scanner_pool_size)
+
+metrics.Gauge("aura_scan_queue_depth", "Scan jobs waiting for a scanner worker",
+              callback=lambda: {(): scan_job_scheduler.queue_depth})
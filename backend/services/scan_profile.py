@@ -0,0 +1,99 @@
+"""
+Scan profile: what a scanned page is allowed to load, and when it's settled.
+
+Requests to analytics and ad hosts, and media/font downloads, don't change
+what axe checks but can dominate load time, so categories of them are
+aborted through Playwright routing. Instead of a fixed sleep after
+navigation, the page is considered settled once the network is idle and
+the DOM has stopped changing for a moment, with an upper bound.
+"""
+import time
+from typing import Dict, Iterable
+from urllib.parse import urlparse
+
+from playwright.async_api import TimeoutError as PlaywrightTimeout
+
+BLOCKED_HOSTS = {
+    "analytics": (
+        "google-analytics.com", "analytics.google.com", "googletagmanager.com", "segment.com", "segment.io",
+        "mixpanel.com", "hotjar.com", "hotjar.io", "fullstory.com", "amplitude.com", "heapanalytics.com",
+        "clarity.ms", "nr-data.net", "newrelic.com", "quantserve.com", "scorecardresearch.com",
+        "stats.wp.com", "mouseflow.com", "crazyegg.com", "matomo.cloud",
+    ),
+    "ads": (
+        "doubleclick.net", "googlesyndication.com", "googleadservices.com", "adservice.google.com",
+        "amazon-adsystem.com", "adnxs.com", "criteo.com", "criteo.net", "taboola.com", "outbrain.com",
+        "pubmatic.com", "rubiconproject.com", "moatads.com", "ads-twitter.com", "ads.linkedin.com",
+        "connect.facebook.net", "bat.bing.com",
+    ),
+}
+BLOCKED_RESOURCE_TYPES = {
+    "media": ("media",),
+    "fonts": ("font",),
+}
+
+# Rough typical transfer sizes, used to estimate what blocking saved: an aborted request never gets
+# a response, so its real size is unknown (hence blockedBytesEstimate, not a measurement)
+ESTIMATED_BYTES = {"script": 60_000, "media": 1_000_000, "font": 40_000, "image": 30_000, "xhr": 5_000, "fetch": 5_000}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+# Resolves once no DOM mutation happened for quietMs, or after timeoutMs
+DOM_QUIET_JS = """([quietMs, timeoutMs]) => new Promise(resolve => {
+    let quietTimer;
+    const done = () => { observer.disconnect(); clearTimeout(quietTimer); clearTimeout(capTimer); resolve(); };
+    const observer = new MutationObserver(() => {
+        clearTimeout(quietTimer);
+        quietTimer = setTimeout(done, quietMs);
+    });
+    observer.observe(document, { subtree: true, childList: true, attributes: true, characterData: true });
+    quietTimer = setTimeout(done, quietMs);
+    const capTimer = setTimeout(done, timeoutMs);
+})"""
+
+class ResourceBlocker:
+    """Aborts requests in the configured categories and counts them"""
+
+    def __init__(self, categories: Iterable[str]):
+        categories = set(categories)
+        self.hosts = tuple(host for category in categories for host in BLOCKED_HOSTS.get(category, ()))
+        self.resource_types = {t for category in categories for t in BLOCKED_RESOURCE_TYPES.get(category, ())}
+        self.blocked = 0
+        self.estimated_bytes = 0
+
+    def should_block(self, url: str, resource_type: str) -> bool:
+        if resource_type in self.resource_types:
+            return True
+        host = (urlparse(url).hostname or "").lower()
+        return any(host == blocked or host.endswith("." + blocked) for blocked in self.hosts)
+
+    async def install(self, context):
+        if self.hosts or self.resource_types:
+            await context.route("**/*", self._handle)
+
+    async def _handle(self, route):
+        request = route.request
+        if self.should_block(request.url, request.resource_type):
+            self.blocked += 1
+            self.estimated_bytes += ESTIMATED_BYTES.get(request.resource_type, DEFAULT_ESTIMATED_BYTES)
+            await route.abort("blockedbyclient")
+        else:
+            # Let any other route handler (or the network) take it
+            await route.fallback()
+
+    def stats(self) -> Dict[str, int]:
+        return {"blockedRequests": self.blocked, "blockedBytesEstimate": self.estimated_bytes}
+
+async def wait_until_settled(page, max_ms: int, quiet_ms: int) -> int:
+    """Wait for network idle, then DOM quiescence, within max_ms; returns ms waited"""
+    start = time.monotonic()
+    try:
+        await page.wait_for_load_state("networkidle", timeout=max_ms)
+    except PlaywrightTimeout:
+        pass  # Long-polling or streaming pages never go idle; the DOM check still applies
+    remaining = max_ms - (time.monotonic() - start) * 1000
+    if remaining > 0:
+        try:
+            await page.evaluate(DOM_QUIET_JS, [quiet_ms, int(remaining)])
+        except Exception:
+            pass  # Navigated away or context destroyed mid-wait
+    return round((time.monotonic() - start) * 1000)
@@ -0,0 +1,259 @@
+"""
+Recurring scans.
+
+Each project can have one schedule in `scan_schedules`, either every N
+minutes or a five-field cron expression (UTC). A loop in every app process
+polls for due schedules and claims each with a compare-and-set on its
+`nextRunAt` that also takes a short lease, so however many uvicorn workers
+or hosts run the loop, a given run is submitted once. Start times get random
+jitter so schedules created together don't hit the scanner pool together,
+and schedules whose scans keep failing back off exponentially.
+"""
+import asyncio
+import os
+import random
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional, Set
+
+from bson import ObjectId
+from pymongo import DESCENDING, ReturnDocument
+
+from config import settings
+from database import projects_collection, scan_jobs_collection, scan_results_collection, scan_schedules_collection
+from services.scan_diff import diff_scans
+from services.scan_jobs import scan_job_scheduler
+from utils import logger
+
+CRON_FIELDS = (("minute", 0, 59), ("hour", 0, 23), ("day", 1, 31), ("month", 1, 12), ("weekday", 0, 6))
+
+class CronExpression:
+    """Minimal cron: `*`, numbers, ranges, lists and `/step` in five fields"""
+
+    def __init__(self, expression: str):
+        parts = expression.split()
+        if len(parts) != 5:
+            raise ValueError("Cron expression needs 5 fields: minute hour day month weekday")
+        self.fields: Dict[str, Set[int]] = {
+            name: self._parse(part, low, high) for part, (name, low, high) in zip(parts, CRON_FIELDS)
+        }
+        # Like cron: if both day and weekday are restricted, either may match
+        self.any_day = parts[2] == "*"
+        self.any_weekday = parts[4] == "*"
+
+    @staticmethod
+    def _parse(part: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for item in part.split(","):
+            item, _, step = item.partition("/")
+            if item == "*":
+                start, end = low, high
+            elif "-" in item:
+                start, end = (int(v) for v in item.split("-", 1))
+            else:
+                start = end = int(item)
+                if step:
+                    end = high
+            step = int(step) if step else 1
+            if start < low or end > high or start > end or step < 1:
+                raise ValueError(f"Cron field out of range: {part}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: datetime) -> bool:
+        day_ok = day.day in self.fields["day"]
+        # cron counts Sunday as 0, Python counts Monday as 0
+        weekday_ok = (day.weekday() + 1) % 7 in self.fields["weekday"]
+        if self.any_day or self.any_weekday:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, after: datetime) -> datetime:
+        """First matching minute strictly after `after`"""
+        start = after.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        # Four years covers every valid day/month combination, including Feb 29
+        for _ in range(366 * 4):
+            if day.month in self.fields["month"] and self._day_matches(day):
+                for hour in sorted(self.fields["hour"]):
+                    for minute in sorted(self.fields["minute"]):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError("Cron expression never matches")
+
+def next_regular_run(schedule: Dict, after: datetime) -> datetime:
+    """Next run time per the schedule definition, without jitter or backoff"""
+    if schedule.get("cron"):
+        return CronExpression(schedule["cron"]).next_after(after)
+    return after + timedelta(minutes=schedule["intervalMinutes"])
+
+def shortest_gap(schedule: Dict, samples: int = 48) -> timedelta:
+    """Smallest time between consecutive runs (sampled over the next cron runs)"""
+    if not schedule.get("cron"):
+        return timedelta(minutes=schedule["intervalMinutes"])
+    run = next_regular_run(schedule, datetime.now(timezone.utc))
+    gap = timedelta.max
+    for _ in range(samples):
+        following = next_regular_run(schedule, run)
+        gap, run = min(gap, following - run), following
+    return gap
+
+def jitter(schedule: Dict) -> timedelta:
+    """Random delay of up to schedule_jitter_seconds, never more than a tenth of the gap"""
+    limit = min(settings.schedule_jitter_seconds, shortest_gap(schedule).total_seconds() / 10)
+    return timedelta(seconds=random.uniform(0, limit))
+
+def backoff(failures: int) -> timedelta:
+    if failures <= 0:
+        return timedelta(0)
+    minutes = settings.schedule_backoff_minutes * 2 ** (failures - 1)
+    return timedelta(minutes=min(minutes, settings.schedule_max_backoff_minutes))
+
+def next_run(schedule: Dict, now: datetime, failures: int = 0) -> datetime:
+    return max(next_regular_run(schedule, now), now + backoff(failures)) + jitter(schedule)
+
+class ScanScheduleRunner:
+    """Submits due scheduled scans to the job scheduler"""
+
+    def __init__(self, poll_seconds: int, lease_seconds: int):
+        self.poll_seconds = poll_seconds
+        self.lease_seconds = lease_seconds
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._task: Optional[asyncio.Task] = None
+
+    async def start(self):
+        scan_job_scheduler.add_finish_listener(self.on_job_finished)
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            self._task = None
+
+    async def _loop(self):
+        while True:
+            try:
+                while await self.run_due():
+                    pass
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Scan schedule loop error: {str(e)}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def run_due(self) -> int:
+        """Claim and submit due schedules; returns how many were claimed"""
+        now = datetime.now(timezone.utc)
+        due = await scan_schedules_collection.find(
+            {"enabled": True, "nextRunAt": {"$lte": now}, "leaseUntil": {"$not": {"$gt": now}}}
+        ).sort("nextRunAt", 1).to_list(50)
+
+        claimed = 0
+        for schedule in due:
+            # Compare-and-set on nextRunAt: only one process wins each run, and
+            # the run is advanced even if this process dies before submitting
+            won = await scan_schedules_collection.find_one_and_update(
+                {"_id": schedule["_id"], "nextRunAt": schedule["nextRunAt"], "leaseUntil": {"$not": {"$gt": now}}},
+                {"$set": {
+                    "nextRunAt": next_run(schedule, now, schedule.get("consecutiveFailures", 0)),
+                    "leaseOwner": self.owner,
+                    "leaseUntil": now + timedelta(seconds=self.lease_seconds),
+                }},
+                return_document=ReturnDocument.AFTER,
+            )
+            if won:
+                claimed += 1
+                await self._submit(won)
+        return claimed
+
+    async def _submit(self, schedule: Dict):
+        update = {"leaseOwner": None, "leaseUntil": None}
+        try:
+            last_job = None
+            if schedule.get("lastJobId"):
+                last_job = await scan_jobs_collection.find_one({"_id": schedule["lastJobId"]}, {"status": 1})
+            project = await projects_collection.find_one({"_id": schedule["projectId"]})
+            if not project:
+                update["enabled"] = False
+            elif last_job and last_job["status"] in ("queued", "running"):
+                # Don't pile up runs behind a scan that is still going
+                logger.info(f"Skipping scheduled scan for project {project['_id']}: previous run still active")
+            else:
+                job = await scan_job_scheduler.submit(
+                    project, schedule["userId"], schedule.get("mode", "single"), schedule.get("options"),
+                    incremental=schedule.get("incremental", False), scheduleId=schedule["_id"],
+                )
+                update.update(lastJobId=job["_id"], lastRunAt=job["createdAt"])
+                logger.info(f"Queued scheduled scan job {job['_id']} for project {project['_id']}")
+        finally:
+            await scan_schedules_collection.update_one(
+                {"_id": schedule["_id"], "leaseOwner": self.owner}, {"$set": update}
+            )
+
+    async def regression_check(self, job: Dict) -> Optional[Dict]:
+        """Fingerprint diff of a scheduled scan against the project's previous scan"""
+        latest = await scan_results_collection.find_one({"_id": job["resultId"]}, {"createdAt": 1, "fingerprinted": 1})
+        if not latest or not latest.get("fingerprinted"):
+            return None
+        previous = await scan_results_collection.find_one(
+            {"projectId": job["projectId"], "parentScanId": None, "_id": {"$ne": latest["_id"]},
+             "createdAt": {"$lte": latest["createdAt"]}},
+            {"fingerprinted": 1},
+            sort=[("createdAt", DESCENDING), ("_id", DESCENDING)],
+        )
+        if not previous or not previous.get("fingerprinted"):
+            return None
+        diff = await diff_scans(previous["_id"], latest["_id"], limit=None)
+        if diff["newCount"]:
+            logger.warning(f"Scheduled scan of project {job['projectId']} found {diff['newCount']} new violations "
+                           f"({diff['fixedCount']} fixed) since result {previous['_id']}")
+        return diff
+
+    async def on_job_finished(self, job: Dict):
+        """Track failures of scheduled scans and back off while they keep failing"""
+        if not job.get("scheduleId"):
+            return
+        if job["status"] == "completed":
+            update = {"consecutiveFailures": 0, "lastStatus": "completed"}
+            try:
+                update["lastDiff"] = await self.regression_check(job)
+            except Exception as e:
+                logger.error(f"Could not diff scheduled scan job {job['_id']}: {str(e)}")
+            await scan_schedules_collection.update_one({"_id": job["scheduleId"]}, {"$set": update})
+            return
+
+        schedule = await scan_schedules_collection.find_one_and_update(
+            {"_id": job["scheduleId"]},
+            {"$inc": {"consecutiveFailures": 1}, "$set": {"lastStatus": "failed"}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if schedule:
+            now = datetime.now(timezone.utc)
+            delayed = next_run(schedule, now, schedule["consecutiveFailures"])
+            await scan_schedules_collection.update_one(
+                {"_id": schedule["_id"], "nextRunAt": {"$lt": delayed}}, {"$set": {"nextRunAt": delayed}}
+            )
+
+async def save_schedule(project: Dict, user_id: ObjectId, definition: Dict) -> Dict:
+    """Create or replace the project's schedule; the first run is computed from now"""
+    now = datetime.now(timezone.utc)
+    schedule = {
+        **definition,
+        "projectId": project["_id"],
+        "userId": user_id,
+        "consecutiveFailures": 0,
+        "updatedAt": now,
+    }
+    schedule["nextRunAt"] = next_run(schedule, now)
+    return await scan_schedules_collection.find_one_and_update(
+        {"projectId": project["_id"]},
+        {"$set": schedule, "$setOnInsert": {"createdAt": now, "leaseOwner": None, "leaseUntil": None,
+                                            "lastJobId": None, "lastRunAt": None, "lastStatus": None}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+
+scan_schedule_runner = ScanScheduleRunner(settings.schedule_poll_seconds, settings.schedule_lease_seconds)
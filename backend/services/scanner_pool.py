@@ -0,0 +1,310 @@
+"""
+Pool of long-lived scanner worker processes.
+
+Each worker runs `scanner_process.py --worker`, keeps one Chromium instance
+warm and scans every request in a fresh BrowserContext. Workers are recycled
+after `scanner_worker_max_scans` scans, on crash, on timeout, or when a
+health check fails.
+
+Messages travel as length-prefixed frames (see services/framing.py) over
+the worker's stdin and stdout pipes. The worker keeps a private descriptor
+for the stdout pipe and points its own fd 1 at stderr, so output from
+libraries can't corrupt the channel.
+"""
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+from config import settings
+from services import metrics
+from services.framing import FrameError, read_frame, write_frame
+from utils import logger
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCRIPT_PATH = os.path.join(BACKEND_DIR, "scanner_process.py")
+
+def worker_options() -> Dict:
+    """Settings forwarded to each worker process"""
+    return {
+        "caption_cache_dir": settings.caption_cache_dir,
+        "captioner_threads": settings.captioner_threads,
+        "captioner_quantize": settings.captioner_quantize,
+        "captioner_batch_size": settings.captioner_batch_size,
+        "captioner_batch_wait_ms": settings.captioner_batch_wait_ms,
+        "alt_text_max_images": settings.alt_text_max_images,
+        "image_max_bytes": settings.image_max_bytes,
+        "image_fetch_timeout": settings.image_fetch_timeout,
+        "image_fetch_concurrency": settings.image_fetch_concurrency,
+        "screenshot_format": settings.screenshot_format,
+        "screenshot_quality": settings.screenshot_quality,
+        "thumbnail_width": settings.thumbnail_width,
+        "max_issue_samples": settings.max_issue_samples,
+        "max_snippet_chars": settings.max_snippet_chars,
+        "max_result_bytes": settings.max_result_bytes,
+        "block_categories": settings.scan_block_categories,
+        "settle_max_ms": settings.scan_settle_max_ms,
+        "settle_quiet_ms": settings.scan_settle_quiet_ms,
+        "readability_char_budget": settings.readability_char_budget,
+        "http_cache_dir": settings.http_cache_dir,
+        "http_cache_max_bytes": settings.http_cache_max_bytes,
+    }
+
+class WorkerError(RuntimeError):
+    """The worker process died or stopped responding; it must be replaced."""
+
+class ScanError(RuntimeError):
+    """A request failed inside a healthy worker; `kind` is the worker-side exception type"""
+
+    def __init__(self, message: str, kind: str = "Exception"):
+        super().__init__(message)
+        self.kind = kind
+
+class ScannerWorker:
+    """One scanner process and the framed message channel to it"""
+
+    def __init__(self):
+        self.scans = 0
+        self._next_id = 0
+        self._messages: "queue.Queue[Optional[Dict]]" = queue.Queue()
+        self.ready = False
+        self.spawned_at = time.monotonic()
+        self.ready_wait_ms = 0  # How long the latest request waited for startup
+        self._stats: Dict[str, int] = {}
+        self._bad_frame: Optional[FrameError] = None  # Why the reader thread stopped, if it was a bad frame
+        self.process = subprocess.Popen(
+            [sys.executable, SCRIPT_PATH, "--worker", json.dumps(worker_options())],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            cwd=BACKEND_DIR,
+        )
+        # Reading on a thread lets every wait below have a timeout
+        threading.Thread(target=self._read_stdout, daemon=True).start()
+
+    def _read_stdout(self):
+        try:
+            while True:
+                message = read_frame(self.process.stdout)
+                if message is None:
+                    break
+                self._messages.put(message)
+        except FrameError as e:
+            logger.error(f"Scanner worker sent a bad frame: {e}")
+            self._bad_frame = e
+        except OSError as e:
+            logger.error(f"Could not read from scanner worker: {e}")
+        self._messages.put(None)
+
+    def _read_message(self, deadline: float) -> Dict:
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError("Scanner worker did not respond in time")
+            try:
+                message = self._messages.get(timeout=remaining)
+            except queue.Empty:
+                raise TimeoutError("Scanner worker did not respond in time")
+            if message is None:
+                if self._bad_frame:
+                    raise WorkerError(f"Scanner returned invalid data: {self._bad_frame}")
+                raise WorkerError("Scanner worker exited unexpectedly")
+            return message
+
+    def _wait_ready(self, deadline: float):
+        self.ready_wait_ms = 0
+        if self.ready:
+            return
+        waiting_since = time.monotonic()
+        message = self._read_message(deadline)
+        if message.get("event") != "ready":
+            raise WorkerError("Scanner worker failed to start")
+        self.ready = True
+        self.ready_wait_ms = round((time.monotonic() - waiting_since) * 1000)
+        metrics.worker_startup_seconds.observe(time.monotonic() - self.spawned_at, phase="process")
+        if message.get("browserLaunchMs") is not None:
+            metrics.worker_startup_seconds.observe(message["browserLaunchMs"] / 1000, phase="browser_launch")
+
+    def _record_stats(self, stats: Dict):
+        """Turn the worker's cumulative cache counters into metric increments"""
+        for key, cache, result in (("captionHits", "caption", "hit"), ("captionMisses", "caption", "miss"),
+                                   ("contrastHits", "contrast", "hit"), ("contrastMisses", "contrast", "miss"),
+                                   ("readabilityHits", "readability", "hit"), ("readabilityMisses", "readability", "miss"),
+                                   ("httpCacheHits", "http", "hit"), ("httpCacheMisses", "http", "miss"),
+                                   ("httpCacheRevalidated", "http", "revalidated")):
+            delta = stats.get(key, 0) - self._stats.get(key, 0)
+            if delta > 0:
+                metrics.cache_requests_total.inc(delta, cache=cache, result=result)
+        saved = stats.get("httpCacheBytesSaved", 0) - self._stats.get("httpCacheBytesSaved", 0)
+        if saved > 0:
+            metrics.http_cache_bytes_saved_total.inc(saved)
+        if stats.get("captionerLoadMs") and not self._stats.get("captionerLoadMs"):
+            metrics.worker_startup_seconds.observe(stats["captionerLoadMs"] / 1000, phase="blip_load")
+        self._stats = stats
+
+    def request(self, payload: Dict, timeout: float, on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Send one request and block until its response arrives.
+
+        Intermediate event messages for the request are passed to `on_event`.
+        """
+        deadline = time.monotonic() + timeout
+        self._wait_ready(deadline)
+
+        self._next_id += 1
+        request_id = self._next_id
+        try:
+            write_frame(self.process.stdin, {"id": request_id, **payload})
+        except (BrokenPipeError, OSError):
+            raise WorkerError("Scanner worker exited unexpectedly")
+
+        while True:
+            message = self._read_message(deadline)
+            if message.get("id") != request_id:
+                continue
+            if "event" in message:
+                if on_event:
+                    on_event(message)
+                continue
+            if "error" in message:
+                error = message["error"]
+                raise ScanError(error.get("message", ""), error.get("type", "Exception"))
+            if message.get("stats"):
+                self._record_stats(message["stats"])
+            return message.get("result")
+
+    def is_alive(self) -> bool:
+        return self.process.poll() is None
+
+    def close(self):
+        try:
+            self.process.stdin.close()
+            self.process.wait(timeout=5)
+        except Exception:
+            self.process.kill()
+
+    def kill(self):
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+class ScannerPool:
+    """Thread-safe pool handing out idle workers, one request at a time each"""
+
+    def __init__(self, size: int, max_scans: int, health_check_interval: float):
+        self.size = size
+        self.max_scans = max_scans
+        self.health_check_interval = health_check_interval
+        self._idle: "queue.Queue[ScannerWorker]" = queue.Queue()
+        self._started = False
+        self._stopping = threading.Event()
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+            self._stopping.clear()
+        for _ in range(self.size):
+            self._idle.put(ScannerWorker())
+        threading.Thread(target=self._monitor, daemon=True).start()
+        logger.info(f"Scanner pool started with {self.size} workers")
+
+    def shutdown(self):
+        self._stopping.set()
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+        with self._lock:
+            self._started = False
+
+    def run(self, payload: Dict, timeout: float, on_event: Optional[Callable[[Dict], None]] = None) -> Dict:
+        """Run one request on an idle worker, replacing the worker if it fails"""
+        if not self._started:
+            self.start()
+
+        # One deadline for the whole call: time spent waiting for a worker counts against the request
+        waiting_since = time.monotonic()
+        deadline = waiting_since + timeout
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise RuntimeError("All scanner workers are busy, please try again later")
+        pool_wait_ms = round((time.monotonic() - waiting_since) * 1000)
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            self._release(worker, None)
+            raise RuntimeError("All scanner workers are busy, please try again later")
+
+        replace = None
+        try:
+            result = worker.request(payload, remaining, on_event)
+            worker.scans += 1
+            if worker.scans >= self.max_scans:
+                replace = "recycled"
+            if isinstance(result, dict):
+                timings = result.setdefault("stageTimings", {})
+                timings["pool_wait"] = pool_wait_ms
+                if worker.ready_wait_ms:
+                    # First request on a fresh worker: process spawn + browser launch
+                    timings["worker_startup"] = worker.ready_wait_ms
+            return result
+        except (WorkerError, TimeoutError):
+            replace = "failed"
+            raise
+        finally:
+            self._release(worker, replace)
+
+    def _release(self, worker: ScannerWorker, replace: Optional[str]):
+        """Return a worker to the pool, or replace it (`replace` names the reason)"""
+        if replace or not worker.is_alive():
+            metrics.worker_restarts_total.inc(reason=replace or "exited")
+            worker.kill()
+            if self._stopping.is_set():
+                return
+            worker = ScannerWorker()
+        elif self._stopping.is_set():
+            worker.close()
+            return
+        self._idle.put(worker)
+
+    def _monitor(self):
+        """Ping idle workers periodically and replace any that fail"""
+        while not self._stopping.wait(self.health_check_interval):
+            for _ in range(self._idle.qsize()):
+                try:
+                    worker = self._idle.get_nowait()
+                except queue.Empty:
+                    break
+                if not worker.ready and worker.is_alive():
+                    # Still launching its browser; the first request will wait for it
+                    self._idle.put(worker)
+                    continue
+                healthy = True
+                try:
+                    worker.request({"cmd": "ping"}, timeout=10)
+                except Exception as e:
+                    logger.warning(f"Scanner worker failed health check: {e}")
+                    healthy = False
+                self._release(worker, replace=None if healthy else "health_check")
+
+    def utilization(self) -> Dict:
+        """Worker counts by state, for the metrics endpoint"""
+        idle = self._idle.qsize() if self._started else 0
+        busy = max(0, self.size - idle) if self._started else 0
+        return {("idle",): idle, ("busy",): busy}
+
+scanner_pool = ScannerPool(
+    size=settings.scanner_pool_size,
+    max_scans=settings.scanner_worker_max_scans,
+    health_check_interval=settings.scanner_health_check_interval,
+)
+
+metrics.Gauge("aura_scanner_workers", "Scanner workers by state", ["state"], callback=scanner_pool.utilization)
@@ -1,33 +1,76 @@
-import subprocess
-import json
-import sys
-import os
-from typing import Dict
-
-def scan_website(url: str, project_id: str) -> Dict:
-    """Run scanner in separate process to avoid asyncio conflicts"""
-    
-    script_path = os.path.join(os.path.dirname(__file__), "..", "scanner_process.py")
-    
+from typing import Callable, Dict, List, Optional
+
+from config import settings
+from services.result_builder import fit_result
+from services.scanner_pool import scanner_pool
+
+def _run(payload: Dict, timeout: float, on_progress: Optional[Callable[[str], None]],
+         on_issues: Optional[Callable[[List[Dict]], None]] = None,
+         on_result: Optional[Callable[[str, Dict], None]] = None) -> Dict:
+    streamed: List[Dict] = []
+
+    def on_event(message: Dict):
+        if message.get("event") == "progress":
+            if on_progress:
+                on_progress(message["stage"])
+        elif message.get("event") == "issues":
+            streamed.extend(message["issues"])
+            if on_issues:
+                on_issues(message["issues"])
+        elif message.get("event") == "result" and on_result:
+            on_result(message["project_id"], message["result"])
+
     try:
-        result = subprocess.run(
-            [sys.executable, script_path, url, project_id],
-            capture_output=True,
-            text=True,
-            timeout=60,
-            cwd=os.path.dirname(os.path.dirname(__file__))
-        )
-        
-        if result.returncode != 0:
-            try:
-                error_data = json.loads(result.stdout)
-                raise RuntimeError(error_data.get("error", "Scanner failed"))
-            except json.JSONDecodeError:
-                raise RuntimeError(f"Scanner failed: {result.stderr or result.stdout}")
-        
-        return json.loads(result.stdout)
-        
-    except subprocess.TimeoutExpired:
+        result = scanner_pool.run(payload, timeout=timeout, on_event=on_event)
+    except TimeoutError:
         raise RuntimeError("Scan timeout - website took too long")
-    except json.JSONDecodeError:
-        raise RuntimeError("Scanner returned invalid data")
+
+    if isinstance(result, dict) and "streamedIssues" in result:
+        if result.pop("streamedIssues") != len(streamed):
+            raise RuntimeError("Scanner returned invalid data")
+        result["issues"] = streamed
+        fit_result(result, settings.max_result_bytes)
+    return result
+
+def scan_website(url: str, project_id: str, on_progress: Optional[Callable[[str], None]] = None,
+                 previous: Optional[Dict] = None, on_issues: Optional[Callable[[List[Dict]], None]] = None) -> Dict:
+    """Run a scan on one of the warm scanner workers (blocking).
+
+    `on_progress` is called from the calling thread with each stage name
+    the worker reports, and `on_issues` with each chunk of issues as the
+    worker streams them. The worker sends them all right after axe's
+    results are grouped, so they arrive ahead of the screenshot and
+    captioning stages (the scheduler stores them then, see
+    services/scan_issues.IssueWriter); the returned result holds all of
+    them either way. Passing the `previous` scan's page state
+    makes the scan incremental.
+    """
+    return _run(
+        {"cmd": "scan", "url": url, "project_id": project_id, "previous": previous},
+        settings.scan_timeout_seconds,
+        on_progress,
+        on_issues,
+    )
+
+def crawl_website(url: str, project_id: str, options: Dict, on_progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """Crawl and scan a site on one worker, several pages at a time (blocking)"""
+    return _run(
+        {"cmd": "crawl", "url": url, "project_id": project_id, "options": options},
+        settings.crawl_timeout_seconds,
+        on_progress,
+    )
+
+def batch_scan_websites(targets: List[Dict], on_result: Callable[[str, Dict], None],
+                        on_progress: Optional[Callable[[str], None]] = None) -> Dict:
+    """Scan many projects on one worker's browser (blocking).
+
+    `targets` are {"url", "project_id"} dicts. `on_result(project_id, result)`
+    is called from the calling thread as each page finishes; a failed page
+    gets {"error": ...}. Returns the scanned/failed counts.
+    """
+    return _run(
+        {"cmd": "batch", "targets": targets, "concurrency": settings.batch_scan_concurrency},
+        settings.batch_timeout_seconds,
+        on_progress,
+        on_result=on_result,
+    )
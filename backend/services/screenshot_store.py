@@ -0,0 +1,87 @@
+"""
+Content-addressed screenshot store.
+
+Scanner workers hand over the raw PNG from Playwright; it is re-encoded to
+WebP (or JPEG) and stored under its sha256 next to a small thumbnail, so
+identical screenshots are stored once and every scan result keeps its own
+screenshot. Files never change once written, which lets them be served with
+immutable cache headers. Files are removed when the last scan result
+referencing them is deleted.
+"""
+import hashlib
+import os
+import tempfile
+from io import BytesIO
+from typing import Dict, Iterable
+
+from PIL import Image
+
+PLACEHOLDER_URL = "screenshots/placeholder.png"
+# libwebp refuses anything taller or wider than this; such pages fall back to JPEG
+WEBP_MAX_DIMENSION = 16383
+EXTENSIONS = {"webp": "webp", "jpeg": "jpg"}
+
+class ScreenshotStore:
+    def __init__(self, root: str = "screenshots", image_format: str = "webp", quality: int = 80,
+                 thumbnail_width: int = 320):
+        self.root = root
+        self.image_format = image_format
+        self.quality = quality
+        self.thumbnail_width = thumbnail_width
+
+    def _url(self, digest: str, suffix: str, image_format: str) -> str:
+        return f"{self.root}/{digest[:2]}/{digest}{suffix}.{EXTENSIONS[image_format]}"
+
+    def _write(self, url: str, image: Image.Image, image_format: str):
+        os.makedirs(os.path.dirname(url), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(url))
+        with os.fdopen(fd, "wb") as f:
+            image.save(f, format=image_format.upper(), quality=self.quality)
+        os.replace(tmp_path, url)
+
+    def save(self, png: bytes) -> Dict[str, str]:
+        """Store a PNG screenshot; returns screenshot_url and thumbnail_url"""
+        digest = hashlib.sha256(png).hexdigest()
+        image = Image.open(BytesIO(png))
+        image_format = self.image_format
+        if image_format == "webp" and max(image.size) > WEBP_MAX_DIMENSION:
+            image_format = "jpeg"
+
+        screenshot_url = self._url(digest, "", image_format)
+        thumbnail_url = self._url(digest, "_thumb", image_format)
+        # Same content hash: already stored (and encoded) by an earlier scan
+        if not os.path.exists(screenshot_url):
+            image = image.convert("RGB")
+            self._write(screenshot_url, image, image_format)
+            # Thumbnails show the top of the page at the 16:9 viewport's aspect ratio
+            width = self.thumbnail_width
+            crop = image.crop((0, 0, image.width, min(image.height, image.width * 9 // 16)))
+            crop.thumbnail((width, width))
+            self._write(thumbnail_url, crop, image_format)
+
+        return {"screenshot_url": screenshot_url, "thumbnail_url": thumbnail_url}
+
+    def delete(self, url: str):
+        """Remove a stored screenshot and its thumbnail"""
+        if url == PLACEHOLDER_URL:
+            return
+        root = os.path.realpath(self.root)
+        base, ext = os.path.splitext(url)
+        for path in (url, f"{base}_thumb{ext}"):
+            real_path = os.path.realpath(path)
+            # Only ever delete files inside the store
+            if not real_path.startswith(root + os.sep):
+                continue
+            try:
+                os.remove(real_path)
+            except FileNotFoundError:
+                pass
+
+async def release_screenshots(scan_results_collection, urls: Iterable[str]):
+    """Delete screenshots that no remaining scan result references"""
+    store = ScreenshotStore()
+    for url in set(filter(None, urls)):
+        if url == PLACEHOLDER_URL:
+            continue
+        if await scan_results_collection.count_documents({"screenshotUrl": url}, limit=1) == 0:
+            store.delete(url)
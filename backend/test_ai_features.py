@@ -12,9 +12,19 @@ print("=" * 60)
 # Test 1: BLIP Image Caption Generation
 print("\n1. Testing BLIP Model (Image Alt Text Generation)...")
 try:
-    from scanner_process import generate_alt_text
+    import asyncio
+    from scanner_process import get_captioner, get_image_fetcher
+
+    async def caption(image_url):
+        # Same path as a scan: the pooled, size-capped fetcher and the resident captioner
+        fetcher = get_image_fetcher()
+        try:
+            return await get_captioner().caption(await fetcher.fetch(image_url))
+        finally:
+            await fetcher.close()
+
     test_image = "https://picsum.photos/200/300"
-    result = generate_alt_text(test_image)
+    result = asyncio.run(caption(test_image))
     if result:
         print(f"   ✅ BLIP Model Working!")
         print(f"   Generated: '{result}'")
@@ -26,7 +36,8 @@ except Exception as e:
 # Test 2: Color Contrast Fix
 print("\n2. Testing Color Contrast AI (WCAG Compliance)...")
 try:
-    from scanner_process import suggest_contrast_fix, get_contrast_ratio, hex_to_rgb
+    from scanner_process import suggest_contrast_fix
+    from services.contrast import contrast_ratio, hex_to_rgb
     
     # Test case: Low contrast
     fg = "#777777"
@@ -34,8 +45,8 @@ try:
     new_color = suggest_contrast_fix(fg, bg)
     
     if new_color:
-        old_ratio = get_contrast_ratio(hex_to_rgb(fg), hex_to_rgb(bg))
-        new_ratio = get_contrast_ratio(hex_to_rgb(new_color), hex_to_rgb(bg))
+        old_ratio = contrast_ratio(hex_to_rgb(fg), hex_to_rgb(bg))
+        new_ratio = contrast_ratio(hex_to_rgb(new_color), hex_to_rgb(bg))
         print(f"   ✅ Color Contrast AI Working!")
         print(f"   Original: {fg} (ratio: {old_ratio:.2f}:1)")
         print(f"   Fixed: {new_color} (ratio: {new_ratio:.2f}:1)")
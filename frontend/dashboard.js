@@ -52,9 +52,43 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
 
+    const SCAN_STAGE_LABELS = {
+        queued: "Queued...",
+        started: "Loading page...",
+        navigated: "Running checks...",
+        axe_done: "Capturing page...",
+        screenshot: "AI analysis...",
+        ai_suggestions: "Saving...",
+        page_scanned: "Crawling pages...",
+    };
+
+    // Poll a queued scan job until it completes or fails
+    async function waitForScanJob(jobId, onStage) {
+        while (true) {
+            const response = await authenticatedFetch(`/scan/jobs/${jobId}`);
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.detail || "Could not check scan status.");
+
+            if (job.status === "completed") return job;
+            if (job.status === "failed") throw new Error(job.error || "Scan failed");
+
+            const latest = job.stages[job.stages.length - 1];
+            if (latest) onStage(latest.stage, job);
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    }
+
+    function formatRollup(rollup) {
+        if (!rollup) return '<span>Not scanned yet</span>';
+        const delta = rollup.delta > 0 ? ` (+${rollup.delta})` : rollup.delta < 0 ? ` (${rollup.delta})` : '';
+        const average = rollup.recentScores.length > 1 ? ` · avg ${rollup.averageScore} over ${rollup.recentScores.length} scans` : '';
+        return `<span>Score ${rollup.latestScore}${delta}${average} · last scanned ${new Date(rollup.latestScanAt).toLocaleDateString()}</span>`;
+    }
+
     async function fetchProjects() {
         try {
-            const response = await authenticatedFetch("/projects");
+            // Projects and their score rollups in one round trip
+            const response = await authenticatedFetch("/projects/overview");
             if (!response.ok) throw new Error("Could not fetch projects.");
             
             const projects = await response.json();
@@ -69,10 +103,12 @@ document.addEventListener("DOMContentLoaded", () => {
                         <div class="project-info">
                             <strong>${project.projectName}</strong>
                             <span>${project.url}</span>
+                            ${formatRollup(project.rollup)}
                         </div>
                         <div class="project-actions">
                             <a href="history.html?projectId=${project._id}" class="button-secondary">View History</a>
                             <button class="scan-button" data-id="${project._id}">Scan Now</button>
+                            <button class="scan-button crawl-button button-secondary" data-id="${project._id}" data-mode="crawl" title="Scan every page linked from this URL">Crawl Site</button>
                             <button class="delete-project-button" data-id="${project._id}" title="Delete Project">
                                 <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="3 6 5 6 21 6"></polyline><path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path></svg>
                             </button>
@@ -117,26 +153,35 @@ document.addEventListener("DOMContentLoaded", () => {
 
         if (targetButton.classList.contains("scan-button")) {
             const projectId = targetButton.dataset.id;
+            const mode = targetButton.dataset.mode || "single";
+            const idleLabel = targetButton.textContent;
             targetButton.textContent = "Scanning...";
             targetButton.disabled = true;
             try {
-                const response = await authenticatedFetch(`/scan/${projectId}`, { method: "POST" });
-                const result = await response.json();
+                const response = await authenticatedFetch(`/scan/${projectId}`, {
+                    method: "POST",
+                    // Single-page rescans reuse the last result when the page hasn't changed
+                    body: JSON.stringify({ mode, incremental: mode === "single" })
+                });
+                const job = await response.json();
                 if (!response.ok) {
-                    const errorMsg = result.detail || "Scan failed";
-                    if (errorMsg.includes("security policies") || errorMsg.includes("blocked")) {
-                        alert("⚠️ Unable to scan this website\n\nThis website blocks automated scanning tools. Try scanning a different website or one you own.");
-                    } else if (errorMsg.includes("Timeout")) {
-                        alert("⏱️ Scan Timeout\n\nThe website took too long to load. Please try again or use a faster website.");
-                    } else {
-                        alert("❌ Scan Failed\n\n" + errorMsg);
-                    }
-                    throw new Error(errorMsg);
+                    throw new Error(job.detail || "Scan failed");
                 }
-                window.location.href = `results.html?scanId=${result._id}`;
+                const result = await waitForScanJob(job._id, (stage) => {
+                    targetButton.textContent = SCAN_STAGE_LABELS[stage] || "Scanning...";
+                });
+                window.location.href = `results.html?scanId=${result.resultId}`;
             } catch (error) {
                 console.error(error);
-                targetButton.textContent = "Scan Now";
+                const errorMsg = error.message;
+                if (errorMsg.includes("security policies") || errorMsg.includes("blocked")) {
+                    alert("⚠️ Unable to scan this website\n\nThis website blocks automated scanning tools. Try scanning a different website or one you own.");
+                } else if (errorMsg.includes("Timeout") || errorMsg.includes("timeout")) {
+                    alert("⏱️ Scan Timeout\n\nThe website took too long to load. Please try again or use a faster website.");
+                } else {
+                    alert("❌ Scan Failed\n\n" + errorMsg);
+                }
+                targetButton.textContent = idleLabel;
                 targetButton.disabled = false;
             }
         }
@@ -147,5 +192,34 @@ document.addEventListener("DOMContentLoaded", () => {
         }
     });
 
+    const scanAllButton = document.getElementById("scan-all-button");
+    scanAllButton.addEventListener("click", async () => {
+        const idleLabel = scanAllButton.textContent;
+        scanAllButton.textContent = "Starting...";
+        scanAllButton.disabled = true;
+        try {
+            const response = await authenticatedFetch("/scan/batch", {
+                method: "POST",
+                body: JSON.stringify({ allProjects: true })
+            });
+            const job = await response.json();
+            if (!response.ok) throw new Error(job.detail || "Scan failed");
+
+            const done = await waitForScanJob(job._id, (stage, current) => {
+                const batch = current.batch;
+                scanAllButton.textContent = `Scanned ${batch.completed + batch.failed} of ${batch.total}...`;
+            });
+            if (done.batch.failed) {
+                alert(`⚠️ ${done.batch.failed} of ${done.batch.total} projects could not be scanned.`);
+            }
+            fetchProjects();
+        } catch (error) {
+            console.error(error);
+            alert("❌ Scan Failed\n\n" + error.message);
+        }
+        scanAllButton.textContent = idleLabel;
+        scanAllButton.disabled = false;
+    });
+
     fetchProjects();
 });
\ No newline at end of file
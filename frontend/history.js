@@ -51,33 +51,62 @@ document.addEventListener("DOMContentLoaded", async () => {
         const project = await projectRes.json();
         document.getElementById("project-name-header").textContent = `Scan History for "${project.projectName}"`;
 
-        const historyRes = await authenticatedFetch(`/projects/${projectId}/history`);
+        await loadHistoryPage(null);
+    } catch (error) {
+        console.error(error);
+        historyList.innerHTML = `<li>Error loading scan history: ${error.message}</li>`;
+    }
+
+    async function loadHistoryPage(cursor) {
+        const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : '';
+        const historyRes = await authenticatedFetch(`/projects/${projectId}/history${query}`);
         if (!historyRes.ok) throw new Error("Could not fetch scan history.");
         const history = await historyRes.json();
-        
-        if (history.length === 0) {
+
+        if (!cursor && history.items.length === 0) {
             historyList.innerHTML = '<li>No scans have been run for this project yet.</li>';
-        } else {
-            history.forEach(scan => {
-                const li = document.createElement('li');
-                li.innerHTML = `
-                    <div class="project-info">
-                        <strong>Score: ${scan.accessibilityScore}</strong>
-                        <span>Scanned on ${new Date(scan.createdAt).toLocaleString()}</span>
-                    </div>
-                    <div class="project-actions">
-                        <a href="results.html?scanId=${scan._id}" class="button-secondary">View Details</a>
-                        <button class="delete-scan-button" data-id="${scan._id}" title="Delete Scan">
-                            <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="3 6 5 6 21 6"></polyline><path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path></svg>
-                        </button>
-                    </div>
-                `;
-                historyList.appendChild(li);
+            return;
+        }
+        history.items.forEach(scan => {
+            const li = document.createElement('li');
+            const thumbnail = scan.thumbnailUrl
+                ? `<img src="${API_BASE_URL}/${scan.thumbnailUrl}" alt="" loading="lazy" width="96" style="border: 1px solid var(--border-color); border-radius: 4px; margin-right: 1rem;">`
+                : '';
+            const severities = Object.entries(scan.severityCounts || {})
+                .map(([severity, count]) => `${count} ${severity}`).join(', ');
+            li.innerHTML = `
+                ${thumbnail}
+                <div class="project-info">
+                    <strong>Score: ${scan.accessibilityScore}</strong>
+                    <span>Scanned on ${new Date(scan.createdAt).toLocaleString()}${scan.pagesScanned ? ` · ${scan.pagesScanned} pages` : ''}</span>
+                    ${severities ? `<span>${severities}</span>` : ''}
+                </div>
+                <div class="project-actions">
+                    <a href="results.html?scanId=${scan._id}" class="button-secondary">View Details</a>
+                    <button class="delete-scan-button" data-id="${scan._id}" title="Delete Scan">
+                        <svg xmlns="http://www.w3.org/2000/svg" width="20" height="20" viewBox="0 0 24 24" fill="none" stroke="currentColor" stroke-width="2" stroke-linecap="round" stroke-linejoin="round"><polyline points="3 6 5 6 21 6"></polyline><path d="M19 6v14a2 2 0 0 1-2 2H7a2 2 0 0 1-2-2V6m3 0V4a2 2 0 0 1 2-2h4a2 2 0 0 1 2 2v2"></path></svg>
+                    </button>
+                </div>
+            `;
+            historyList.appendChild(li);
+        });
+
+        // History is paged; offer the next page until the server runs out
+        if (history.nextCursor) {
+            const li = document.createElement('li');
+            li.className = 'load-more';
+            li.innerHTML = '<button class="button-secondary">Load more</button>';
+            li.querySelector('button').addEventListener('click', async () => {
+                li.remove();
+                try {
+                    await loadHistoryPage(history.nextCursor);
+                } catch (error) {
+                    console.error(error);
+                    alert("Could not load more scans.");
+                }
             });
+            historyList.appendChild(li);
         }
-    } catch (error) {
-        console.error(error);
-        historyList.innerHTML = `<li>Error loading scan history: ${error.message}</li>`;
     }
 
     historyList.addEventListener('click', async (e) => {
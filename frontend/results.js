@@ -36,7 +36,9 @@ function displayResults(result, url) {
     summaryCard.innerHTML = `
         <h2>Summary</h2>
         <p><strong>Accessibility Score:</strong> <span style="font-size: 1.5rem; font-weight: bold;">${result.accessibilityScore}</span> / 100</p>
-        <p><strong>URL Scanned:</strong> <a href="${url}" target="_blank">${url}</a></p>
+        <p><strong>URL Scanned:</strong> <a href="${result.pageUrl || url}" target="_blank">${result.pageUrl || url}</a></p>
+        ${result.pagesScanned ? `<p><strong>Pages Crawled:</strong> ${result.pagesScanned}</p>` : ''}
+        ${result.unchangedFrom ? `<p><em>The page hasn't changed since the previous scan, so its results were reused.</em></p>` : ''}
         <p><strong>Date:</strong> ${new Date(result.createdAt).toLocaleString()}</p>
     `;
 
@@ -44,24 +46,53 @@ function displayResults(result, url) {
     const screenshotCard = document.createElement('section');
     screenshotCard.className = 'card';
     const screenshotUrl = `${API_BASE_URL}/${result.screenshotUrl}`;
+    // Show the small thumbnail first; the multi-MB full page only loads on request
+    const previewUrl = result.thumbnailUrl ? `${API_BASE_URL}/${result.thumbnailUrl}` : screenshotUrl;
     screenshotCard.innerHTML = `
         <h2>Screenshot</h2>
-        <img src="${screenshotUrl}" alt="Page Screenshot" style="width: 100%; border: 1px solid var(--border-color); border-radius: 4px;" 
+        <img src="${previewUrl}" alt="Page Screenshot" loading="lazy" style="width: 100%; border: 1px solid var(--border-color); border-radius: 4px;" 
              onerror="this.parentElement.style.display='none';">
+        ${result.thumbnailUrl ? '<button class="button-secondary" id="full-screenshot-btn" style="margin-top: 0.5rem;">View full page</button>' : ''}
     `;
+    const fullScreenshotBtn = screenshotCard.querySelector('#full-screenshot-btn');
+    if (fullScreenshotBtn) {
+        fullScreenshotBtn.addEventListener('click', () => {
+            screenshotCard.querySelector('img').src = screenshotUrl;
+            fullScreenshotBtn.remove();
+        });
+    }
 
     // Issues Card
     const issuesCard = document.createElement('section');
     issuesCard.className = 'card';
-    let issuesHTML = `<h2>All Issues Found (${result.issues.length})</h2><ul id="issues-list">`;
-    if (result.issues.length > 0) {
-        result.issues.forEach(issue => {
+    // Issues are grouped per rule; each group keeps a sample of its elements
+    const groups = (result.issueGroups && result.issueGroups.length > 0)
+        ? result.issueGroups
+        : [...new Set(result.issues.map(issue => issue.guideline))].map(guideline => {
+            const first = result.issues.find(issue => issue.guideline === guideline);
+            return { guideline, description: first.description, count: result.issues.filter(issue => issue.guideline === guideline).length };
+        });
+    // Older results embed their samples; newer ones load them per rule from /issues
+    const embedded = result.issues && result.issues.length > 0;
+    const totalIssues = groups.reduce((sum, group) => sum + group.count, 0);
+    let issuesHTML = `<h2>All Issues Found (${totalIssues})</h2>`;
+    if (result.severityCounts && Object.keys(result.severityCounts).length > 0) {
+        issuesHTML += `<p>${Object.entries(result.severityCounts).map(([severity, count]) => `<strong>${count}</strong> ${severity}`).join(' · ')}</p>`;
+    }
+    issuesHTML += '<ul id="issues-list">';
+    if (groups.length > 0) {
+        groups.forEach(group => {
+            const samples = embedded ? result.issues.filter(issue => issue.guideline === group.guideline) : [];
+            const hidden = group.count - samples.length;
             issuesHTML += `
                 <li>
-                    <div class="issue-info">
-                        <strong>${issue.guideline}</strong>
-                        <span>${issue.description}</span>
-                        <code style="margin-top: 0.5rem; display: block;">${escapeHtml(issue.element)}</code>
+                    <div class="issue-info" data-rule="${escapeHtml(group.guideline)}">
+                        <strong>${group.guideline}${group.severity ? ` (${group.severity})` : ''} &times; ${group.count}</strong>
+                        <span>${group.description}</span>
+                        <div class="issue-samples">${renderSamples(samples)}</div>
+                        ${embedded
+                            ? (hidden > 0 ? `<span style="margin-top: 0.5rem;"><em>…and ${hidden} more similar element${hidden === 1 ? '' : 's'}</em></span>` : '')
+                            : '<button class="button-secondary load-issues-btn" style="margin-top: 0.5rem;">Show elements</button>'}
                     </div>
                 </li>
             `;
@@ -71,6 +102,32 @@ function displayResults(result, url) {
     }
     issuesHTML += '</ul>';
     issuesCard.innerHTML = issuesHTML;
+    issuesCard.querySelectorAll('.load-issues-btn').forEach(button => {
+        let cursor = null;
+        button.addEventListener('click', async () => {
+            const info = button.closest('.issue-info');
+            const query = new URLSearchParams({ rule: info.dataset.rule });
+            if (cursor) query.set('cursor', cursor);
+            button.disabled = true;
+            try {
+                const response = await authenticatedFetch(`/scan/results/${result._id}/issues?${query}`);
+                if (!response.ok) throw new Error("Could not load issues.");
+                const page = await response.json();
+                info.querySelector('.issue-samples').insertAdjacentHTML('beforeend', renderSamples(page.items));
+                cursor = page.nextCursor;
+                if (cursor) {
+                    button.textContent = 'Show more';
+                    button.disabled = false;
+                } else {
+                    button.remove();
+                }
+            } catch (error) {
+                console.error("Error loading issues:", error);
+                button.textContent = 'Retry';
+                button.disabled = false;
+            }
+        });
+    });
 
     // Suggestions Card
     const suggestionsCard = document.createElement('section');
@@ -121,6 +178,10 @@ function displayResults(result, url) {
     }
 }
 
+function renderSamples(issues) {
+    return issues.map(issue => `<code style="margin-top: 0.5rem; display: block;">${escapeHtml(issue.element)}</code>`).join('');
+}
+
 function escapeHtml(unsafe) {
     return unsafe
         .replace(/&/g, "&amp;")